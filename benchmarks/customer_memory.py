@@ -0,0 +1,107 @@
+"""
+Measures memory per customer, and how it grows over a simulated 24 hour run.
+
+    python -m benchmarks.customer_memory --customers 10000 --actions-per-hour 60
+
+No HTTP requests are sent, PlaceOrder / CancelOrder are applied straight to the Customer objects.
+"""
+import argparse
+import random
+import tracemalloc
+
+from simulator.customer_store import CustomerStore
+
+HOURS = 24
+
+class LegacyCustomer:
+    """
+    The original Customer layout, a plain object with unbounded order lists, for comparison.
+    """
+    def __init__(self, email: str, password: str, user_id: int):
+        self.email = email
+        self.password = password
+        self.user_id = user_id
+        self.placed_orders = []
+        self.closed_orders = []
+
+def build_store(customer_count: int) -> CustomerStore:
+    store = CustomerStore()
+    for user_id in range(1, customer_count + 1):
+        store.append(user_id, f"user{user_id}@example.com", f"pass{user_id}")
+    store.finalize()
+    return store
+
+def measure(build) -> tuple[int, object]:
+    """
+    Returns the bytes allocated by build() and what it built.
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    built = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, built
+
+def materialise(store: CustomerStore, max_open_orders: int = None, max_closed_orders: int = None) -> list:
+    store.set_order_limits(max_open_orders, max_closed_orders)
+    return [store[user_id] for user_id in store.keys()]
+
+def simulate_day(customers: list, actions_per_hour: int, cancel_ratio: float, seed: int) -> list[int]:
+    """
+    Applies a day of PlaceOrder / CancelOrder actions to every customer, returning memory grown after each hour.
+    A PlaceOrder is followed by a CancelOrder with probability cancel_ratio, like the PlaceThenCancel sequence.
+    """
+    rng = random.Random(seed)
+    samples = []
+
+    tracemalloc.start()
+    for _ in range(HOURS):
+        for customer in customers:
+            for _ in range(actions_per_hour):
+                order_id = rng.randint(0, 3000000)
+                customer.placed_orders.append(order_id)
+                if rng.random() < cancel_ratio and customer.placed_orders:
+                    customer.closed_orders.append(customer.placed_orders.pop())
+        samples.append(tracemalloc.get_traced_memory()[0])
+    tracemalloc.stop()
+
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--customers", type=int, default=10000)
+    parser.add_argument("--actions-per-hour", type=int, default=60, help="PlaceOrder actions per customer per hour")
+    parser.add_argument("--cancel-ratio", type=float, default=0.5)
+    parser.add_argument("--max-open-orders", type=int, default=100)
+    parser.add_argument("--max-closed-orders", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    count = args.customers
+    print(f"===== Memory per customer ({count} customers) =====")
+
+    store_bytes, store = measure(lambda: build_store(count))
+    print(f"  -  CustomerStore (not yet used)  : {store_bytes / count:8.1f} bytes")
+
+    legacy_bytes, legacy = measure(lambda: [LegacyCustomer(store.email(r), store.password(r), u) for r, u in enumerate(store.keys())])
+    print(f"  -  legacy Customer               : {legacy_bytes / count:8.1f} bytes")
+
+    slotted_bytes, slotted = measure(lambda: materialise(store))
+    print(f"  -  Customer (__slots__)          : {slotted_bytes / count:8.1f} bytes")
+
+    print(f"\n===== Growth over {HOURS}h at {args.actions_per_hour} PlaceOrder/h per customer =====")
+    bounded_store = build_store(count)
+    bounded = materialise(bounded_store, args.max_open_orders, args.max_closed_orders)
+    runs = {
+        "legacy (unbounded lists)": simulate_day(legacy, args.actions_per_hour, args.cancel_ratio, args.seed),
+        f"bounded ({args.max_open_orders} open / {args.max_closed_orders} closed)":
+            simulate_day(bounded, args.actions_per_hour, args.cancel_ratio, args.seed)
+    }
+
+    for name, samples in runs.items():
+        print(f"  {name}:")
+        for hour in (0, 5, 11, 17, 23):
+            print(f"    after {hour + 1:2d}h : +{samples[hour] / count:10.1f} bytes/customer")
+
+if __name__ == "__main__":
+    main()
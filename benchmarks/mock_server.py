@@ -0,0 +1,207 @@
+"""
+A local stand-in for the order service, so the simulator's own overhead can be measured without the network.
+
+    python -m benchmarks.mock_server --port 8080 --latency-ms 2 --error-rate 0.01
+
+Answers every request like httpbin's /post, echoing the JSON body back under "json", which is what the Login,
+PlaceOrder and CancelOrder behaviours expect. Point an action's base_url at http://127.0.0.1:<port>/ to use it.
+Latency, error responses, dropped connections and hung requests can be injected, and --processes serves the port
+from several processes (SO_REUSEPORT) so the server isn't the bottleneck.
+Only Content-Length request bodies are supported, which is what requests, aiohttp and httpx send for bytes bodies.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import random
+import signal
+
+DEFAULT_MOCK_CONFIG = {
+    "host": "127.0.0.1",
+    "port": 8080,
+    "latency_ms": 0.0,          # added to every response
+    "latency_jitter_ms": 0.0,   # plus a uniform random 0..jitter
+    "error_rate": 0.0,          # fraction of requests answered with error_status
+    "error_status": 503,
+    "drop_rate": 0.0,           # fraction of requests whose connection is closed without a response
+    "hang_rate": 0.0,           # fraction of requests held for hang_seconds, then closed, to cause client timeouts
+    "hang_seconds": 30.0,
+    "processes": 1
+}
+
+REASONS = {200: b"OK", 400: b"Bad Request", 404: b"Not Found", 429: b"Too Many Requests",
+           500: b"Internal Server Error", 502: b"Bad Gateway", 503: b"Service Unavailable", 504: b"Gateway Timeout"}
+
+OK, ERROR, DROP, HANG = range(4)
+
+
+class MockStats:
+    """
+    Requests served by one server process, by outcome.
+    """
+    def __init__(self):
+        self.counts = [0, 0, 0, 0]  # ok, error, dropped, hung
+
+    def __str__(self):
+        ok, error, dropped, hung = self.counts
+        return f"{sum(self.counts)} requests | ok {ok} | errors {error} | dropped {dropped} | hung {hung}"
+
+
+class MockProtocol(asyncio.Protocol):
+    """
+    One keep-alive HTTP/1.1 connection. Requests are answered one at a time in order, a request arriving while
+    the previous one is still delayed stays buffered until its response has been written.
+    """
+    def __init__(self, config: dict, stats: MockStats):
+        self.config = config
+        self.stats = stats
+        self.loop = asyncio.get_running_loop()
+        self.transport = None
+        self.buffer = bytearray()
+        self.busy = False
+
+        self.latency = config["latency_ms"] / 1000
+        self.jitter = config["latency_jitter_ms"] / 1000
+        status = config["error_status"]
+        body = b'{"error": "injected by mock server"}'
+        self.error_response = (b"HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n"
+                               % (status, REASONS.get(status, b"Error"), len(body)) + body)
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data: bytes):
+        self.buffer += data
+        if not self.busy:
+            self._process()
+
+    def _process(self):
+        while not self.busy and not self.transport.is_closing():
+            request = self._next_request()
+            if request is None:
+                return
+            body, close = request
+
+            outcome = self._outcome()
+            self.stats.counts[outcome] += 1
+            if outcome == DROP:
+                self.transport.close()
+                return
+            if outcome == HANG:
+                self.busy = True
+                self.loop.call_later(self.config["hang_seconds"], self.transport.close)
+                return
+
+            response = self.error_response if outcome == ERROR else self._ok_response(body)
+            delay = self.latency + (random.random() * self.jitter if self.jitter else 0.0)
+            if delay > 0:
+                self.busy = True
+                self.loop.call_later(delay, self._send_delayed, response, close)
+                return
+            self._send(response, close)
+
+    def _next_request(self) -> tuple[bytes, bool] | None:
+        """
+        Takes one complete request off the buffer, returning (body, close connection after responding),
+        or None until the rest of it has arrived.
+        """
+        end = self.buffer.find(b"\r\n\r\n")
+        if end < 0:
+            return None
+
+        head = bytes(self.buffer[:end]).lower()
+        length = 0
+        start = head.find(b"\r\ncontent-length:")
+        if start >= 0:
+            line_end = head.find(b"\r\n", start + 2)
+            length = int(head[start + 17:line_end if line_end >= 0 else len(head)])
+        if len(self.buffer) < end + 4 + length:
+            return None
+
+        body = bytes(self.buffer[end + 4:end + 4 + length])
+        del self.buffer[:end + 4 + length]
+        return body, b"\r\nconnection: close" in head
+
+    def _outcome(self) -> int:
+        config = self.config
+        if not (config["error_rate"] or config["drop_rate"] or config["hang_rate"]):
+            return OK
+
+        roll = random.random()
+        for outcome, rate in ((ERROR, config["error_rate"]), (DROP, config["drop_rate"]), (HANG, config["hang_rate"])):
+            if roll < rate:
+                return outcome
+            roll -= rate
+        return OK
+
+    @staticmethod
+    def _ok_response(body: bytes) -> bytes:
+        content = b'{"json": ' + (body or b"null") + b"}"
+        return (b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n" % len(content)
+                + content)
+
+    def _send(self, response: bytes, close: bool):
+        self.transport.write(response)
+        if close:
+            self.transport.close()
+
+    def _send_delayed(self, response: bytes, close: bool):
+        self.busy = False
+        if self.transport.is_closing():
+            return
+        self._send(response, close)
+        self._process()
+
+
+async def serve(config: dict, stats: MockStats):
+    loop = asyncio.get_running_loop()
+    server = await loop.create_server(lambda: MockProtocol(config, stats), config["host"], config["port"],
+                                      reuse_port=config["processes"] > 1, backlog=4096)
+    async with server:
+        await server.serve_forever()
+
+def run_server(config: dict):
+    """
+    Serves until interrupted, then prints what was served. Runs in every server process.
+    """
+    stats = MockStats()
+    try:
+        asyncio.run(serve(config, stats))
+    except KeyboardInterrupt:
+        pass
+    print(f"[MockServer] {multiprocessing.current_process().name}: {stats}", flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    for key, default in DEFAULT_MOCK_CONFIG.items():
+        parser.add_argument(f"--{key.replace('_', '-')}", type=type(default), default=default)
+    config = vars(parser.parse_args())
+
+    # SIGTERM stops the server like CTRL+C, so the request counts are still printed
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    print(f"[MockServer] serving http://{config['host']}:{config['port']}/ with {config['processes']} processes, "
+          f"latency {config['latency_ms']} ms (+{config['latency_jitter_ms']} ms jitter), "
+          f"errors {config['error_rate']:.1%}, dropped {config['drop_rate']:.1%}, hung {config['hang_rate']:.1%}",
+          flush=True)
+
+    if config["processes"] <= 1:
+        run_server(config)
+        return
+
+    processes = [multiprocessing.Process(target=run_server, args=(config,), name=f"server-{i}")
+                 for i in range(config["processes"])]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        # CTRL+C reaches every process, a SIGTERM only this one
+        for process in processes:
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Measures the simulator's own throughput against the local mock server, across engines and customer counts.
+
+    python -m benchmarks.throughput --engines threaded,keyed,asyncio --customers 100,1000,10000 --duration 10
+
+Every case runs in a fresh process that builds the same pipeline as main.py (actions from config/actions.yaml
+pointed at the mock server, config/worker_pool.yaml with the engine swapped in) and keeps every customer's queue
+full, so the result is the highest rate the simulator sustains, not a configured one.
+Reports requests/s, CPU time per request (simulator process only) and peak memory per customer.
+
+Results are saved to results/benchmarks/throughput-<time>.json. The newest earlier results file (or --baseline)
+is compared against, and cases whose requests/s dropped by more than --tolerance are reported as regressions.
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from simulator.histogram import LatencyHistogram
+
+RESULTS_DIR = "results/benchmarks"
+
+# Runs are only comparable when these settings match
+COMPARABLE_SETTINGS = ["actions", "queue_depth", "latency_ms", "error_rate", "server_processes"]
+
+def peak_rss() -> int:
+    """
+    Returns the peak resident memory of this process in bytes.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def write_customers(path: str, count: int):
+    with open(path, "w") as f:
+        for user_id in range(1, count + 1):
+            f.write(json.dumps({"user_id": user_id, "email": f"user{user_id}@example.com",
+                                "password": f"pass{user_id}"}) + "\n")
+
+def feed(pool, user_ids, actions: list[str], stop_event: threading.Event):
+    """
+    Dispatches actions to every customer in turn, as fast as the pool's queues take them.
+    Every customer gets the actions in order (PlaceOrder, then CancelOrder, ...) like a sequence would.
+    """
+    round_index = 0
+    while not stop_event.is_set():
+        action = actions[round_index % len(actions)]
+        for user_id in user_ids:
+            if stop_event.is_set():
+                return
+            pool.dispatch_action(user_id, action, time.monotonic())
+        round_index += 1
+
+def completed(snapshot: dict) -> tuple[int, int]:
+    return sum(snapshot["success"].values()), sum(snapshot["failure"].values())
+
+def run_case(engine: str, customer_count: int, args: dict, results):
+    """
+    Runs one benchmark case, in its own spawned process so memory and CPU are measured from a clean start.
+    """
+    from simulator.action_config_loader import load_actions_config
+    from simulator.action_registry import ActionRegistry
+    from simulator.engine import create_worker_pool
+    from simulator.metrics import MetricsTracker
+    from util import json_codec, yaml_loader
+    from util.log import setup_logging, shutdown_logging
+
+    setup_logging({"level": "WARNING"})
+
+    worker_pool_config = yaml_loader.load_yaml("config/worker_pool.yaml")
+    worker_pool_config.update({
+        "engine": engine,
+        "customers_file": args["customers_file"],
+        "shards": 1,
+        "sessions": {"enabled": False},
+        "queues": {"max_per_customer": args["queue_depth"], "max_total": 0, "overflow": "block", "block_timeout": 1.0}
+    })
+    json_codec.configure(worker_pool_config.get("json_codec", "auto"))
+
+    action_definitions = load_actions_config("config/actions.yaml")
+    for definition in action_definitions.values():
+        definition["config"]["base_url"] = args["base_url"]
+    registry = ActionRegistry()
+    registry.register_all(action_definitions)
+
+    rss_before = peak_rss()
+    metrics = MetricsTracker()
+    pool = create_worker_pool(worker_pool_config, metrics, registry)
+    pool.run()
+
+    stop_event = threading.Event()
+    feeder = threading.Thread(target=feed, args=(pool, list(pool.customers.keys()), args["actions"], stop_event),
+                              daemon=True)
+    feeder.start()
+
+    # Connections are opened and threads started during the warmup, only the steady state is measured
+    time.sleep(args["warmup"])
+    first, cpu_first, start = metrics.snapshot(include_customers=False), time.process_time(), time.monotonic()
+    time.sleep(args["duration"])
+    last, cpu_last, end = metrics.snapshot(include_customers=False), time.process_time(), time.monotonic()
+    rss_after = peak_rss()
+
+    stop_event.set()
+    pool.shutdown()
+    shutdown_logging()
+
+    success = completed(last)[0] - completed(first)[0]
+    failure = completed(last)[1] - completed(first)[1]
+    requests = success + failure
+    latency = LatencyHistogram()
+    for action, data in last["latency"].items():
+        latency.merge(LatencyHistogram.from_dict(data).difference(LatencyHistogram.from_dict(first["latency"].get(action, {}))))
+
+    results.put({
+        "engine": engine,
+        "customers": customer_count,
+        "requests": requests,
+        "errors": failure,
+        "rps": requests / (end - start),
+        "cpu_us_per_request": (cpu_last - cpu_first) / requests * 1e6 if requests else None,
+        "bytes_per_customer": (rss_after - rss_before) / customer_count,
+        "p50_ms": latency.percentile(50) * 1000,
+        "p99_ms": latency.percentile(99) * 1000
+    })
+
+def wait_for_result(process, results) -> dict:
+    while True:
+        try:
+            return results.get(timeout=1)
+        except queue.Empty:
+            if not process.is_alive():
+                raise RuntimeError(f"benchmark process exited with code {process.exitcode} without a result")
+
+def start_mock_server(args) -> tuple[subprocess.Popen, str]:
+    """
+    Starts benchmarks.mock_server on a free port, returns the process and its base_url once it accepts connections.
+    """
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+
+    command = [sys.executable, "-m", "benchmarks.mock_server", "--port", str(port),
+               "--processes", str(args.server_processes), "--latency-ms", str(args.latency_ms),
+               "--error-rate", str(args.error_rate)]
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return server, f"http://127.0.0.1:{port}/"
+        except OSError:
+            if time.monotonic() > deadline or server.poll() is not None:
+                server.kill()
+                raise RuntimeError("mock server did not start")
+            time.sleep(0.1)
+
+def find_baseline(path: str | None, settings: dict) -> dict | None:
+    """
+    Loads the results file at path, or else the newest earlier one run with the same COMPARABLE_SETTINGS.
+    """
+    candidates = [path] if path else sorted(glob.glob(os.path.join(RESULTS_DIR, "throughput-*.json")), reverse=True)
+    for candidate in candidates:
+        with open(candidate) as f:
+            baseline = json.load(f)
+        previous = baseline.get("settings", {})
+        if path or all(previous.get(key) == settings[key] for key in COMPARABLE_SETTINGS):
+            baseline["path"] = candidate
+            return baseline
+    return None
+
+def compare(results: list[dict], baseline: dict, tolerance: float) -> list[str]:
+    """
+    Prints every case's change in requests/s against the baseline, returns the cases that regressed.
+    """
+    previous = {(r["engine"], r["customers"]): r for r in baseline["results"]}
+    regressions = []
+
+    print(f"\n===== Compared to {baseline['path']} =====")
+    for result in results:
+        before = previous.get((result["engine"], result["customers"]))
+        if not before or not before["rps"]:
+            continue
+        change = result["rps"] / before["rps"] - 1
+        name = f"{result['engine']} x {result['customers']}"
+        flag = ""
+        if change < -tolerance:
+            flag = "  <-- REGRESSION"
+            regressions.append(name)
+        print(f"  -  {name:24s}: {before['rps']:9.1f} -> {result['rps']:9.1f} req/s ({change:+.1%}){flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engines", default="threaded,keyed,asyncio")
+    parser.add_argument("--customers", default="100,1000,10000", help="customer counts, comma separated")
+    parser.add_argument("--actions", default="PlaceOrder,CancelOrder", help="actions sent to every customer in turn")
+    parser.add_argument("--duration", type=float, default=10, help="seconds measured per case")
+    parser.add_argument("--warmup", type=float, default=3, help="seconds run before measuring")
+    parser.add_argument("--queue-depth", type=int, default=2, help="actions kept queued per customer")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="mock server latency per response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="mock server error response rate")
+    parser.add_argument("--server-processes", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--baseline", help="results file to compare against, defaults to the newest earlier one")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="requests/s drop reported as a regression")
+    args = parser.parse_args()
+
+    engines = args.engines.split(",")
+    customer_counts = [int(count) for count in args.customers.split(",")]
+    baseline = find_baseline(args.baseline, vars(args))
+
+    server, base_url = start_mock_server(args)
+    context = multiprocessing.get_context("spawn")
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            for customer_count in customer_counts:
+                customers_file = os.path.join(directory, f"customers-{customer_count}.jsonl")
+                write_customers(customers_file, customer_count)
+
+                for engine in engines:
+                    case_args = {"customers_file": customers_file, "base_url": base_url,
+                                 "actions": args.actions.split(","), "duration": args.duration,
+                                 "warmup": args.warmup, "queue_depth": args.queue_depth}
+                    case_results = context.Queue()
+                    process = context.Process(target=run_case, args=(engine, customer_count, case_args, case_results))
+                    process.start()
+                    result = wait_for_result(process, case_results)
+                    process.join()
+                    results.append(result)
+                    print(f"[Benchmark] {engine} x {customer_count}: {result['rps']:.1f} req/s", flush=True)
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"\n===== Throughput (mock server latency {args.latency_ms} ms, {os.cpu_count()} cores) =====")
+    print(f"  {'engine':10s} {'customers':>9s} {'req/s':>9s} {'CPU us/req':>10s} {'bytes/cust':>10s} "
+          f"{'p50 ms':>7s} {'p99 ms':>7s} {'errors':>7s}")
+    for r in results:
+        cpu = f"{r['cpu_us_per_request']:10.1f}" if r["cpu_us_per_request"] is not None else f"{'-':>10s}"
+        print(f"  {r['engine']:10s} {r['customers']:9d} {r['rps']:9.1f} {cpu} {r['bytes_per_customer']:10.0f} "
+              f"{r['p50_ms']:7.2f} {r['p99_ms']:7.2f} {r['errors']:7d}")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"throughput-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump({
+            "time": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "settings": vars(args),
+            "results": results
+        }, f, indent=2)
+    print(f"\nResults saved to '{path}'")
+
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regressed by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import os
+import socket
+import threading
+import time
+
+from coordinator.protocol import ASSIGN, FINAL, HELLO, READY, SNAPSHOT, START, recv_message, send_message
+from coordinator.shard import Shard
+from util.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class Agent:
+    """
+    Runs one shard of a distributed run for a DistributedCoordinator, on this or another host.
+    The coordinator assigns the shard (its customers and share of the rate) and the configs to run it with,
+    and tells every agent when to start generating, so all agents start (and go through their phases) together.
+    Metrics snapshots are sent back every snapshot interval, and in full once the coordinator says stop.
+    """
+    def __init__(self, host: str, port: int, action_definition_path: str, connect_timeout: float = 60):
+        self.host = host
+        self.port = port
+        self.action_definition_path = action_definition_path
+        self.connect_timeout = connect_timeout
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+
+        self.sock = None
+        self.shard = None
+        self.stop_event = threading.Event()
+        self.finished = threading.Event()
+
+    def _connect(self) -> socket.socket:
+        # The coordinator may not be up yet, keep trying until connect_timeout
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            try:
+                return socket.create_connection((self.host, self.port), timeout=5)
+            except OSError as e:
+                if time.monotonic() >= deadline or self.stop_event.is_set():
+                    raise ConnectionError(f"Could not connect to coordinator {self.host}:{self.port}: {e}") from e
+                time.sleep(1)
+
+    def run(self):
+        try:
+            self._run()
+        except Exception as e:
+            logger.error(f"[{self}] failed: {e}")
+        finally:
+            if self.shard:
+                self.shard.stop()
+                self.shard = None
+            if self.sock:
+                self.sock.close()
+            self.finished.set()
+
+    def _run(self):
+        logger.info(f"[{self}] connecting to coordinator {self.host}:{self.port}...")
+        self.sock = self._connect()
+        self.sock.settimeout(None)
+        send_message(self.sock, {"type": HELLO, "agent": self.name})
+
+        assign = recv_message(self.sock)
+        if not assign or assign["type"] != ASSIGN:
+            logger.info(f"[{self}] coordinator stopped before assigning a shard")
+            return
+
+        shard_index, shard_count = assign["shard_index"], assign["shard_count"]
+        logger.info(f"[{self}] assigned shard {shard_index} of {shard_count}")
+        self.shard = Shard(shard_index, shard_count, self.action_definition_path, assign["worker_pool"],
+                           assign["generator"])
+        self.shard.start_pool()
+        send_message(self.sock, {"type": READY})
+
+        start = recv_message(self.sock)
+        if not start or start["type"] != START:
+            logger.info(f"[{self}] coordinator stopped before the start")
+            return
+
+        # Every agent starts generating at the same wall clock time, hosts are expected to be NTP synchronised
+        delay = start["start_at"] - time.time()
+        if delay > 0:
+            logger.info(f"[{self}] starting in {delay:.2f}s")
+            time.sleep(delay)
+        self.shard.start_generator()
+
+        reporter = threading.Thread(target=self._send_snapshots, args=(assign["snapshot_interval"],), daemon=True)
+        reporter.start()
+
+        # Anything from the coordinator now means stop, as does losing the connection
+        recv_message(self.sock)
+        stopped_locally = self.stop_event.is_set()
+        self.stop_event.set()
+        reporter.join()
+
+        shard, self.shard = self.shard, None
+        shard.stop()
+        if stopped_locally:
+            return
+        send_message(self.sock, {
+            "type": FINAL,
+            "snapshot": shard.metrics.snapshot(),
+            "phases": shard.metrics.phase_breakdown()
+        })
+        logger.info(f"[{self}] sent final metrics, done")
+
+    def _send_snapshots(self, interval: float):
+        while not self.stop_event.wait(interval):
+            try:
+                send_message(self.sock, {"type": SNAPSHOT, "snapshot": self.shard.metrics.snapshot(include_customers=False)})
+            except OSError as e:
+                logger.warning(f"[{self}] failed to send metrics: {e}")
+                return
+
+    def shutdown(self):
+        """
+        Stops the agent without waiting for the coordinator, e.g. on CTRL+C.
+        """
+        self.stop_event.set()
+        if self.sock:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def __repr__(self):
+        return f"<Agent {self.name}>"
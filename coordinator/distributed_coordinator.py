@@ -0,0 +1,180 @@
+import socket
+import threading
+import time
+
+from coordinator.protocol import (ASSIGN, FINAL, HELLO, READY, SNAPSHOT, START, STOP, recv_message,
+                                  send_message)
+from simulator.metrics import MetricsTracker, merge_snapshots
+from util.log import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_DISTRIBUTED_CONFIG = {
+    "host": "0.0.0.0",               # coordinator listen address
+    "port": 7700,
+    "agents": 2,                     # agents to wait for before starting
+    "snapshot_interval_seconds": 2,  # how often agents send their metrics
+    "start_delay_seconds": 2         # every agent starts generating this long after the last one is ready
+}
+
+
+def load_distributed_config(config: dict | None) -> dict:
+    distributed_config = dict(DEFAULT_DISTRIBUTED_CONFIG)
+    distributed_config.update(config or {})
+    if distributed_config["agents"] < 1:
+        raise ValueError(f"distributed agents must be at least 1, got {distributed_config['agents']}")
+    return distributed_config
+
+
+class DistributedCoordinator:
+    """
+    Runs the simulator across agent processes on any number of hosts, connected over TCP (see coordinator.protocol).
+    Once 'agents' agents have connected, each is assigned a shard (the customers whose user_id hashes to it,
+    and its share of the rate), and all of them start generating at the same time once every pool is ready.
+    Agents send metrics snapshots every few seconds, snapshot() merges the latest of each for the live reporter,
+    and their final metrics and phase breakdowns are merged into self.metrics at shutdown.
+    """
+    def __init__(self, worker_pool_config: dict, action_generator_config: dict, config: dict | None):
+        self.worker_pool_config = worker_pool_config
+        self.action_generator_config = action_generator_config
+        self.config = load_distributed_config(config)
+        self.agent_count = self.config["agents"]
+
+        self.lock = threading.Lock()
+        self.server = None
+        self.agents = []    # (name, socket), by shard index
+        self.latest = {}    # shard index -> latest snapshot
+        self.finals = {}    # shard index -> final snapshot
+        self.phases = {}    # shard index -> final phase breakdown
+        self.started = threading.Event()
+        self.finished = threading.Event()
+        self.shutdown_event = threading.Event()
+
+        self.metrics = MetricsTracker()
+
+    def run(self):
+        self.server = socket.create_server((self.config["host"], self.config["port"]))
+        logger.info(f"[{self}] waiting for {self.agent_count} agents on {self.config['host']}:{self.config['port']}...")
+        threading.Thread(target=self._start_agents, daemon=True).start()
+
+    def _start_agents(self):
+        try:
+            while len(self.agents) < self.agent_count:
+                sock, address = self.server.accept()
+                hello = recv_message(sock)
+                if not hello or hello["type"] != HELLO:
+                    sock.close()
+                    continue
+                with self.lock:
+                    self.agents.append((hello["agent"], sock))
+                logger.info(f"[{self}] agent {hello['agent']} connected from {address[0]} "
+                            f"({len(self.agents)}/{self.agent_count})")
+
+            for shard_index, (_, sock) in enumerate(self.agents):
+                send_message(sock, {
+                    "type": ASSIGN,
+                    "shard_index": shard_index,
+                    "shard_count": self.agent_count,
+                    "worker_pool": self.worker_pool_config,
+                    "generator": self.action_generator_config,
+                    "snapshot_interval": self.config["snapshot_interval_seconds"]
+                })
+
+            # Customers are loaded before the start time is picked, so no agent starts late
+            for name, sock in self.agents:
+                ready = recv_message(sock)
+                if not ready or ready["type"] != READY:
+                    raise ConnectionError(f"agent {name} disconnected before it was ready")
+
+            start_at = time.time() + self.config["start_delay_seconds"]
+            for _, sock in self.agents:
+                send_message(sock, {"type": START, "start_at": start_at})
+            logger.info(f"[{self}] all {self.agent_count} agents ready, starting in {self.config['start_delay_seconds']}s")
+
+            for shard_index, (name, sock) in enumerate(self.agents):
+                threading.Thread(target=self._read_agent, args=(shard_index, name, sock), daemon=True).start()
+            self.started.set()
+        except Exception as e:
+            if not self.shutdown_event.is_set():
+                logger.error(f"[{self}] failed to start agents: {e}")
+
+    def _read_agent(self, shard_index: int, name: str, sock: socket.socket):
+        while True:
+            try:
+                message = recv_message(sock)
+            except OSError:
+                message = None
+
+            if message is None:
+                if not self.shutdown_event.is_set():
+                    logger.warning(f"[{self}] agent {name} disconnected, keeping its last metrics")
+                self._agent_done(shard_index)
+                return
+
+            if message["type"] == SNAPSHOT:
+                with self.lock:
+                    self.latest[shard_index] = message["snapshot"]
+            elif message["type"] == FINAL:
+                with self.lock:
+                    self.finals[shard_index] = message["snapshot"]
+                    self.phases[shard_index] = message["phases"]
+                logger.info(f"[{self}] merged final metrics from agent {name}")
+                self._agent_done(shard_index)
+                return
+
+    def _agent_done(self, shard_index: int):
+        with self.lock:
+            self.finals.setdefault(shard_index, self.latest.get(shard_index))
+            if len(self.finals) == len(self.agents):
+                self.finished.set()
+
+    def snapshot(self) -> dict:
+        """
+        Returns the latest metrics of every agent merged into one snapshot, the live reporter's snapshot_source.
+        """
+        with self.lock:
+            snapshots = list(self.latest.values())
+        return merge_snapshots(snapshots)
+
+    def shutdown(self, timeout: float = 15):
+        """
+        Stops every agent and merges their final metrics into self.metrics.
+        """
+        logger.info(f"[{self}] stopping agents...")
+        self.shutdown_event.set()
+
+        with self.lock:
+            agents = list(self.agents)
+        for name, sock in agents:
+            try:
+                send_message(sock, {"type": STOP})
+            except OSError as e:
+                logger.warning(f"[{self}] failed to stop agent {name}: {e}")
+
+        # Agents that never started have no metrics to wait for
+        if self.started.is_set() and not self.finished.wait(timeout):
+            logger.warning(f"[{self}] timed out waiting for final agent metrics, using their last snapshots")
+
+        with self.lock:
+            for shard_index in range(len(agents)):
+                snapshot = self.finals.get(shard_index) or self.latest.get(shard_index)
+                if snapshot:
+                    self.metrics.merge(snapshot)
+                self.metrics.merge_phases(self.phases.get(shard_index, []))
+
+        if self.server:
+            # Wakes up an accept() still waiting for agents
+            try:
+                self.server.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.server.close()
+        for _, sock in agents:
+            sock.close()
+
+    def display_summary(self):
+        print(f"===== Merged Metrics from {len(self.agents)} agents =====")
+        self.metrics.display_summary()
+
+    def __repr__(self):
+        return "<DistributedCoordinator>"
@@ -0,0 +1,48 @@
+import json
+import socket
+import struct
+
+# Every message is a JSON object prefixed with its length as a 4 byte big-endian integer.
+# Plain json rather than the request body codec: snapshots have integer keys (user ids, histogram buckets)
+LENGTH_PREFIX = struct.Struct(">I")
+MAX_MESSAGE_BYTES = 256 * 1024 * 1024
+
+# Message types, in the order a run goes through them
+HELLO    = "hello"     # agent -> coordinator : {agent}
+ASSIGN   = "assign"    # coordinator -> agent : {shard_index, shard_count, worker_pool, generator, snapshot_interval}
+READY    = "ready"     # agent -> coordinator : worker pool is up, customers loaded
+START    = "start"     # coordinator -> agent : {start_at}, wall clock time every agent starts generating at
+SNAPSHOT = "snapshot"  # agent -> coordinator : {snapshot}, metrics without per-customer counts
+STOP     = "stop"      # coordinator -> agent
+FINAL    = "final"     # agent -> coordinator : {snapshot, phases}, full metrics once the agent has stopped
+
+
+def send_message(sock: socket.socket, message: dict):
+    data = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    sock.sendall(LENGTH_PREFIX.pack(len(data)) + data)
+
+
+def recv_message(sock: socket.socket) -> dict | None:
+    """
+    Returns the next message, or None once the other side has closed the connection.
+    """
+    header = _recv_exactly(sock, LENGTH_PREFIX.size)
+    if header is None:
+        return None
+    (length,) = LENGTH_PREFIX.unpack(header)
+    if length > MAX_MESSAGE_BYTES:
+        raise ValueError(f"Message of {length} bytes is larger than {MAX_MESSAGE_BYTES}")
+    data = _recv_exactly(sock, length)
+    if data is None:
+        return None
+    return json.loads(data)
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes | None:
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = sock.recv(min(size - len(buffer), 1 << 20))
+        if not chunk:
+            return None
+        buffer += chunk
+    return bytes(buffer)
@@ -0,0 +1,137 @@
+import signal
+import threading
+
+from generator.arrival_source import create_generator
+from simulator.action_config_loader import load_actions_config
+from simulator.action_registry import ActionRegistry
+from simulator.engine import create_worker_pool
+from simulator.metrics import MetricsTracker
+from simulator.trace import TraceRecorder
+from util import json_codec, seeding
+from util.log import get_logger, setup_logging, shutdown_logging
+
+logger = get_logger(__name__)
+
+
+def shard_configs(worker_pool_config: dict, action_generator_config: dict, shard_index: int, shard_count: int):
+    """
+    Returns copies of the worker pool and generator configs for one shard.
+    The shard only loads its own customers and generates its share of the total rate.
+    """
+    pool_config = dict(worker_pool_config)
+    pool_config["shard_index"] = shard_index
+    pool_config["shard_count"] = shard_count
+
+    generator_config = dict(action_generator_config)
+    generator_config["generate_rate"] = action_generator_config.get("generate_rate", 1) / shard_count
+    # Seeded shards each draw their own arrival stream, ingested traces are split between the shards
+    generator_config["shard_index"] = shard_index
+    generator_config["shard_count"] = shard_count
+
+    # Every shard records its own trace file, a replay reads all of them back
+    trace = action_generator_config.get("trace")
+    if trace and trace.get("record"):
+        generator_config["trace"] = {**trace, "record": f"{trace['record']}.shard{shard_index}"}
+
+    # Every shard runs its share of every phase's rate
+    phases = action_generator_config.get("phases")
+    if phases:
+        generator_config["phases"] = [
+            {key: value / shard_count if key in ("rate", "start_rate", "end_rate", "peak_rate") else value
+             for key, value in phase.items()}
+            for phase in phases
+        ]
+
+    # Every shard searches for its share of the capacity
+    controller = action_generator_config.get("controller")
+    if controller:
+        generator_config["controller"] = dict(controller)
+        for key in ("start_rate", "max_rate", "step", "increase"):
+            if key in controller:
+                generator_config["controller"][key] = controller[key] / shard_count
+
+    return pool_config, generator_config
+
+
+class Shard:
+    """
+    One shard's worker pool and action generator, for the shard's customers and share of the rate.
+    Runs inside a sharded process (run_shard) or a distributed agent.
+    """
+    def __init__(self, shard_index: int, shard_count: int, action_definition_path: str, worker_pool_config: dict,
+                 action_generator_config: dict):
+        self.shard_index = shard_index
+        self.pool_config, self.generator_config = shard_configs(worker_pool_config, action_generator_config,
+                                                                shard_index, shard_count)
+
+        json_codec.configure(self.pool_config.get("json_codec", "auto"))
+        seeding.configure(self.generator_config.get("seed"))
+
+        # Behaviour modules can't be pickled, so every shard loads its own registry
+        self.registry = ActionRegistry()
+        self.registry.register_all(load_actions_config(action_definition_path))
+
+        self.metrics = MetricsTracker()
+
+        trace_config = self.generator_config.get("trace") or {}
+        self.recorder = None
+        if trace_config.get("record"):
+            self.recorder = TraceRecorder(trace_config["record"], self.registry.names())
+
+        self.pool = None
+        self.generator = None
+
+    def start_pool(self):
+        self.pool = create_worker_pool(self.pool_config, self.metrics, self.registry, self.recorder)
+        self.pool.run()
+
+    def start_generator(self):
+        if not len(self.pool.customers):
+            logger.info(f"[Shard {self.shard_index}] has no customers, nothing to generate")
+            return
+        self.generator = create_generator(self.pool, self.generator_config, self.metrics, self.registry.names())
+        threading.Thread(target=self.generator.run, daemon=True).start()
+
+    def stop(self):
+        logger.info(f"[Shard {self.shard_index}] stopping...")
+        # Stop generating first, so nothing is queued for workers that are stopping
+        if self.generator:
+            self.generator.shutdown()
+        if self.pool:
+            self.pool.shutdown()
+        if self.recorder:
+            self.recorder.close()
+
+        if self.generator and self.generator.controller:
+            result = self.generator.controller.result()
+            logger.info(f"[Shard {self.shard_index}] capacity search: knee {result['knee_rate']}/s, "
+                        f"max sustained {result['max_sustained_rate']}/s")
+
+        for phase in self.metrics.phase_breakdown():
+            logger.info(f"[Shard {self.shard_index}] phase '{phase['name']}': {phase['rps']:.1f} rps, "
+                        f"errors {phase['error_rate'] * 100:.2f}%")
+
+
+def run_shard(shard_index: int, shard_count: int, action_definition_path: str, worker_pool_config: dict,
+              action_generator_config: dict, stop_event, results, logging_config: dict = None):
+    """
+    Process entry point for a single shard. Runs a worker pool and action generator for the shard's
+    customers until stop_event is set, then puts (shard_index, metrics snapshot, phase breakdown) on the results queue.
+    """
+    # The coordinator owns shutdown, so ignore the CTRL+C sent to the whole process group
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # Spawned processes start without logging, set it up before anything logs
+    setup_logging(logging_config)
+
+    logger.info(f"[Shard {shard_index}] starting...")
+
+    shard = Shard(shard_index, shard_count, action_definition_path, worker_pool_config, action_generator_config)
+    shard.start_pool()
+    shard.start_generator()
+
+    stop_event.wait()
+
+    shard.stop()
+    results.put((shard_index, shard.metrics.snapshot(), shard.metrics.phase_breakdown()))
+    shutdown_logging()
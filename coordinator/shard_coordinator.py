@@ -0,0 +1,78 @@
+import multiprocessing
+
+from coordinator.shard import run_shard
+from simulator.metrics import MetricsTracker
+from util.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class ShardCoordinator:
+    """
+    Runs the simulator as N worker processes, each owning the customers whose user_id hashes to its shard.
+    Splits the generate rate evenly across shards and merges per-shard metrics and phase breakdowns at shutdown.
+    """
+    def __init__(self, shard_count: int, action_definition_path: str, worker_pool_config: dict,
+                 action_generator_config: dict, logging_config: dict = None):
+        self.shard_count = shard_count
+        self.action_definition_path = action_definition_path
+        self.worker_pool_config = worker_pool_config
+        self.action_generator_config = action_generator_config
+        self.logging_config = logging_config
+
+        # Spawn rather than fork, shards must not inherit the parent's threads or locks
+        self.context = multiprocessing.get_context("spawn")
+        self.stop_event = self.context.Event()
+        self.results = self.context.Queue()
+        self.processes = []
+
+        self.metrics = MetricsTracker()
+
+    def run(self):
+        logger.info(f"[{self}] starting {self.shard_count} shards...")
+        for shard_index in range(self.shard_count):
+            process = self.context.Process(
+                target=run_shard,
+                args=(
+                    shard_index,
+                    self.shard_count,
+                    self.action_definition_path,
+                    self.worker_pool_config,
+                    self.action_generator_config,
+                    self.stop_event,
+                    self.results,
+                    self.logging_config
+                ),
+                daemon=True
+            )
+            process.start()
+            self.processes.append(process)
+
+    def shutdown(self, timeout: float = 10):
+        """
+        Stops every shard and merges their metrics and phase breakdowns into self.metrics.
+        """
+        logger.info(f"[{self}] stopping shards...")
+        self.stop_event.set()
+
+        for _ in self.processes:
+            try:
+                shard_index, snapshot, phases = self.results.get(timeout=timeout)
+            except Exception:
+                logger.warning(f"[{self}] timed out waiting for shard metrics")
+                break
+            self.metrics.merge(snapshot)
+            self.metrics.merge_phases(phases)
+            logger.info(f"[{self}] merged metrics from shard {shard_index}")
+
+        for process in self.processes:
+            process.join(timeout=timeout)
+            if process.is_alive():
+                process.terminate()
+
+    def display_summary(self):
+        print(f"===== Merged Metrics from {self.shard_count} shards =====")
+        self.metrics.display_summary()
+
+    def __repr__(self):
+        return "<ShardCoordinator>"
@@ -1,15 +1,26 @@
-import random
 import threading
 import time
 
+from generator.adaptive_controller import AdaptiveController
+from generator.arrival_scheduler import ArrivalScheduler
+from generator.load_profile import LoadProfile
+from generator.sampling import SELECTION_DISTRIBUTIONS, make_sampler, zipf_weights
+from generator.sequence_scheduler import SequenceScheduler
 from generator.worker import Worker
 from queue import Queue
 from simulator.customer_worker_pool import CustomerWorkerPool
+from simulator.metrics import MetricsTracker
+from util import seeding
+from util.log import get_logger
+
+logger = get_logger(__name__)
 
 class ActionGenerator:
-    def __init__(self, user_ids: list[int], customer_worker_pool: CustomerWorkerPool, config: dict):
+    def __init__(self, user_ids: list[int], customer_worker_pool: CustomerWorkerPool, config: dict,
+                 metrics: MetricsTracker = None):
         self.user_ids = user_ids
         self.customer_worker_pool = customer_worker_pool
+        self.metrics = metrics
 
         self.free_workers = set()
         self.busy_workers = set()
@@ -19,6 +30,29 @@ class ActionGenerator:
         self.shutdown_event = threading.Event()
 
         self._load_test_script(config)
+        self._build_samplers()
+
+        # Pools report how full their action queues are, arrivals are thinned out as they fill up
+        self.pool_load = getattr(customer_worker_pool, "load", None)
+        self.throttle_credit = 0.0
+
+        self.sequence_scheduler = None
+        if self.sequence_executor == "scheduler":
+            self.sequence_scheduler = SequenceScheduler(customer_worker_pool, self.shutdown_event)
+
+        # Created by run(), the adaptive controller changes its rate while the generator runs
+        self.arrival_scheduler = None
+
+        self.controller = None
+        controller_config = config.get("controller") or {}
+        if controller_config.get("enabled"):
+            if metrics is None:
+                raise ValueError("The adaptive controller needs a MetricsTracker to measure the SLO")
+            if self.profile:
+                raise ValueError("The adaptive controller and load profile phases can't be used together")
+            self.controller = AdaptiveController(self, metrics, controller_config)
+
+        self.next_phase_mark = None
 
     def _load_test_script(self, config: dict):
         self.min_workers = config.get("min_workers", 3)
@@ -26,6 +60,31 @@ class ActionGenerator:
         self.keep_alive = config.get("keep_alive", 5)
         self.generate_rate = config.get("generate_rate", 1)
         self.sequences = config.get("sequences", [])
+        # Every random choice comes from one generator, seeded from the run's seed (and the shard) when one is set
+        self.rng = seeding.make_rng("generator", config.get("shard_index", 0))
+
+        # Timed phases replace the constant generate_rate, each with its own sequence mix
+        self.profile = LoadProfile(config["phases"], self.sequences, self.rng) if config.get("phases") else None
+
+        # Hot customers: 'zipf' makes the customer at rank r (in customer file order) 1 / r ** exponent as likely
+        selection = config.get("customer_selection") or {}
+        self.customer_distribution = selection.get("distribution", "uniform")
+        self.zipf_exponent = selection.get("zipf_exponent", 1.0)
+        if self.customer_distribution not in SELECTION_DISTRIBUTIONS:
+            raise ValueError(f"Unknown customer_selection distribution '{self.customer_distribution}', "
+                             f"expected one of {SELECTION_DISTRIBUTIONS}")
+
+        # 'workers' runs each sequence on a pooled thread, 'scheduler' runs every sequence from one timer thread
+        self.sequence_executor = config.get("sequence_executor", "workers")
+        if self.sequence_executor not in ("workers", "scheduler"):
+            raise ValueError(f"Unknown sequence_executor '{self.sequence_executor}', expected 'workers' or 'scheduler'")
+
+        arrival = config.get("arrival", {})
+        self.distribution = arrival.get("distribution", "constant")
+        self.burst_size = arrival.get("burst_size", 1)
+        self.tick = arrival.get("tick_ms", 1) / 1000
+        self.late_threshold = arrival.get("late_threshold_ms", 10) / 1000
+        self.throttle_at = arrival.get("throttle_at", 0.8)
 
     def _start_worker(self):
         queue  = Queue()
@@ -36,7 +95,7 @@ class ActionGenerator:
         self.free_workers.add(worker)
         self.all_workers.add(worker)
 
-    def _assign_work(self, user_id: int, sequence: dict):
+    def _assign_work(self, user_id: int, sequence: dict, intended_time: float = None):
         if not self.free_workers:
             return False
 
@@ -44,7 +103,8 @@ class ActionGenerator:
         self.busy_workers.add(worker)
         worker.queue.put({
             "user_id": user_id,
-            "sequence": sequence
+            "sequence": sequence,
+            "intended_time": intended_time
         })
         worker.last_used = time.time()
 
@@ -61,47 +121,205 @@ class ActionGenerator:
         with self.lock:
             expired = [w for w in self.free_workers if now - w.last_used > self.keep_alive]
             for w in expired:
-                print(f"[{self}] Shutting down idle worker: {w}")
+                logger.debug(f"[{self}] Shutting down idle worker: {w}")
                 self.free_workers.remove(w)
                 self.all_workers.remove(w)
                 w.active = False
 
+    def _build_samplers(self):
+        # Built once, every arrival is then an O(1) alias table lookup
+        customer_weights = None
+        if self.customer_distribution == "zipf":
+            customer_weights = zipf_weights(len(self.user_ids), self.zipf_exponent)
+        self.customer_sampler = make_sampler(customer_weights, len(self.user_ids), self.rng)
+
+        self.sequence_actions = [sequence["actions"] for sequence in self.sequences]
+        sequence_weights = [sequence.get("weight", 1) for sequence in self.sequences]
+        self.sequence_sampler = make_sampler(sequence_weights, len(self.sequences), self.rng)
+
+    def _choose_batch(self, intended_times: list[float]) -> tuple[list[int], list[list]]:
+        """
+        Picks a customer and a sequence for every arrival, sampled as one batch.
+        """
+        count = len(intended_times)
+        user_ids = self.user_ids
+        users = [user_ids[index] for index in self.customer_sampler.sample_batch(count)]
+
+        if self.profile:
+            first = self.profile.phase_at(intended_times[0])
+            if first is not None and first is self.profile.phase_at(intended_times[-1]):
+                return users, first.choose_batch(count)
+            phases = [self.profile.phase_at(intended_time) for intended_time in intended_times]
+            if None not in phases:
+                return users, [phase.choose_sequence() for phase in phases]
+
+        actions = self.sequence_actions
+        return users, [actions[index] for index in self.sequence_sampler.sample_batch(count)]
+
+    def _mark_phase(self, now: float):
+        """
+        Tags the phase that has just started in the metrics, so every phase gets its own breakdown.
+        """
+        phase = self.profile.phase_at(now)
+        if self.metrics:
+            self.metrics.mark_phase(phase.name if phase else None)
+
+        if phase is None:
+            logger.info(f"[{self}] Load profile finished after {self.profile.duration}s, no more sequences are generated")
+            self.next_phase_mark = float("inf")
+            return
+
+        logger.info(f"[{self}] Entering phase '{phase.name}' ({phase.shape}, {phase.duration}s)")
+        self.next_phase_mark = phase.end
+
+    def _throttle(self, count: int) -> int:
+        """
+        Returns how many of 'count' due arrivals to dispatch. Once the worker pool's queues are 'throttle_at'
+        full, the share of arrivals dispatched falls linearly, to none when the queues are full.
+        """
+        if not self.pool_load or not self.throttle_at:
+            return count
+
+        load = self.pool_load()
+        if load < self.throttle_at:
+            self.throttle_credit = 0.0
+            return count
+
+        share = (1 - load) / (1 - self.throttle_at) if self.throttle_at < 1 else 0.0
+        self.throttle_credit += count * share
+        keep = min(count, int(self.throttle_credit))
+        self.throttle_credit -= keep
+        return keep
+
+    def _dispatch_batch(self, intended_times: list[float], now: float):
+        """
+        Hands every due arrival to a worker. Arrivals that find no free worker are counted as dropped,
+        arrivals sent later than the late threshold are counted as late,
+        arrivals held back because the worker pool is overloaded are counted as throttled.
+        """
+        scheduled = len(intended_times)
+        keep = self._throttle(scheduled)
+        throttled = scheduled - keep
+        if throttled:
+            intended_times = intended_times[:keep]
+
+        if self.sequence_scheduler:
+            self._schedule_batch(intended_times, now, scheduled, throttled)
+            return
+
+        dispatched = dropped = late = 0
+        total_lag = max_lag = 0.0
+
+        users, sequences = self._choose_batch(intended_times) if intended_times else ([], [])
+
+        with self.lock:
+            for intended_time, user_id, sequence in zip(intended_times, users, sequences):
+                # Either assign work to a free worker, spin up a new worker, or drop the arrival
+                if not self.free_workers and len(self.all_workers) < self.max_workers:
+                    self._start_worker()
+
+                if not self._assign_work(user_id, sequence, intended_time):
+                    dropped += 1
+                    continue
+
+                lag = now - intended_time
+                dispatched += 1
+                total_lag += lag
+                max_lag = max(max_lag, lag)
+                if lag > self.late_threshold:
+                    late += 1
+
+        if self.metrics:
+            self.metrics.log_arrivals(scheduled, dispatched, dropped, late, total_lag, max_lag, throttled)
+
+    def _schedule_batch(self, intended_times: list[float], now: float, scheduled: int, throttled: int = 0):
+        """
+        Hands every due arrival to the sequence scheduler, which never runs out of capacity so no arrival is dropped.
+        Steps that later find their customer's queue full are dropped by the scheduler and counted in the queue stats.
+        """
+        late = 0
+        total_lag = max_lag = 0.0
+
+        users, sequences = self._choose_batch(intended_times) if intended_times else ([], [])
+        batch = list(zip(intended_times, users, sequences))
+
+        for intended_time in intended_times:
+            lag = now - intended_time
+            total_lag += lag
+            max_lag = max(max_lag, lag)
+            if lag > self.late_threshold:
+                late += 1
+
+        self.sequence_scheduler.submit_batch(batch)
+
+        if self.metrics:
+            self.metrics.log_arrivals(scheduled, len(batch), 0, late, total_lag, max_lag, throttled)
+
     def run(self):
-        # Spawn minimum number of workers first
-        print(f"[{self}] Starting with {self.min_workers} workers...")
-        for _ in range(self.min_workers):
-            self._start_worker()
+        if self.sequence_scheduler:
+            logger.info(f"[{self}] Starting sequence scheduler...")
+            threading.Thread(target=self.sequence_scheduler.run, daemon=True).start()
+        else:
+            # Spawn minimum number of workers first
+            logger.info(f"[{self}] Starting with {self.min_workers} workers...")
+            for _ in range(self.min_workers):
+                self._start_worker()
+
+        # Intended send times come from the scheduler, the loop only dispatches whatever is due every tick
+        scheduler = self.arrival_scheduler = ArrivalScheduler(self.generate_rate, self.distribution, self.burst_size,
+                                                              rng=self.rng, profile=self.profile)
+        if self.profile:
+            logger.info(f"[{self}] Running a {len(self.profile.phases)} phase load profile over {self.profile.duration}s "
+                        f"({self.distribution} arrivals)...")
+        else:
+            logger.info(f"[{self}] Generating {self.generate_rate} sequences/s ({self.distribution} arrivals)...")
+
+        next_tick = time.monotonic()
+        next_cleanup = next_tick + 1
+        if self.profile:
+            self.profile.start(next_tick)
+            self.next_phase_mark = next_tick
+        scheduler.start(next_tick)
 
-        # Work out the rate of sequences to generate every second
-        sequence_rate = 1 / self.generate_rate
+        if self.controller:
+            self.controller.start()
 
         while not (self.shutdown_event and self.shutdown_event.is_set()):
-            start_time = time.time()
+            now = time.monotonic()
 
-            # Clean up any idle workers
-            self._terminate_idle_workers()
+            # Clean up any idle workers, once a second is plenty
+            if now >= next_cleanup and not self.sequence_scheduler:
+                self._terminate_idle_workers()
+                next_cleanup = now + 1
 
-            # Choose random user_id & sequence
-            user_id = random.choice(self.user_ids)
-            sequence = random.choice(self.sequences)["actions"]
+            if self.next_phase_mark is not None and now >= self.next_phase_mark:
+                self._mark_phase(now)
 
-            # Either assign work to a free worker, spin up a new worker, or do nothing
-            # and try again next loop
-            with self.lock:
-                if self.free_workers:
-                    self._assign_work(user_id, sequence)
-                elif len(self.all_workers) < self.max_workers:
-                    self._start_worker()
-                    self._assign_work(user_id, sequence)
+            due = scheduler.due(now)
+            if due:
+                self._dispatch_batch(due, now)
+
+            # Sleep until the next tick, skipping ticks we have already overrun
+            next_tick = max(next_tick + self.tick, now)
+            sleep_time = next_tick - time.monotonic()
+            if sleep_time > 0:
+                time.sleep(sleep_time)
 
-            # Make use of elapsed time to stay within the sequence rate
-            elapsed_time = time.time() - start_time
-            sleep_time = max(0.0, sequence_rate - elapsed_time)
-            time.sleep(sleep_time)
+    def set_rate(self, rate: float):
+        """
+        Changes the target rate in sequences/s, safe to call from any thread while the generator runs.
+        """
+        self.generate_rate = rate
+        if self.arrival_scheduler:
+            self.arrival_scheduler.set_rate(rate)
 
     def shutdown(self):
         self.shutdown_event.set()
-        print(f"[{self}] Shutting down WorkGenerator...")
+        if self.controller:
+            self.controller.shutdown()
+        if self.sequence_scheduler:
+            self.sequence_scheduler.shutdown()
+        logger.info(f"[{self}] Shutting down WorkGenerator...")
 
     def __repr__(self):
         return f"<ActionGenerator>"
\ No newline at end of file
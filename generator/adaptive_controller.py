@@ -0,0 +1,174 @@
+import threading
+import time
+
+from simulator.histogram import LatencyHistogram
+from simulator.metrics import MetricsTracker
+from util.log import get_logger
+
+logger = get_logger(__name__)
+
+CONTROLLER_MODES = ["step", "aimd"]
+
+DEFAULT_CONTROLLER_CONFIG = {
+    "enabled": False,
+    "mode": "step",              # step | aimd
+    "start_rate": 10,            # sequences/s the search starts at
+    "max_rate": 10000,           # the rate is never raised above this
+    "interval_seconds": 10,      # how long every rate is held and measured
+    "step": 10,                  # step : sequences/s added after every interval within the SLO
+    "increase": 10,              # aimd : sequences/s added after every interval within the SLO
+    "decrease_factor": 0.5,      # aimd : rate multiplier after an interval that broke the SLO
+    "latency": "corrected",      # corrected (from intended send time) | service (from actual send time)
+    "slo": {
+        "p99_ms": 500,           # p99 latency over the interval must stay at or below this
+        "error_rate": 0.01,      # failed / total requests over the interval must stay at or below this
+        "min_throughput": 0.95   # sequences dispatched / target must stay at or above this
+    }
+}
+
+
+def load_controller_config(config: dict | None) -> dict:
+    controller_config = dict(DEFAULT_CONTROLLER_CONFIG)
+    controller_config.update(config or {})
+    controller_config["slo"] = {**DEFAULT_CONTROLLER_CONFIG["slo"], **(config or {}).get("slo", {})}
+
+    if controller_config["mode"] not in CONTROLLER_MODES:
+        raise ValueError(f"Unknown controller mode '{controller_config['mode']}', expected one of {CONTROLLER_MODES}")
+    if controller_config["latency"] not in ("corrected", "service"):
+        raise ValueError(f"Unknown controller latency '{controller_config['latency']}', expected 'corrected' or 'service'")
+    return controller_config
+
+
+class AdaptiveController:
+    """
+    Closed-loop capacity search. Holds the generator at a rate for an interval, measures p99 latency, error rate and
+    achieved throughput over that interval from MetricsTracker snapshots, and checks them against the SLO:
+    - step : raise the rate by 'step' while the SLO holds, the first rate that breaks it is the knee,
+             after which the rate is held at the highest rate sustained
+    - aimd : raise the rate by 'increase' while the SLO holds, multiply it by 'decrease_factor' when it breaks,
+             so the rate keeps probing around the capacity
+    """
+    def __init__(self, generator, metrics: MetricsTracker, config: dict | None):
+        self.generator = generator
+        self.metrics = metrics
+        self.config = load_controller_config(config)
+
+        self.mode = self.config["mode"]
+        self.interval = self.config["interval_seconds"]
+        self.slo = self.config["slo"]
+        self.latency_key = "corrected" if self.config["latency"] == "corrected" else "latency"
+
+        self.rate = self.config["start_rate"]
+        self.knee_rate = None       # lowest rate that broke the SLO
+        self.max_sustained = None   # highest rate that held the SLO
+        self.settled = False        # step mode stops searching once the knee is found
+        self.history = []           # one entry per interval
+
+        self.shutdown_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        logger.info(f"[AdaptiveController] {self.mode} search from {self.rate}/s, "
+                    f"SLO p99 <= {self.slo['p99_ms']} ms, errors <= {self.slo['error_rate'] * 100:.2f}%")
+        self.generator.set_rate(self.rate)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        previous = self.metrics.snapshot(include_customers=False)
+        previous_time = time.monotonic()
+
+        while not self.shutdown_event.wait(self.interval):
+            now, snapshot = time.monotonic(), self.metrics.snapshot(include_customers=False)
+            try:
+                self._evaluate(self._measure(snapshot, previous, now - previous_time))
+            except Exception as e:
+                logger.warning(f"[AdaptiveController] failed to evaluate interval: {e}")
+            previous, previous_time = snapshot, now
+
+    def _measure(self, snapshot: dict, previous: dict, elapsed: float) -> dict:
+        success = sum(snapshot["success"].values()) - sum(previous["success"].values())
+        failure = sum(snapshot["failure"].values()) - sum(previous["failure"].values())
+
+        latency = LatencyHistogram()
+        for action, data in snapshot[self.latency_key].items():
+            earlier = LatencyHistogram.from_dict(previous[self.latency_key].get(action, {}))
+            latency.merge(LatencyHistogram.from_dict(data).difference(earlier))
+
+        dispatched = snapshot["arrivals"]["dispatched"] - previous["arrivals"]["dispatched"]
+        total = success + failure
+        return {
+            "rate": self.rate,
+            "achieved": dispatched / elapsed if elapsed else 0.0,
+            "rps": total / elapsed if elapsed else 0.0,
+            "requests": total,
+            "error_rate": failure / total if total else 0.0,
+            "p99_ms": latency.percentile(99) * 1000
+        }
+
+    def _within_slo(self, interval: dict) -> bool:
+        # Nothing completing while sequences are being dispatched means the target has stalled
+        return (interval["requests"] > 0
+                and interval["p99_ms"] <= self.slo["p99_ms"]
+                and interval["error_rate"] <= self.slo["error_rate"]
+                and interval["achieved"] >= self.rate * self.slo["min_throughput"])
+
+    def _evaluate(self, interval: dict):
+        if not interval["requests"] and not interval["achieved"]:
+            logger.info(f"[AdaptiveController] nothing dispatched at {self.rate:.1f}/s, holding rate")
+            return
+
+        ok = self._within_slo(interval)
+        interval["within_slo"] = ok
+        self.history.append(interval)
+
+        logger.info(f"[AdaptiveController] rate {self.rate:.1f}/s | achieved {interval['achieved']:.1f}/s | "
+                    f"{interval['rps']:.1f} rps | p99 {interval['p99_ms']:.2f} ms | "
+                    f"errors {interval['error_rate'] * 100:.2f}% | {'ok' if ok else 'SLO breached'}"
+                    f"{'' if interval['requests'] else ' (no requests completed)'}")
+
+        if ok:
+            self.max_sustained = max(self.max_sustained or 0, self.rate)
+        elif self.knee_rate is None or self.rate < self.knee_rate:
+            self.knee_rate = self.rate
+
+        if self.settled:
+            return
+
+        if self.mode == "step":
+            if ok:
+                rate = self.rate + self.config["step"]
+            else:
+                # The knee is found, hold the highest rate that was sustained
+                rate = self.max_sustained or self.config["start_rate"]
+                self.settled = True
+                logger.info(f"[AdaptiveController] knee at {self.knee_rate:.1f}/s, holding {rate:.1f}/s")
+        else:
+            if ok:
+                rate = self.rate + self.config["increase"]
+            else:
+                rate = self.rate * self.config["decrease_factor"]
+
+        self._set_rate(rate)
+
+    def _set_rate(self, rate: float):
+        self.rate = max(0.1, min(rate, self.config["max_rate"]))
+        self.generator.set_rate(self.rate)
+
+    def result(self) -> dict:
+        return {
+            "mode": self.mode,
+            "knee_rate": self.knee_rate,
+            "max_sustained_rate": self.max_sustained,
+            "intervals": list(self.history)
+        }
+
+    def display_summary(self):
+        print("\n===== Capacity Search =====")
+        print(f"  -  mode {self.mode} | {len(self.history)} intervals of {self.interval}s")
+        knee = f"{self.knee_rate:.1f}/s" if self.knee_rate is not None else "not reached"
+        sustained = f"{self.max_sustained:.1f}/s" if self.max_sustained is not None else "none"
+        print(f"  -  knee point {knee} | max sustained rate {sustained}")
+
+    def shutdown(self):
+        self.shutdown_event.set()
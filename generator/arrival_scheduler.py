@@ -0,0 +1,78 @@
+import math
+import random
+
+DISTRIBUTIONS = ["constant", "poisson", "burst"]
+
+class ArrivalScheduler:
+    """
+    Open-loop arrival process. Intended send times are computed from the target rate alone,
+    so a slow dispatch shows up as lag instead of silently lowering the rate.
+    - constant : evenly spaced arrivals
+    - poisson  : exponentially distributed inter-arrival times
+    - burst    : 'burst_size' arrivals at once, bursts spaced to keep the average rate
+    With a LoadProfile the rate follows the profile's phases instead, and no arrivals are due after its end.
+    """
+    def __init__(self, rate: float, distribution: str = "constant", burst_size: int = 1, rng: random.Random = None,
+                 profile=None):
+        if profile is None and rate <= 0:
+            raise ValueError(f"Arrival rate must be positive, got {rate}")
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown arrival distribution '{distribution}', expected one of {DISTRIBUTIONS}")
+
+        self.rate = rate
+        self.distribution = distribution
+        self.burst_size = max(1, int(burst_size))
+        self.rng = rng or random.Random()
+        self.profile = profile
+
+        self.next_time = None
+
+    def set_rate(self, rate: float):
+        """
+        Changes the rate from the next arrival on, the arrival already scheduled keeps its time.
+        """
+        if rate <= 0:
+            raise ValueError(f"Arrival rate must be positive, got {rate}")
+        self.rate = rate
+
+    def start(self, now: float):
+        self.next_time = now
+
+    def _interval(self, rate: float) -> float:
+        if self.distribution == "poisson":
+            return self.rng.expovariate(rate)
+        if self.distribution == "burst":
+            return self.burst_size / rate
+        return 1 / rate
+
+    def _next_after(self, t: float) -> float:
+        if self.profile is None:
+            return t + self._interval(self.rate)
+
+        rate = self.profile.rate_at(t)
+        if not rate:
+            return math.inf
+        interval = self._interval(rate)
+
+        # An interval crossing a phase boundary carries its unused share into the next phase at the new rate
+        boundary = self.profile.boundary_after(t)
+        if t + interval <= boundary:
+            return t + interval
+        next_rate = self.profile.rate_at(boundary)
+        if not next_rate:
+            return math.inf
+        remaining = 1 - (boundary - t) / interval
+        return boundary + remaining * self._interval(next_rate)
+
+    def due(self, now: float) -> list[float]:
+        """
+        Returns the intended send times of every arrival due at or before 'now', oldest first.
+        """
+        times = []
+        while self.next_time <= now:
+            if self.distribution == "burst":
+                times.extend([self.next_time] * self.burst_size)
+            else:
+                times.append(self.next_time)
+            self.next_time = self._next_after(self.next_time)
+        return times
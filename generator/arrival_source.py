@@ -0,0 +1,31 @@
+from generator.action_generator import ActionGenerator
+from generator.trace_ingest import TraceIngest
+from generator.trace_replayer import TraceReplayer
+from simulator.customer_worker_pool import CustomerWorkerPool
+from simulator.metrics import MetricsTracker
+from simulator.trace import read_trace
+
+
+def create_generator(customer_worker_pool: CustomerWorkerPool, config: dict, metrics: MetricsTracker,
+                     action_names: list[str]):
+    """
+    Creates what feeds actions to the worker pool, selected by the test script.
+    - trace.replay set : a TraceReplayer replaying the recorded trace file(s) at trace.replay_speed
+    - ingest.path set  : a TraceReplayer replaying a production access log or JSONL trace at ingest.speed
+    - otherwise        : an ActionGenerator generating sequences at generate_rate (or the load profile's rates)
+    Both are started with run() on their own thread and stopped with shutdown().
+    """
+    trace_config = config.get("trace") or {}
+    if trace_config.get("replay"):
+        return TraceReplayer(read_trace(trace_config["replay"]), customer_worker_pool,
+                             speed=trace_config.get("replay_speed", 1.0), metrics=metrics, action_names=action_names,
+                             reorder_window=trace_config.get("reorder_seconds", 5.0))
+
+    ingest_config = config.get("ingest") or {}
+    if ingest_config.get("path"):
+        ingest = TraceIngest(ingest_config, customer_worker_pool.customers.keys(), action_names,
+                             shard_index=config.get("shard_index", 0), shard_count=config.get("shard_count", 1))
+        return TraceReplayer(ingest, customer_worker_pool, speed=ingest.config["speed"], metrics=metrics,
+                             action_names=action_names, reorder_window=ingest.config["reorder_seconds"])
+
+    return ActionGenerator(customer_worker_pool.customers.keys(), customer_worker_pool, config, metrics)
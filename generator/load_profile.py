@@ -0,0 +1,147 @@
+import math
+import random
+from bisect import bisect_right
+
+from generator.sampling import make_sampler
+
+PHASE_SHAPES = ["constant", "ramp", "exponential", "spike", "step"]
+
+
+class LoadPhase:
+    """
+    One timed phase of a load profile, its rate in sequences/s as a function of the time into the phase:
+    - constant    : 'rate' throughout (plateaus and soaks)
+    - ramp        : linear from 'start_rate' to 'end_rate'
+    - exponential : geometric from 'start_rate' to 'end_rate'
+    - spike       : 'rate', with 'peak_rate' for 'spike_seconds' starting 'spike_at_seconds' into the phase
+    - step        : 'steps' equal steps from 'start_rate' to 'end_rate'
+    Every phase has its own sequence mix from 'sequence_weights' (sequence name -> weight),
+    the sequences' own 'weight' when absent.
+    """
+    __slots__ = ("name", "shape", "duration", "start_rate", "end_rate", "peak_rate", "spike_start", "spike_end",
+                 "steps", "start", "end", "sequences", "sampler")
+
+    def __init__(self, config: dict, sequences: list[dict], index: int, rng: random.Random = None):
+        self.name = config.get("name", f"phase-{index}")
+        self.shape = config.get("shape", "constant")
+        if self.shape not in PHASE_SHAPES:
+            raise ValueError(f"Phase '{self.name}' has unknown shape '{self.shape}', expected one of {PHASE_SHAPES}")
+
+        self.duration = config.get("duration_seconds")
+        if not self.duration or self.duration <= 0:
+            raise ValueError(f"Phase '{self.name}' needs a positive duration_seconds")
+
+        rate = config.get("rate")
+        self.start_rate = config.get("start_rate", rate)
+        self.end_rate = config.get("end_rate", self.start_rate)
+        self.peak_rate = config.get("peak_rate", self.start_rate)
+        self.spike_start = config.get("spike_at_seconds", (self.duration - config.get("spike_seconds", 0)) / 2)
+        self.spike_end = self.spike_start + config.get("spike_seconds", 0)
+        self.steps = max(2, int(config.get("steps", 2)))
+        for value in (self.start_rate, self.end_rate, self.peak_rate):
+            if value is None or value <= 0:
+                raise ValueError(f"Phase '{self.name}' rates must be positive")
+
+        self.start = self.end = None  # set on the monotonic clock by LoadProfile.start()
+
+        # Sequence mix, sampled from an alias table
+        weights = config.get("sequence_weights")
+        by_name = {sequence.get("name"): sequence for sequence in sequences}
+        if weights:
+            unknown = set(weights) - set(by_name)
+            if unknown:
+                raise ValueError(f"Phase '{self.name}' weights unknown sequences: {sorted(unknown)}")
+            chosen = [(by_name[name], weight) for name, weight in weights.items() if weight > 0]
+        else:
+            chosen = [(sequence, sequence.get("weight", 1)) for sequence in sequences]
+        if not chosen:
+            raise ValueError(f"Phase '{self.name}' has no sequences to run")
+
+        self.sequences = [sequence["actions"] for sequence, _ in chosen]
+        self.sampler = make_sampler([weight for _, weight in chosen], len(chosen), rng)
+
+    def rate_at(self, offset: float) -> float:
+        """
+        Returns the rate 'offset' seconds into the phase.
+        """
+        if self.shape == "constant":
+            return self.start_rate
+        progress = min(max(offset / self.duration, 0.0), 1.0)
+        if self.shape == "ramp":
+            return self.start_rate + (self.end_rate - self.start_rate) * progress
+        if self.shape == "exponential":
+            return self.start_rate * (self.end_rate / self.start_rate) ** progress
+        if self.shape == "spike":
+            return self.peak_rate if self.spike_start <= offset < self.spike_end else self.start_rate
+        step = min(self.steps - 1, int(progress * self.steps))
+        return self.start_rate + (self.end_rate - self.start_rate) * step / (self.steps - 1)
+
+    def choose_sequence(self) -> list:
+        return self.sequences[self.sampler.sample()]
+
+    def choose_batch(self, count: int) -> list[list]:
+        sequences = self.sequences
+        return [sequences[index] for index in self.sampler.sample_batch(count)]
+
+    def __repr__(self):
+        return f"<LoadPhase {self.name} {self.shape} {self.duration}s>"
+
+
+class LoadProfile:
+    """
+    A sequence of timed LoadPhases, replacing the constant generate_rate. Drives the ArrivalScheduler's rate
+    and the sequence mix of every arrival by its intended send time, so phases switch exactly on their boundary.
+    """
+    def __init__(self, phases: list[dict], sequences: list[dict], rng: random.Random = None):
+        if not phases:
+            raise ValueError("A load profile needs at least one phase")
+        self.phases = [LoadPhase(config, sequences, index, rng) for index, config in enumerate(phases)]
+        self.duration = sum(phase.duration for phase in self.phases)
+        self.starts = []
+        self.end = None
+
+    def start(self, now: float):
+        """
+        Anchors the phases on the monotonic clock, the first phase starts at 'now'.
+        """
+        start = now
+        self.starts = []
+        for phase in self.phases:
+            phase.start = start
+            phase.end = start + phase.duration
+            self.starts.append(start)
+            start = phase.end
+        self.end = start
+
+    def phase_at(self, t: float) -> LoadPhase | None:
+        """
+        Returns the phase running at time t, None before the start or after the last phase.
+        """
+        if t >= self.end:
+            return None
+        index = bisect_right(self.starts, t) - 1
+        return self.phases[index] if index >= 0 else None
+
+    def rate_at(self, t: float) -> float | None:
+        phase = self.phase_at(t)
+        return phase.rate_at(t - phase.start) if phase else None
+
+    def boundary_after(self, t: float) -> float:
+        """
+        Returns the time the rate next changes abruptly after t: the end of the phase, or of a spike or step in it.
+        """
+        phase = self.phase_at(t)
+        if phase is None:
+            return math.inf
+
+        offset = t - phase.start
+        if phase.shape == "spike":
+            for edge in (phase.spike_start, phase.spike_end):
+                if offset < edge < phase.duration:
+                    return phase.start + edge
+        elif phase.shape == "step":
+            step_length = phase.duration / phase.steps
+            next_step = (math.floor(offset / step_length) + 1) * step_length
+            if next_step < phase.duration:
+                return phase.start + next_step
+        return phase.end
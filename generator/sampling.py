@@ -0,0 +1,106 @@
+import random
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, batches are then sampled in plain Python
+    np = None
+
+SELECTION_DISTRIBUTIONS = ["uniform", "zipf"]
+
+# Below this many samples a Python loop beats the overhead of a NumPy call
+NUMPY_BATCH_THRESHOLD = 64
+
+
+class UniformSampler:
+    """
+    Picks indexes 0..n-1 with equal probability.
+    """
+    def __init__(self, n: int, rng: random.Random = None):
+        if n <= 0:
+            raise ValueError("Can't sample from an empty population")
+        self.n = n
+        self.rng = rng or random.Random()
+        self.np_rng = np.random.default_rng(self.rng.getrandbits(64)) if np is not None else None
+
+    def sample(self) -> int:
+        return int(self.rng.random() * self.n)
+
+    def sample_batch(self, k: int) -> list[int]:
+        if self.np_rng is not None and k >= NUMPY_BATCH_THRESHOLD:
+            return self.np_rng.integers(self.n, size=k).tolist()
+        rand, n = self.rng.random, self.n
+        return [int(rand() * n) for _ in range(k)]
+
+
+class AliasSampler:
+    """
+    Picks indexes 0..n-1 proportionally to their weights in O(1) per sample with Vose's alias method.
+    The table is built once in O(n), every sample is then one random number, a multiply and a comparison.
+    """
+    def __init__(self, weights: list[float], rng: random.Random = None):
+        n = len(weights)
+        if n == 0:
+            raise ValueError("Can't sample from an empty population")
+        total = float(sum(weights))
+        if total <= 0 or min(weights) < 0:
+            raise ValueError("Weights must be non-negative with a positive sum")
+
+        self.n = n
+        self.rng = rng or random.Random()
+        self.np_rng = np.random.default_rng(self.rng.getrandbits(64)) if np is not None else None
+
+        # Split every weight into a share of its own bucket and an alias to a heavier bucket
+        scaled = [weight * n / total for weight in weights]
+        prob = [1.0] * n
+        alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            prob[less] = scaled[less]
+            alias[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Whatever is left over is full up to rounding errors
+
+        self.prob = prob
+        self.alias = alias
+        if self.np_rng is not None:
+            self.np_prob = np.asarray(prob)
+            self.np_alias = np.asarray(alias)
+
+    def sample(self) -> int:
+        # One random number picks the bucket (integer part) and the coin flip within it (fraction)
+        u = self.rng.random() * self.n
+        i = int(u)
+        return i if u - i < self.prob[i] else self.alias[i]
+
+    def sample_batch(self, k: int) -> list[int]:
+        if self.np_rng is not None and k >= NUMPY_BATCH_THRESHOLD:
+            u = self.np_rng.random(k) * self.n
+            i = u.astype(np.int64)
+            return np.where(u - i < self.np_prob[i], i, self.np_alias[i]).tolist()
+
+        rand, n, prob, alias = self.rng.random, self.n, self.prob, self.alias
+        picks = []
+        for _ in range(k):
+            u = rand() * n
+            i = int(u)
+            picks.append(i if u - i < prob[i] else alias[i])
+        return picks
+
+
+def zipf_weights(n: int, exponent: float = 1.0) -> list[float]:
+    """
+    Returns Zipfian weights for ranks 1..n, rank r is picked proportionally to 1 / r ** exponent.
+    """
+    return [1.0 / rank ** exponent for rank in range(1, n + 1)]
+
+
+def make_sampler(weights: list[float] | None, n: int, rng: random.Random = None):
+    """
+    Returns an AliasSampler for the weights, or a UniformSampler over n items when they are all equal or absent.
+    """
+    if weights is None or len(set(weights)) <= 1:
+        return UniformSampler(n, rng)
+    return AliasSampler(weights, rng)
@@ -0,0 +1,99 @@
+import heapq
+import itertools
+import threading
+import time
+
+from simulator.customer_worker_pool import CustomerWorkerPool
+from util.log import get_logger
+
+logger = get_logger(__name__)
+
+class SequenceScheduler:
+    """
+    Drives any number of in-flight action sequences from a single thread.
+    Each pending step is a small (due_time, order, user_id, actions, index) tuple in a heap, and is
+    dispatched to the CustomerWorkerPool when due, so think-time delays no longer hold a thread.
+    Dispatching never waits for queue room, as that would stall every other sequence: a step that finds its
+    customer's queue full is dropped (counted in the queue stats) and the rest of its sequence with it,
+    as is the rest of a sequence whose step failed to dispatch.
+    """
+    def __init__(self, customer_pool: CustomerWorkerPool, shutdown_event: threading.Event = None):
+        self.customer_pool = customer_pool
+        self.shutdown_event = shutdown_event or threading.Event()
+
+        self.heap = []
+        self.order = itertools.count()  # tie-breaker so steps due at the same time keep submit order
+        self.condition = threading.Condition()
+        self.dropped = 0    # sequences cut short because a step couldn't be queued
+
+    def submit_batch(self, batch: list[tuple[float, int, list]]):
+        """
+        Schedules sequences as (start_time, user_id, actions) tuples, start_time is on the time.monotonic() clock.
+        """
+        with self.condition:
+            for start_time, user_id, actions in batch:
+                heapq.heappush(self.heap, (start_time, next(self.order), user_id, actions, 0))
+            self.condition.notify()
+
+    def submit(self, user_id: int, actions: list, start_time: float = None):
+        self.submit_batch([(start_time if start_time is not None else time.monotonic(), user_id, actions)])
+
+    def pending(self) -> int:
+        """
+        Number of sequences currently in flight.
+        """
+        return len(self.heap)
+
+    def _pop_due(self) -> list[tuple]:
+        # Waits until at least one step is due, then pops every due step
+        with self.condition:
+            while not self.shutdown_event.is_set():
+                now = time.monotonic()
+                if self.heap and self.heap[0][0] <= now:
+                    due = []
+                    while self.heap and self.heap[0][0] <= now:
+                        due.append(heapq.heappop(self.heap))
+                    return due
+
+                timeout = self.heap[0][0] - now if self.heap else 1
+                self.condition.wait(timeout)
+            return []
+
+    def run(self):
+        try:
+            while not self.shutdown_event.is_set():
+                rescheduled = []
+                for due_time, _, user_id, actions, index in self._pop_due():
+                    action = actions[index]
+                    try:
+                        if not self.customer_pool.dispatch_action(user_id, action["name"], due_time, block=False):
+                            # Later steps assume this one was sent (e.g. CancelOrder after PlaceOrder)
+                            self.dropped += 1
+                            continue
+                    except Exception as e:
+                        logger.warning(f"[{self}] failed to dispatch '{action['name']}' for user {user_id}: {e}")
+                        self.dropped += 1
+                        continue
+
+                    # The next step is due 'delay' after this step was meant to run, so delays don't drift
+                    if index + 1 < len(actions):
+                        next_time = due_time + action.get("delay", 0)
+                        rescheduled.append((next_time, next(self.order), user_id, actions, index + 1))
+
+                if rescheduled:
+                    with self.condition:
+                        for step in rescheduled:
+                            heapq.heappush(self.heap, step)
+
+            if self.dropped:
+                logger.info(f"[{self}] {self.dropped} sequences were cut short, a step couldn't be queued")
+        except Exception as e:
+            logger.error(f"[{self}] crashed: {e}")
+
+    def shutdown(self):
+        self.shutdown_event.set()
+        with self.condition:
+            self.condition.notify()
+
+    def __repr__(self):
+        return "<SequenceScheduler>"
@@ -0,0 +1,202 @@
+import calendar
+import re
+import zlib
+from datetime import datetime
+
+from util import json_codec
+from util.log import get_logger
+
+logger = get_logger(__name__)
+
+INGEST_FORMATS = ["jsonl", "access_log"]
+USER_MAPPINGS = ["direct", "hash"]
+
+DEFAULT_INGEST_CONFIG = {
+    "path": None,
+    "format": "jsonl",          # one of INGEST_FORMATS
+    "speed": 1.0,               # 2.0 replays twice as fast
+    "user_mapping": "hash",     # one of USER_MAPPINGS
+    "reorder_seconds": 5.0,     # logs are written as requests finish, records are reordered within this window
+    # jsonl : keys of a record's fields, 'action' names the action directly, otherwise 'method' and 'path' are routed
+    "fields": {
+        "timestamp": "timestamp",
+        "user_id": "user_id",
+        "action": "action",
+        "method": "method",
+        "path": "path"
+    },
+    # "METHOD path" regex -> action name, the first match wins. A (?P<user_id>...) group picks out the user
+    "routes": []
+}
+
+# Common / combined log format : host ident authuser [timestamp] "METHOD path protocol" status ...
+ACCESS_LOG_PATTERN = re.compile(rb'^\S+ \S+ (\S+) \[([^\]]+)\] "(\S+) (\S+)[^"]*"')
+
+MONTHS = {month: index for index, month in enumerate(
+    ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"], start=1)}
+
+READ_BUFFER = 1 << 20
+
+
+def load_ingest_config(config: dict | None) -> dict:
+    ingest_config = dict(DEFAULT_INGEST_CONFIG)
+    ingest_config.update(config or {})
+    ingest_config["fields"] = {**DEFAULT_INGEST_CONFIG["fields"], **(ingest_config.get("fields") or {})}
+    if ingest_config["format"] not in INGEST_FORMATS:
+        raise ValueError(f"Unknown ingest format '{ingest_config['format']}', expected one of {INGEST_FORMATS}")
+    if ingest_config["user_mapping"] not in USER_MAPPINGS:
+        raise ValueError(f"Unknown ingest user_mapping '{ingest_config['user_mapping']}', expected one of {USER_MAPPINGS}")
+    return ingest_config
+
+
+def parse_log_time(text: str) -> float:
+    """
+    Parses an access log timestamp ('10/Oct/2000:13:55:36 -0700') to epoch seconds, much faster than strptime.
+    """
+    seconds = calendar.timegm((int(text[7:11]), MONTHS[text[3:6]], int(text[0:2]),
+                               int(text[12:14]), int(text[15:17]), int(text[18:20])))
+    zone = text[21:]
+    if zone:
+        offset = int(zone[1:3]) * 3600 + int(zone[3:5]) * 60
+        seconds -= offset if zone[0] == "+" else -offset
+    return seconds
+
+
+def parse_timestamp(value) -> float:
+    """
+    Returns epoch seconds for a JSONL timestamp, either a number or an ISO 8601 string.
+    """
+    if isinstance(value, (int, float)):
+        return value
+    return datetime.fromisoformat(value).timestamp()
+
+
+class TraceIngest:
+    """
+    Streams (offset, user_id, action_name) records out of a production access log or JSONL trace, for the
+    TraceReplayer. The file is read line by line, so traces of any size use constant memory.
+    Users are mapped onto the simulated customers with 'user_mapping':
+    - direct : the trace's user ids are customer user ids, records for other customers are skipped
+    - hash   : any user id (or name) is spread onto the customers, a user always maps to the same customer
+    Records whose action can't be resolved to a registered action are skipped and counted.
+    """
+    def __init__(self, config: dict, user_ids, action_names: list[str], shard_index: int = 0, shard_count: int = 1):
+        self.config = load_ingest_config(config)
+        self.path = self.config["path"]
+        self.user_ids = user_ids
+        self.action_names = set(action_names)
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+
+        self.routes = [(re.compile(route["match"]), route["action"]) for route in self.config["routes"]]
+        for _, action_name in self.routes:
+            if action_name not in self.action_names:
+                raise ValueError(f"Ingest route action '{action_name}' is not a registered action")
+
+        self.lines = 0
+        self.records = 0
+        self.unmatched = 0   # no registered action
+        self.invalid = 0     # lines that couldn't be parsed
+
+    def _map_user(self, user) -> int | None:
+        """
+        Returns the customer user_id the trace's user maps to, or None when the user belongs to another shard.
+        """
+        if self.config["user_mapping"] == "direct":
+            return int(user)
+
+        # Same crc32 split as the customer loader's shards, so every shard takes its own share of the users
+        key = zlib.crc32(str(user).encode("utf-8"))
+        if self.shard_count > 1:
+            if key % self.shard_count != self.shard_index:
+                return None
+            key //= self.shard_count
+        return self.user_ids[key % len(self.user_ids)]
+
+    def _route(self, method: str, path: str) -> tuple[str | None, str | None]:
+        """
+        Returns (action name, user_id group) of the first route matching the request, or (None, None).
+        """
+        request = f"{method} {path}"
+        for pattern, action_name in self.routes:
+            match = pattern.search(request)
+            if match:
+                return action_name, match.groupdict().get("user_id")
+        return None, None
+
+    def _access_log_events(self, file):
+        last_time_text = last_time = None
+        for line in file:
+            self.lines += 1
+            match = ACCESS_LOG_PATTERN.match(line)
+            if not match:
+                self.invalid += 1
+                continue
+
+            user, time_text, method, path = match.groups()
+            action_name, routed_user = self._route(method.decode("latin-1"), path.decode("latin-1"))
+            if action_name is None:
+                self.unmatched += 1
+                continue
+
+            # Many requests share a second, so parse each timestamp once
+            if time_text != last_time_text:
+                try:
+                    last_time = parse_log_time(time_text.decode("ascii"))
+                except (ValueError, KeyError, IndexError):
+                    self.invalid += 1
+                    continue
+                last_time_text = time_text
+
+            yield last_time, routed_user or user.decode("latin-1"), action_name
+
+    def _jsonl_events(self, file):
+        fields = self.config["fields"]
+        timestamp_key, user_key, action_key = fields["timestamp"], fields["user_id"], fields["action"]
+        method_key, path_key = fields["method"], fields["path"]
+        loads = json_codec.loads
+        for line in file:
+            self.lines += 1
+            try:
+                record = loads(line)
+                timestamp = parse_timestamp(record[timestamp_key])
+            except (ValueError, KeyError, TypeError):
+                self.invalid += 1
+                continue
+
+            user = record.get(user_key)
+            action_name = record.get(action_key)
+            if action_name is None and self.routes:
+                action_name, routed_user = self._route(record.get(method_key, ""), record.get(path_key, ""))
+                user = user if user is not None else routed_user
+            if action_name not in self.action_names:
+                self.unmatched += 1
+                continue
+
+            yield timestamp, user, action_name
+
+    def __iter__(self):
+        logger.info(f"[TraceIngest] reading {self.config['format']} trace '{self.path}'...")
+        with open(self.path, "rb", buffering=READ_BUFFER) as file:
+            events = self._jsonl_events(file) if self.config["format"] == "jsonl" else self._access_log_events(file)
+
+            start = None
+            for timestamp, user, action_name in events:
+                if user is None:
+                    self.invalid += 1
+                    continue
+                try:
+                    user_id = self._map_user(user)
+                except ValueError:
+                    self.invalid += 1
+                    continue
+                if user_id is None:
+                    continue
+
+                if start is None:
+                    start = timestamp
+                self.records += 1
+                yield timestamp - start, user_id, action_name
+
+        logger.info(f"[TraceIngest] read {self.lines} lines : {self.records} records, "
+                    f"{self.unmatched} without a registered action, {self.invalid} invalid")
@@ -0,0 +1,132 @@
+import heapq
+import itertools
+import threading
+import time
+
+from simulator.customer_worker_pool import CustomerWorkerPool
+from simulator.metrics import MetricsTracker
+from util.log import get_logger
+
+logger = get_logger(__name__)
+
+# Arrivals are logged to the metrics in batches of this many, at least this often, and whenever the replayer waits
+ARRIVAL_BATCH = 1024
+ARRIVAL_FLUSH_INTERVAL = 0.25
+
+class TraceReplayer:
+    """
+    Replays recorded actions into the worker pool at their original offsets, divided by 'speed'
+    (2.0 replays twice as fast). Records are (offset, user_id, action_name, ...) tuples from any iterable,
+    e.g. simulator.trace.read_trace, and are consumed as they are dispatched so a trace of any length
+    replays in constant memory. Used in place of the ActionGenerator.
+    Records only need to be roughly in offset order (traces are written as actions finish),
+    they are put back in order within a 'reorder_window' of trace seconds.
+    Dispatching never waits for queue room, a record whose customer's queue is full is dropped (counted in the
+    arrivals and queue stats).
+    """
+    def __init__(self, records, customer_worker_pool: CustomerWorkerPool, speed: float = 1.0,
+                 metrics: MetricsTracker = None, action_names: list[str] = None, late_threshold: float = 0.01,
+                 tick: float = 0.001, reorder_window: float = 5.0):
+        if speed <= 0:
+            raise ValueError(f"Replay speed must be positive, got {speed}")
+
+        self.records = records
+        self.customer_worker_pool = customer_worker_pool
+        self.speed = speed
+        self.metrics = metrics
+        self.action_names = set(action_names) if action_names else None
+        self.late_threshold = late_threshold
+        self.tick = tick
+        self.reorder_window = reorder_window
+
+        self.shutdown_event = threading.Event()
+
+        # Replays follow the trace, there is no rate to control
+        self.controller = None
+
+        self.replayed = 0
+        self.skipped = 0
+        self.next_flush = 0.0
+        self._reset_arrivals()
+
+    def _reset_arrivals(self):
+        self.scheduled = self.dispatched = self.dropped = self.late = 0
+        self.total_lag = self.max_lag = 0.0
+
+    def _log_arrivals(self):
+        self.next_flush = time.monotonic() + ARRIVAL_FLUSH_INTERVAL
+        if self.metrics and self.scheduled:
+            self.metrics.log_arrivals(self.scheduled, self.dispatched, self.dropped, self.late,
+                                      self.total_lag, self.max_lag)
+        self._reset_arrivals()
+
+    def _in_order(self, records):
+        """
+        Yields records in offset order, holding back only the records within reorder_window of the newest one read.
+        """
+        heap = []
+        order = itertools.count()
+        newest = float("-inf")
+        for record in records:
+            offset = record[0]
+            newest = max(newest, offset)
+            heapq.heappush(heap, (offset, next(order), record))
+            while heap[0][0] <= newest - self.reorder_window:
+                yield heapq.heappop(heap)[2]
+        while heap:
+            yield heapq.heappop(heap)[2]
+
+    def run(self):
+        logger.info(f"[{self}] Replaying trace at {self.speed}x...")
+
+        customers = self.customer_worker_pool.customers
+        dispatch_action = self.customer_worker_pool.dispatch_action
+        start = first_offset = None
+
+        for record in self._in_order(self.records):
+            if self.shutdown_event.is_set():
+                break
+
+            offset, user_id, action_name = record[0], record[1], record[2]
+            if start is None:
+                start, first_offset = time.monotonic(), offset
+            intended_time = start + (offset - first_offset) / self.speed
+
+            # Wait for the record's time, anything due within a tick goes out straight away
+            now = time.monotonic()
+            if intended_time - now > self.tick:
+                self._log_arrivals()
+                if self.shutdown_event.wait(intended_time - now):
+                    break
+                now = time.monotonic()
+
+            # Customers outside this pool (e.g. another shard's) and unknown actions are left out
+            if user_id not in customers or (self.action_names is not None and action_name not in self.action_names):
+                self.skipped += 1
+                continue
+
+            self.scheduled += 1
+            # One thread replays every customer, so a full queue drops the record rather than stall the timeline
+            if dispatch_action(user_id, action_name, intended_time, block=False) is False:
+                self.dropped += 1
+            else:
+                lag = max(0.0, now - intended_time)
+                self.dispatched += 1
+                self.replayed += 1
+                self.total_lag += lag
+                self.max_lag = max(self.max_lag, lag)
+                if lag > self.late_threshold:
+                    self.late += 1
+
+            if self.scheduled >= ARRIVAL_BATCH or now >= self.next_flush:
+                self._log_arrivals()
+
+        self._log_arrivals()
+        logger.info(f"[{self}] Replay finished, {self.replayed} actions replayed, {self.skipped} skipped")
+
+    def shutdown(self):
+        self.shutdown_event.set()
+        logger.info(f"[{self}] Shutting down TraceReplayer...")
+
+    def __repr__(self):
+        return f"<TraceReplayer>"
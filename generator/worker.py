@@ -3,6 +3,9 @@ import uuid
 
 from queue import Empty, Queue
 from simulator.customer_worker_pool import CustomerWorkerPool
+from util.log import get_logger
+
+logger = get_logger(__name__)
 
 class Worker:
     def __init__(self, customer_pool: CustomerWorkerPool, queue: Queue, work_completion_callback, shutdown_event=None):
@@ -14,7 +17,7 @@ class Worker:
         self._on_done = work_completion_callback
         self.shutdown_event = shutdown_event
 
-        print(f"[{self}] created")
+        logger.debug(f"[{self}] created")
 
     def run(self):
         try:
@@ -23,14 +26,14 @@ class Worker:
                     message = self.queue.get(timeout=1)
                     user_id = message["user_id"]
                     sequence = message["sequence"]
-                    self._execute_sequence(user_id, sequence)
+                    self._execute_sequence(user_id, sequence, message.get("intended_time"))
                     self._on_done(self)
                 except Empty:
                     continue
         except Exception as e:
-            print(f"[{self}] crashed: {e}")
+            logger.error(f"[{self}] crashed: {e}")
 
-    def _execute_sequence(self, user_id: int, sequence: list):
+    def _execute_sequence(self, user_id: int, sequence: list, intended_time: float = None):
         for action in sequence:
             if not self.active:
                 break
@@ -38,11 +41,17 @@ class Worker:
             action_name = action["name"]
             delay = action.get("delay", 0)
 
-            self.customer_pool.dispatch_action(user_id, action_name)
+            # Dropped by the queue overflow policy, later steps assume this one was sent
+            if not self.customer_pool.dispatch_action(user_id, action_name, intended_time):
+                break
 
             if delay > 0:
                 time.sleep(delay)
 
+            # Each step is meant to be sent 'delay' after the previous one was meant to be sent
+            if intended_time is not None:
+                intended_time += delay
+
             self.last_used = time.time()
 
     def __repr__(self):
@@ -1,17 +1,45 @@
+import argparse
 import signal
 import sys
 import threading
 import time
 
-from generator.action_generator import ActionGenerator
+from coordinator.agent import Agent
+from coordinator.distributed_coordinator import DistributedCoordinator
+from coordinator.shard_coordinator import ShardCoordinator
+from generator.arrival_source import create_generator
 from simulator.action_config_loader import load_actions_config
 from simulator.action_registry import ActionRegistry
-from simulator.customer_worker_pool import CustomerWorkerPool
+from simulator.engine import create_worker_pool
+from simulator.live_metrics import LiveMetricsReporter
 from simulator.metrics import MetricsTracker
-from util import yaml_loader
+from simulator.trace import TraceRecorder
+from util import json_codec, seeding, yaml_loader
+from util.log import get_logger, setup_logging, shutdown_logging
+
+logger = get_logger("main")
+
+MODES = ["single", "coordinator", "agent"]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Simulates customer actions against microservice APIs.")
+    parser.add_argument("--mode", choices=MODES, default="single",
+                        help="single: run on this host (default). coordinator: drive agents on other processes or "
+                             "hosts. agent: run a shard for a coordinator")
+    parser.add_argument("--host", help="coordinator: address to listen on, agent: coordinator to connect to")
+    parser.add_argument("--port", type=int, help="coordinator port")
+    parser.add_argument("--agents", type=int, help="coordinator: agents to wait for before starting")
+    return parser.parse_args()
 
 def main():
-    print(f"[Main] loading config...")
+    args = parse_args()
+
+    # Logging first, everything else logs through it
+    logging_config_path = "config/logging.yaml"
+    logging_config = yaml_loader.load_yaml(logging_config_path) or {}
+    setup_logging(logging_config)
+
+    logger.info(f"[Main] loading config...")
 
     # Load all configs
     action_definition_path = "config/actions.yaml"
@@ -23,6 +51,37 @@ def main():
     action_generator_config_path = "config/test_script.yaml"
     action_generator_config = yaml_loader.load_yaml(action_generator_config_path)
 
+    metrics_config_path = "config/metrics.yaml"
+    metrics_config = yaml_loader.load_yaml(metrics_config_path) or {}
+
+    # Body templates are encoded when actions are registered, so pick the JSON backend first
+    json_codec.configure(worker_pool_config.get("json_codec", "auto"))
+
+    # A fixed seed makes the arrival schedule, customer and sequence choices and payloads reproducible
+    seeding.configure(action_generator_config.get("seed"))
+
+    # Command line options override the distributed section of the worker pool config
+    distributed_config = dict(worker_pool_config.get("distributed") or {})
+    for key in ("host", "port", "agents"):
+        if getattr(args, key) is not None:
+            distributed_config[key] = getattr(args, key)
+
+    # An agent gets its configs from the coordinator, only behaviours are loaded from this host
+    if args.mode == "agent":
+        run_agent(distributed_config, action_definition_path)
+        return
+
+    if args.mode == "coordinator":
+        run_coordinator(distributed_config, worker_pool_config, action_generator_config, metrics_config)
+        return
+
+    # Sharded mode runs the simulator across several processes instead
+    shard_count = worker_pool_config.get("shards", 1)
+    if shard_count > 1:
+        run_sharded(shard_count, action_definition_path, worker_pool_config, action_generator_config, metrics_config,
+                    logging_config)
+        return
+
     # Registry registers action name to action config and the behaviour module instance
     registry = ActionRegistry()
     registry.register_all(action_definitions)
@@ -30,23 +89,42 @@ def main():
     # Start a metric tracker to see HTTP success/fail metrics at the end
     metrics = MetricsTracker()
 
-    # Start worker pool
-    pool = CustomerWorkerPool(worker_pool_config, metrics, registry)
+    # Report rolling throughput, error rate and latency while the simulator runs
+    live_config = metrics_config.get("live") or {}
+    reporter = LiveMetricsReporter(metrics, live_config)
+    if live_config.get("enabled"):
+        reporter.start()
+
+    # Record every executed action to a binary trace that can be replayed later
+    trace_config = action_generator_config.get("trace") or {}
+    recorder = None
+    if trace_config.get("record"):
+        recorder = TraceRecorder(trace_config["record"], registry.names())
+
+    # Start worker pool using the engine selected in the worker pool config
+    pool = create_worker_pool(worker_pool_config, metrics, registry, recorder)
     pool.run()
 
-    # Start action generator to send work to CustomerWorkerPool
+    # Start action generator (or the trace replayer) to send work to CustomerWorkerPool
     # Generator runs on a separate thread
-    user_ids  = list(pool.customers.keys())
-    generator = ActionGenerator(user_ids, pool, action_generator_config)
+    generator = create_generator(pool, action_generator_config, metrics, registry.names())
     generator_thread = threading.Thread(target=generator.run, daemon=True)
     generator_thread.start()
 
     # Handle shutdown gracefully
     def handle_exit(signum, frame):
-        print("[Main] Shutdown signal received.")
-        pool.shutdown()
+        logger.info("[Main] Shutdown signal received.")
+        reporter.shutdown()
+        # Stop generating first, so nothing is queued for workers that are stopping
         generator.shutdown()
+        pool.shutdown()
+        if recorder:
+            recorder.close()
         metrics.display_summary()
+        if generator.controller:
+            generator.controller.display_summary()
+        export_histograms(metrics, metrics_config)
+        shutdown_logging()
         sys.exit(0)
 
     signal.signal(signal.SIGINT, handle_exit)
@@ -59,5 +137,93 @@ def main():
     except KeyboardInterrupt:
         handle_exit(None, None)
 
+def export_histograms(metrics: MetricsTracker, metrics_config: dict):
+    histogram_export = metrics_config.get("histogram_export")
+    if histogram_export:
+        metrics.export_histograms(histogram_export)
+
+def run_sharded(shard_count: int, action_definition_path: str, worker_pool_config: dict, action_generator_config: dict,
+                metrics_config: dict, logging_config: dict):
+    coordinator = ShardCoordinator(shard_count, action_definition_path, worker_pool_config, action_generator_config,
+                                   logging_config)
+    coordinator.run()
+
+    # Handle shutdown gracefully
+    def handle_exit(signum, frame):
+        logger.info("[Main] Shutdown signal received.")
+        coordinator.shutdown()
+        coordinator.display_summary()
+        export_histograms(coordinator.metrics, metrics_config)
+        shutdown_logging()
+        sys.exit(0)
+
+    signal.signal(signal.SIGINT, handle_exit)
+    signal.signal(signal.SIGTERM, handle_exit)
+
+    # Keep main process alive while shards are running
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        handle_exit(None, None)
+
+def run_coordinator(distributed_config: dict, worker_pool_config: dict, action_generator_config: dict,
+                    metrics_config: dict):
+    coordinator = DistributedCoordinator(worker_pool_config, action_generator_config, distributed_config)
+    coordinator.run()
+
+    # Live reports are built from the agents' merged snapshots
+    live_config = metrics_config.get("live") or {}
+    reporter = LiveMetricsReporter(coordinator.metrics, live_config, snapshot_source=coordinator.snapshot)
+    if live_config.get("enabled"):
+        reporter.start()
+
+    # Handle shutdown gracefully
+    def handle_exit(signum, frame):
+        logger.info("[Main] Shutdown signal received.")
+        reporter.shutdown()
+        coordinator.shutdown()
+        coordinator.display_summary()
+        export_histograms(coordinator.metrics, metrics_config)
+        shutdown_logging()
+        sys.exit(0)
+
+    signal.signal(signal.SIGINT, handle_exit)
+    signal.signal(signal.SIGTERM, handle_exit)
+
+    # Keep main process alive while agents are running
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        handle_exit(None, None)
+
+def run_agent(distributed_config: dict, action_definition_path: str):
+    host = distributed_config.get("host") or "127.0.0.1"
+    if host == "0.0.0.0":
+        host = "127.0.0.1"
+    agent = Agent(host, distributed_config.get("port", 7700), action_definition_path)
+    agent_thread = threading.Thread(target=agent.run, daemon=True)
+    agent_thread.start()
+
+    # Handle shutdown gracefully, the coordinator normally stops the agent
+    def handle_exit(signum, frame):
+        logger.info("[Main] Shutdown signal received.")
+        agent.shutdown()
+        agent.finished.wait(timeout=15)
+        shutdown_logging()
+        sys.exit(0)
+
+    signal.signal(signal.SIGINT, handle_exit)
+    signal.signal(signal.SIGTERM, handle_exit)
+
+    # Keep main process alive until the coordinator stops the agent
+    try:
+        while not agent.finished.wait(1):
+            pass
+    except KeyboardInterrupt:
+        handle_exit(None, None)
+    shutdown_logging()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
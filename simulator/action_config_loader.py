@@ -1,5 +1,6 @@
 import importlib.util
 import os
+from simulator.http_response import RESPONSE_BODY_MODES
 from util import yaml_loader
 
 REQUIRED_BEHAVIOUR_FUNCS = [
@@ -45,6 +46,10 @@ def load_actions_config(config_path: str) -> dict:
         if not name or not behaviour_path:
             raise ValueError(f"Action entry must have 'name' and 'behaviour' fields: {action}")
 
+        response_body = action.get("response_body", "full")
+        if response_body not in RESPONSE_BODY_MODES:
+            raise ValueError(f"Action '{name}' has unknown response_body '{response_body}', expected one of {RESPONSE_BODY_MODES}")
+
         module = load_module_from_file(behaviour_path)
         behaviour_instance = module.Behaviour()
 
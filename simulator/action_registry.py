@@ -1,3 +1,10 @@
+import inspect
+
+from simulator.resilience import ResiliencePolicy
+from util.log import get_logger
+
+logger = get_logger(__name__)
+
 class ActionRegistry:
     def __init__(self):
         self._registry = {}
@@ -10,12 +17,46 @@ class ActionRegistry:
             self.register(action_name, payload.get("config"), payload.get("behaviour"))
 
     def register(self, name: str, config: dict, behaviour_instance):
+        """
+        Registers an action. Request parts the behaviour declares as static (see get_static_parts)
+        and its body template (see get_body_template) are built once here instead of for every request,
+        as is whether its process_response takes a RequestContext and its get_header a Session,
+        and its ResiliencePolicy (timeouts, retries and circuit breaker) from the 'resilience' config.
+        """
+        static = {}
+        if hasattr(behaviour_instance, "get_static_parts"):
+            static = behaviour_instance.get_static_parts(config) or {}
+
+        body_template = None
+        if hasattr(behaviour_instance, "get_body_template") and hasattr(behaviour_instance, "get_body_fields"):
+            body_template = behaviour_instance.get_body_template(config)
+
+        # process_response(..., context) gets a RequestContext, checked once here rather than per response
+        accepts_context = {
+            func for func in ("process_response", "process_response_async")
+            if hasattr(behaviour_instance, func)
+            and "context" in inspect.signature(getattr(behaviour_instance, func)).parameters
+        }
+
+        # get_header(..., session) is given the customer's login Session when the session cache is enabled
+        accepts_session = (hasattr(behaviour_instance, "get_header")
+                           and "session" in inspect.signature(behaviour_instance.get_header).parameters)
+
         self._registry[name] = {
             "config": config,
-            "behaviour": behaviour_instance
+            "behaviour": behaviour_instance,
+            "static": static,
+            "body_template": body_template,
+            "accepts_context": accepts_context,
+            "accepts_session": accepts_session,
+            "response_body": config.get("response_body", "full"),
+            "policy": ResiliencePolicy(name, config.get("resilience"))
         }
 
-        print(f"[ActionRegistry] registered action : '{name}'")
+        logger.info(f"[ActionRegistry] registered action : '{name}'")
+
+    def names(self) -> list[str]:
+        return list(self._registry)
 
     def get(self, action_name: str):
         if action_name not in self._registry:
@@ -1,7 +1,12 @@
 # pylint: disable=duplicate-code
 
+import logging
 import requests
 from simulator.customer import Customer
+from simulator.request_context import RequestContext
+from util.log import get_logger, should_log
+
+logger = get_logger(__name__)
 
 class Behaviour:
     def __init__(self):
@@ -32,6 +37,10 @@ class Behaviour:
             "Content-Type": "application/json"
         }
 
+    # With 'sessions' enabled in worker_pool.yaml, declaring a session parameter passes in the customer's login Session:
+    # def get_header(self, customer: Customer, config: dict, session: Session = None):
+    #     return {"Authorization": f"Bearer {session.token}"} if session else {}
+
     def get_body(self, customer: Customer, config: dict):
         """
         Returns HTTP header dictionary
@@ -52,12 +61,17 @@ class Behaviour:
             "quantity": quantity
         }
 
-    def process_response(self, customer: Customer, response: requests.Response, config: dict):
+    def process_response(self, customer: Customer, response: requests.Response, config: dict,
+                         context: RequestContext = None):
         """
         Handles HTTP response and updates customer if needed
         :param customer: Customer object
         :param response: HTTP Response object
         :param config: Action configuration
+        :param context: RequestContext with the body dict and timing of the request (optional parameter)
         """
 
-        print(f"[{customer}] received response : status code='{response.status_code}', body='{response.json()}',\nrequest.body='{response.request.body}'")
\ No newline at end of file
+        # Guard per-request logging so it costs nothing when filtered out or not sampled
+        if should_log(logger, logging.DEBUG, config.get("name")):
+            logger.debug("[%s] received response : status code='%s', body='%s',\nrequest.body='%s'",
+                         customer, response.status_code, response.text, response.request.body)
\ No newline at end of file
@@ -1,7 +1,13 @@
 # pylint: disable=duplicate-code
 
+import logging
 import requests
 from simulator.customer import Customer
+from simulator.request_template import BodyTemplate, TemplateField
+from simulator.session_cache import Session
+from util.log import get_logger, should_log
+
+logger = get_logger(__name__)
 
 PLACE_ORDER_API = "post"
 
@@ -22,29 +28,56 @@ class Behaviour:
         """
         return "POST"
 
-    def get_header(self, customer: Customer, config: dict):
+    def get_header(self, customer: Customer, config: dict, session: Session = None):
         """
         Returns HTTP header dictionary
         :param self:
         :param customer: Customer object
         :param config: Action configuration
+        :param session: the customer's login Session when sessions are enabled, else the static auth_key is used
         :return: dict
         """
-        auth_key = config.get("auth_key", "")
+        auth_key = session.token if session is not None else config.get("auth_key", "")
         return {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {auth_key}"
         }
 
-    def get_body(self, customer: Customer, config: dict):
+    def get_static_parts(self, config: dict):
         """
-        Returns HTTP header dictionary
+        Returns the request parts that are the same for every customer, built once at registration
+        :param self:
+        :param config: Action configuration
+        :return: dict
+        """
+        return {
+            "endpoint": self.get_endpoint(None, config),
+            "method": self.get_method(None, config),
+            "headers": self.get_header(None, config)
+        }
+
+    def get_body_template(self, config: dict):
+        """
+        Returns the body with its per-request values left as fields, encoded once at registration
+        :param self:
+        :param config: Action configuration
+        :return: BodyTemplate
+        """
+        return BodyTemplate({
+            "email": TemplateField("email"),
+            "password": TemplateField("password"),
+            "user_id": TemplateField("user_id"),
+            "order_id": TemplateField("order_id")
+        })
+
+    def get_body_fields(self, customer: Customer, config: dict):
+        """
+        Returns the per-request values of the body template
         :param self:
         :param customer: Customer object
         :param config: Action configuration
         :return: dict or None
         """
-
         if customer.placed_orders:
             order_id = customer.placed_orders.pop()
             customer.closed_orders.append(order_id)
@@ -58,6 +91,16 @@ class Behaviour:
         else:
             return None
 
+    def get_body(self, customer: Customer, config: dict):
+        """
+        Returns HTTP body dictionary
+        :param self:
+        :param customer: Customer object
+        :param config: Action configuration
+        :return: dict or None
+        """
+        return self.get_body_fields(customer, config)
+
     def process_response(self, customer: Customer, response: requests.Response, config: dict):
         """
         Handles HTTP response and updates customer if needed
@@ -66,8 +109,10 @@ class Behaviour:
         :param response: HTTP Response object
         :param config: Action configuration
         """
-        print(f"[{customer}] received response : status code='{response.status_code}', body='{response.json()}'")
+        if should_log(logger, logging.DEBUG, config.get("name")):
+            logger.debug("[%s] received response : status code='%s', body='%s'", customer, response.status_code, response.text)
 
         status_code = response.status_code
         if status_code == 200:
-            print(f"[{customer}] closed order success, open orders : {customer.placed_orders}")
+            if should_log(logger, logging.DEBUG, config.get("name")):
+                logger.debug("[%s] closed order success, open orders : %s", customer, customer.placed_orders)
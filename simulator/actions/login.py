@@ -0,0 +1,103 @@
+# pylint: disable=duplicate-code
+
+import logging
+import requests
+from simulator.customer import Customer
+from util.log import get_logger, should_log
+
+logger = get_logger(__name__)
+
+LOGIN_API = "post"
+
+class Behaviour:
+    def get_endpoint(self, customer, config):
+        return config.get("base_url") + LOGIN_API
+
+    def get_method(self, customer: Customer, config: dict):
+        """
+        Returns HTTP method
+        :param self:
+        :param customer: Customer object
+        :param config: Action configuration
+        :return: dict
+        """
+        return "POST"
+
+    def get_header(self, customer: Customer, config: dict):
+        """
+        Returns HTTP header dictionary
+        :param self:
+        :param customer: Customer object
+        :param config: Action configuration
+        :return: dict
+        """
+        return {
+            "Content-Type": "application/json"
+        }
+
+    def get_static_parts(self, config: dict):
+        """
+        Returns the request parts that are the same for every customer, built once at registration
+        :param self:
+        :param config: Action configuration
+        :return: dict
+        """
+        return {
+            "endpoint": self.get_endpoint(None, config),
+            "method": self.get_method(None, config),
+            "headers": self.get_header(None, config)
+        }
+
+    def get_body(self, customer: Customer, config: dict):
+        """
+        Returns HTTP body dictionary
+        :param self:
+        :param customer: Customer object
+        :param config: Action configuration
+        :return: dict or None
+        """
+        return {
+            "email": customer.email,
+            "password": customer.password
+        }
+
+    def get_session(self, customer: Customer, response: requests.Response, config: dict):
+        """
+        Returns (token, ttl in seconds or None) from a login response, or None if the login failed.
+        Called by the SessionCache, must not modify the customer.
+        'token_path' and 'ttl_path' are dotted paths into the JSON response body.
+        :param self:
+        :param customer: Customer object
+        :param response: HTTP Response object
+        :param config: Action configuration
+        :return: tuple or None
+        """
+        if response.status_code != 200:
+            return None
+
+        data = response.json()
+        token = _lookup(data, config.get("token_path", "token"))
+        if token is None:
+            return None
+
+        ttl = _lookup(data, config.get("ttl_path", "expires_in"))
+        return token, ttl
+
+    def process_response(self, customer: Customer, response: requests.Response, config: dict):
+        """
+        Handles HTTP response and updates customer if needed
+        :param self:
+        :param customer: Customer object
+        :param response: HTTP Response object
+        :param config: Action configuration
+        """
+        if should_log(logger, logging.DEBUG, config.get("name")):
+            logger.debug("[%s] received login response : status code='%s'", customer, response.status_code)
+
+
+def _lookup(data, path: str):
+    for key in path.split("."):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
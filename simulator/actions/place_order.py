@@ -1,9 +1,14 @@
 # pylint: disable=duplicate-code
-import random
-
+import logging
 import requests
-import json
 from simulator.customer import Customer
+from simulator.request_context import RequestContext
+from simulator.request_template import BodyTemplate, TemplateField
+from simulator.session_cache import Session
+from util import json_codec, seeding
+from util.log import get_logger, should_log
+
+logger = get_logger(__name__)
 
 PLACE_ORDER_API = "post"
 
@@ -24,56 +29,103 @@ class Behaviour:
         """
         return "POST"
 
-    def get_header(self, customer: Customer, config: dict):
+    def get_header(self, customer: Customer, config: dict, session: Session = None):
         """
         Returns HTTP header dictionary
         :param self:
         :param customer: Customer object
         :param config: Action configuration
+        :param session: the customer's login Session when sessions are enabled, else the static auth_key is used
         :return: dict
         """
-        auth_key = config.get("auth_key", "")
+        auth_key = session.token if session is not None else config.get("auth_key", "")
         return {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {auth_key}"
         }
 
-    def get_body(self, customer: Customer, config: dict):
+    def get_static_parts(self, config: dict):
         """
-        Returns HTTP header dictionary
+        Returns the request parts that are the same for every customer, built once at registration
+        :param self:
+        :param config: Action configuration
+        :return: dict
+        """
+        return {
+            "endpoint": self.get_endpoint(None, config),
+            "method": self.get_method(None, config),
+            "headers": self.get_header(None, config)
+        }
+
+    def get_body_template(self, config: dict):
+        """
+        Returns the body with its per-request values left as fields, encoded once at registration
+        :param self:
+        :param config: Action configuration
+        :return: BodyTemplate
+        """
+        return BodyTemplate({
+            "email": TemplateField("email"),
+            "password": TemplateField("password"),
+            "user_id": TemplateField("user_id"),
+            "order_id": TemplateField("order_id"),
+            "product_id": "default_id",
+            "quantity": 1
+        })
+
+    def get_body_fields(self, customer: Customer, config: dict):
+        """
+        Returns the per-request values of the body template
         :param self:
         :param customer: Customer object
         :param config: Action configuration
         :return: dict or None
         """
-
-        product_id = "default_id"
-        quantity = 1
-        self.order_id = random.randint(0, 3000000)
+        # Derived from the customer's own request count, so a seeded run sends the same order ids every time
+        customer.request_count += 1
+        self.order_id = seeding.derive(customer.user_id, customer.request_count) % 3000001
 
         return {
             "email": customer.email,
             "password": customer.password,
             "user_id": customer.user_id,
-            "order_id": self.order_id,
-            "product_id": product_id,
-            "quantity": quantity
+            "order_id": self.order_id
+        }
+
+    def get_body(self, customer: Customer, config: dict):
+        """
+        Returns HTTP body dictionary
+        :param self:
+        :param customer: Customer object
+        :param config: Action configuration
+        :return: dict or None
+        """
+        return {
+            **self.get_body_fields(customer, config),
+            "product_id": "default_id",
+            "quantity": 1
         }
 
-    def process_response(self, customer: Customer, response: requests.Response, config: dict):
+    def process_response(self, customer: Customer, response: requests.Response, config: dict,
+                         context: RequestContext = None):
         """
         Handles HTTP response and updates customer if needed
         :param self:
         :param customer: Customer object
         :param response: HTTP Response object
         :param config: Action configuration
+        :param context: RequestContext with the body fields this request was built from,
+                        without it the order id is read back from the request body
         """
-        print(f"[{customer}] received response : status code='{response.status_code}', body='{response.json()}'")
+        if should_log(logger, logging.DEBUG, config.get("name")):
+            logger.debug("[%s] received response : status code='%s', body='%s'", customer, response.status_code, response.text)
 
         status_code = response.status_code
         if status_code == 200:
-            body_str = response.request.body.decode("utf-8")
-            body_data = json.loads(body_str)
-
-            customer.placed_orders.append(body_data.get("order_id"))
-            print(f"[{customer}] placed order success, open orders : {customer.placed_orders}")
+            if context is not None and context.body is not None:
+                order_id = context.body.get("order_id")
+            else:
+                order_id = json_codec.loads(response.request.body).get("order_id")
+            customer.placed_orders.append(order_id)
+            if should_log(logger, logging.DEBUG, config.get("name")):
+                logger.debug("[%s] placed order success, open orders : %s", customer, customer.placed_orders)
@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+from simulator.action_registry import ActionRegistry
+from simulator.backpressure import QueueLimiter
+from simulator.customer import Customer
+from simulator.async_http_pool import AsyncHttpSessionPool
+from simulator.metrics import MetricsTracker
+from simulator.request_context import RequestContext
+from simulator.request_template import build_request
+from simulator.resilience import ResiliencePolicy, classify_exception, status_category
+from simulator.session_cache import SessionCache
+from simulator.trace import TraceRecorder
+from util.log import get_logger, should_log
+
+logger = get_logger(__name__)
+
+
+class AsyncCustomerWorker:
+    """
+    Drains the pending actions of a single customer on the event loop.
+    Only exists while the customer has queued work, so idle customers cost nothing but their Customer object.
+    """
+    __slots__ = ("customer", "pending", "registry", "metrics", "http", "timeout", "limiter", "recorder", "sessions")
+
+    def __init__(self, customer: Customer, action_registry: ActionRegistry, metrics: MetricsTracker,
+                 http: AsyncHttpSessionPool, timeout: float, limiter: QueueLimiter = None,
+                 recorder: TraceRecorder = None, sessions: SessionCache = None):
+        self.customer = customer
+        self.pending = deque()
+        self.registry = action_registry
+        self.metrics = metrics
+        self.http = http
+        self.timeout = timeout
+        self.limiter = limiter
+        self.recorder = recorder
+        self.sessions = sessions
+
+    async def run(self):
+        # Actions for one customer are executed in order, one at a time
+        while self.pending:
+            message = self.pending.popleft()
+            if self.limiter:
+                self.limiter.release(self.customer.user_id)
+            await self._execute_action(message.get("action_name"), message.get("intended_time"))
+
+    async def _execute_action(self, action_name: str, intended_time: float = None):
+        latency = corrected_latency = None
+        status = 0
+        try:
+            action = self.registry.get(action_name)
+            action_config = action.get("config")
+            action_behaviour = action.get("behaviour")
+
+            # Logs the customer in on first use, the cached session is reused after that
+            session = None
+            if self.sessions and action.get("accepts_session"):
+                session = await self.sessions.get_async(self.customer)
+
+            endpoint, method, headers, body, body_data = build_request(action, self.customer, session)
+            context = RequestContext(action_name, self.customer.user_id, body_data, intended_time)
+
+            if should_log(logger, logging.DEBUG, action_name):
+                logger.debug("[%s] Sending request: %s %s | Body: %s", self, method, endpoint, body,
+                             extra={"fields": {"user_id": self.customer.user_id, "action": action_name}})
+
+            response = await self._send(action, context, method, endpoint, headers, body)
+            status = response.status_code
+            latency = context.latency
+            corrected_latency = context.corrected_latency
+
+            # Let action behaviour process response and update customer object,
+            # behaviours may provide an async variant if they need to await anything
+            accepts_context = action.get("accepts_context")
+            process_response_async = getattr(action_behaviour, "process_response_async", None)
+            if process_response_async:
+                if "process_response_async" in accepts_context:
+                    await process_response_async(self.customer, response, action_config, context=context)
+                else:
+                    await process_response_async(self.customer, response, action_config)
+            elif "process_response" in accepts_context:
+                action_behaviour.process_response(self.customer, response, action_config, context=context)
+            else:
+                action_behaviour.process_response(self.customer, response, action_config)
+
+            # Update metrics
+            category = status_category(response.status_code)
+            if category is None:
+                self.metrics.log_success(action_name, self.customer.user_id, latency, corrected_latency)
+            else:
+                self.metrics.log_failure(action_name, self.customer.user_id, latency, corrected_latency, category)
+
+        except Exception as e:
+            if logger.isEnabledFor(logging.WARNING):
+                logger.warning("[%s] Error in action '%s': %s", self, action_name, e,
+                               extra={"fields": {"user_id": self.customer.user_id, "action": action_name}})
+            self.metrics.log_failure(action_name, self.customer.user_id, latency, corrected_latency,
+                                     classify_exception(e))
+
+        if self.recorder:
+            self.recorder.record(intended_time or time.monotonic(), self.customer.user_id, action_name, status, latency)
+
+    async def _send(self, action: dict, context: RequestContext, method: str, endpoint: str, headers: dict, body):
+        """
+        Sends the request under the action's ResiliencePolicy, like CustomerWorker._send,
+        backing off on the event loop instead of blocking it.
+        """
+        policy: ResiliencePolicy = action.get("policy")
+        connect_timeout, read_timeout = policy.timeouts(self.timeout)
+        attempt = 0
+        while True:
+            policy.before_request()
+
+            # Requests share a keep-alive connection pool per base_url
+            context.start_time = time.monotonic()
+            try:
+                response = await self.http.request(
+                    base_url=action.get("config").get("base_url"),
+                    method=method,
+                    url=endpoint,
+                    headers=headers,
+                    body=body,
+                    timeout=read_timeout,
+                    response_body=action.get("response_body"),
+                    connect_timeout=connect_timeout
+                )
+            except Exception as e:
+                delay = policy.retry_delay(classify_exception(e), attempt)
+                if delay is None:
+                    raise
+            else:
+                context.end_time = time.monotonic()
+                delay = policy.retry_delay(status_category(response.status_code), attempt)
+                if delay is None:
+                    return response
+
+            self.metrics.log_retry(context.action_name)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def __repr__(self):
+        return f"<AsyncCustomerWorker {self.customer.user_id}>"
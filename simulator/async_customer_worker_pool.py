@@ -0,0 +1,168 @@
+import asyncio
+import threading
+
+from simulator.action_registry import ActionRegistry
+from simulator.async_http_pool import AsyncHttpSessionPool
+from simulator.async_customer_worker import AsyncCustomerWorker
+from simulator.backpressure import EVICT, REJECT, QueueLimiter
+from simulator.customer_loader import load_customers
+from simulator.metrics import MetricsTracker
+from simulator.session_cache import SessionCache
+from simulator.trace import TraceRecorder
+from util.log import get_logger
+
+logger = get_logger(__name__)
+
+class AsyncCustomerWorkerPool:
+    """
+    Drop-in alternative to CustomerWorkerPool that runs every customer on a single asyncio event loop.
+    The loop lives on its own thread so the (threaded) ActionGenerator can keep calling dispatch_action.
+    """
+    def __init__(self, config: dict, metrics: MetricsTracker, action_registry: ActionRegistry,
+                 recorder: TraceRecorder = None):
+        self.config    = config
+        self.metrics   = metrics
+        self.registry  = action_registry
+        self.recorder  = recorder
+
+        self.shutdown_event = threading.Event()
+        self.started_event  = threading.Event()
+
+        self.loop    = asyncio.new_event_loop()
+        self.thread  = None
+        self.http    = None
+        self.timeout = self.config.get("request_timeout", 10)
+
+        # Login sessions for actions whose get_header takes one, created on the loop with the HTTP pool
+        self.sessions = None
+
+                            # key     -> value
+        self.customers = {} # user_id -> Customer (CustomerStore)
+        self.active    = {} # user_id -> AsyncCustomerWorker, only while the customer has pending actions
+
+        logger.info(f"[AsyncCustomerWorkerPool] created ")
+
+        self._load_customers()
+
+    def _load_customers(self):
+        logger.info(f"[AsyncCustomerWorkerPool] loading customers...")
+        self.customers = load_customers(
+            self.config.get("customers_file"),
+            shard_index=self.config.get("shard_index", 0),
+            shard_count=self.config.get("shard_count", 1)
+        )
+        order_history = self.config.get("order_history") or {}
+        self.customers.set_order_limits(order_history.get("max_open_orders"), order_history.get("max_closed_orders"))
+        self.metrics.register_customers(self.customers.keys(), self.customers.row)
+
+        # Pending actions are bounded by the limiter, per customer and in total
+        self.limiter = QueueLimiter(self.config.get("queues"), self.customers.row, len(self.customers))
+        self.metrics.set_queue_source(self.limiter.stats)
+
+    def run(self):
+        logger.info(f"[AsyncCustomerWorkerPool] starting event loop for {len(self.customers)} customers...")
+        self.thread = threading.Thread(target=self._run_loop, daemon=True)
+        self.thread.start()
+        self.started_event.wait()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self._open_http_pool())
+        self.started_event.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self.loop.run_until_complete(self.http.close())
+            self.loop.close()
+
+    async def _open_http_pool(self):
+        # The pool, and the sessions it opens, belong to the event loop thread
+        self.http = AsyncHttpSessionPool(self.config.get("http_pool"), self.metrics)
+
+        session_config = self.config.get("sessions") or {}
+        if session_config.get("enabled"):
+            self.sessions = SessionCache(session_config, self.registry, self.http, loop=self.loop)
+            self.metrics.set_session_source(self.sessions.stats)
+
+    def dispatch_action(self, user_id: int, action_name: str, intended_time: float = None, block: bool = True) -> bool:
+        """
+        Enqueue a single action for a customer, safe to call from any thread, but not from the event loop
+        as the 'block' overflow policy waits for the loop to make room.
+        intended_time (time.monotonic()) is when the action was meant to be sent, used for corrected latency.
+        Returns False if the action was not queued because of the queue overflow policy.
+        With block False the 'block' policy drops the action instead of waiting for room.
+        """
+        if user_id not in self.customers:
+            raise ValueError(f"No worker for customer with user ID {user_id}")
+
+        if self.shutdown_event.is_set():
+            return False
+
+        outcome = self.limiter.admit(user_id, block)
+        if outcome == REJECT:
+            return False
+
+        self.loop.call_soon_threadsafe(self._enqueue, user_id, {
+            "action_name": action_name,
+            "intended_time": intended_time
+        }, outcome == EVICT)
+        return True
+
+    def load(self) -> float:
+        """
+        Returns how full the shared action queue is, from 0 to 1, for the generator to throttle on.
+        """
+        return self.limiter.load()
+
+    def _enqueue(self, user_id: int, message: dict, evict: bool = False):
+        # Runs on the event loop thread, so no locking is needed around self.active
+        worker = self.active.get(user_id)
+        if evict:
+            if worker is None or not worker.pending:
+                self.limiter.cancel_eviction(user_id)
+                return
+            worker.pending.popleft()
+            self.limiter.release(user_id)
+
+        if worker is not None:
+            worker.pending.append(message)
+            return
+
+        worker = AsyncCustomerWorker(
+            customer=self.customers[user_id],
+            action_registry=self.registry,
+            metrics=self.metrics,
+            http=self.http,
+            timeout=self.timeout,
+            limiter=self.limiter,
+            recorder=self.recorder,
+            sessions=self.sessions
+        )
+        worker.pending.append(message)
+        self.active[user_id] = worker
+        self.loop.create_task(self._drain(user_id, worker))
+
+    async def _drain(self, user_id: int, worker: AsyncCustomerWorker):
+        try:
+            await worker.run()
+        except Exception as e:
+            logger.error(f"[{worker}] crashed: {e}")
+        finally:
+            del self.active[user_id]
+
+    def shutdown(self):
+        """
+        Stops the event loop, cancelling any in-flight actions, and waits for it to shut down.
+        """
+        logger.info("[AsyncCustomerWorkerPool] Stopping event loop...")
+        self.shutdown_event.set()
+        if self.sessions:
+            self.sessions.shutdown()
+        if self.thread and self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout=5)
+        logger.info("[AsyncCustomerWorkerPool] Event loop has been stopped.")
@@ -0,0 +1,120 @@
+import aiohttp
+
+from simulator.http_pool import encode_body, load_pool_config
+from simulator.http_response import HttpRequest, HttpResponse
+from simulator.metrics import MetricsTracker
+from util.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class AsyncHttpSessionPool:
+    """
+    Event loop counterpart of HttpSessionPool, one keep-alive aiohttp session (or HTTP/2 httpx client) per base_url.
+    Must only be used from the event loop thread.
+    """
+    def __init__(self, config: dict | None, metrics: MetricsTracker):
+        self.config = load_pool_config(config)
+        self.metrics = metrics
+
+        self.sessions = {}  # base_url -> aiohttp.ClientSession | httpx.AsyncClient
+
+    def _trace_config(self, base_url: str) -> aiohttp.TraceConfig:
+        async def on_create(session, context, params):
+            self.metrics.log_connection(base_url, False)
+
+        async def on_reuse(session, context, params):
+            self.metrics.log_connection(base_url, True)
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(on_create)
+        trace_config.on_connection_reuseconn.append(on_reuse)
+        return trace_config
+
+    def _get_session(self, base_url: str):
+        session = self.sessions.get(base_url)
+        if session is not None:
+            return session
+
+        if self.config["http2"]:
+            import httpx
+
+            keep_alive = self.config["pool_size"] if self.config["keep_alive"] else 0
+            session = httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=self.config["max_connections_per_host"] or None,
+                    max_keepalive_connections=keep_alive,
+                    keepalive_expiry=self.config["keep_alive_timeout"]
+                )
+            )
+        else:
+            # aiohttp's limit caps open connections rather than idle ones, so like requests' pool_maxsize
+            # pool_size doesn't cap concurrency, only max_connections_per_host does. Idle connections are kept
+            # for keep_alive_timeout
+            connector = aiohttp.TCPConnector(
+                limit=0,
+                limit_per_host=self.config["max_connections_per_host"],
+                keepalive_timeout=self.config["keep_alive_timeout"] if self.config["keep_alive"] else None,
+                force_close=not self.config["keep_alive"]
+            )
+            session = aiohttp.ClientSession(connector=connector, trace_configs=[self._trace_config(base_url)])
+
+        self.sessions[base_url] = session
+        logger.info(f"[AsyncHttpSessionPool] opened {'HTTP/2' if self.config['http2'] else 'HTTP/1.1'} pool for '{base_url}'")
+        return session
+
+    async def request(self, base_url: str, method: str, url: str, headers: dict, body, timeout: float,
+                      response_body: str = "full", connect_timeout: float = None) -> HttpResponse:
+        """
+        Sends a request through the pooled session for base_url and returns an HttpResponse.
+        body may be a dict (JSON encoded here) or pre-encoded bytes.
+        With response_body 'discard' the body is read off the connection but not kept.
+        timeout covers the whole request, or only reading the response when a connect_timeout is given.
+        """
+        session = self._get_session(base_url)
+
+        data, headers = encode_body(body, headers)
+
+        if self.config["http2"]:
+            import httpx
+
+            connected = []
+            if connect_timeout is not None:
+                timeout = httpx.Timeout(timeout, connect=connect_timeout)
+
+            async def trace(event_name, info):
+                if event_name == "connection.connect_tcp.complete":
+                    connected.append(True)
+
+            async with session.stream(method, url, headers=headers, content=data, timeout=timeout,
+                                      extensions={"trace": trace}) as raw:
+                if response_body == "discard":
+                    async for _ in raw.aiter_raw():
+                        pass
+                    content = b""
+                else:
+                    content = await raw.aread()
+            self.metrics.log_connection(base_url, not connected)
+            return HttpResponse(raw.status_code, content, raw.headers, HttpRequest(method, url, headers, data))
+
+        if connect_timeout is None:
+            client_timeout = aiohttp.ClientTimeout(total=timeout)
+        else:
+            client_timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=timeout)
+        async with session.request(method, url, headers=headers, data=data, timeout=client_timeout) as raw:
+            if response_body == "discard":
+                async for _ in raw.content.iter_chunked(65536):
+                    pass
+                content = b""
+            else:
+                content = await raw.read()
+            return HttpResponse(raw.status, content, raw.headers, HttpRequest(method, url, headers, data))
+
+    async def close(self):
+        for session in self.sessions.values():
+            if isinstance(session, aiohttp.ClientSession):
+                await session.close()
+            else:
+                await session.aclose()
+        self.sessions.clear()
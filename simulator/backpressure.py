@@ -0,0 +1,156 @@
+import threading
+import time
+from array import array
+
+from simulator.metrics import QUEUE_KEYS
+
+OVERFLOW_POLICIES = ["block", "drop_oldest", "drop_newest", "shed"]
+
+DEFAULT_QUEUE_CONFIG = {
+    "max_per_customer": 0,   # actions queued per customer, 0 = unbounded
+    "max_total": 0,          # actions queued across all customers, 0 = unbounded
+    "overflow": "block",     # what happens to an action that finds its queue full, one of OVERFLOW_POLICIES
+    "block_timeout": 1.0     # seconds 'block' waits for room before dropping the action
+}
+
+# admit() outcomes
+ACCEPT = 0
+EVICT  = 1  # accepted, the caller must evict the customer's oldest queued action
+REJECT = 2
+
+
+def load_queue_config(config: dict | None) -> dict:
+    queue_config = dict(DEFAULT_QUEUE_CONFIG)
+    queue_config.update(config or {})
+    if queue_config["overflow"] not in OVERFLOW_POLICIES:
+        raise ValueError(f"Unknown queue overflow policy '{queue_config['overflow']}', expected one of {OVERFLOW_POLICIES}")
+    return queue_config
+
+
+class QueueLimiter:
+    """
+    Bounds the actions queued between the ActionGenerator and the customer workers, per customer and in total.
+    Pools call admit() before queueing an action and release() when a worker takes one off its queue.
+    When a bound is reached the overflow policy decides what happens to the new action:
+    - block       : wait up to block_timeout for room, which slows down the caller, then drop it
+    - drop_oldest : queue it and evict the customer's oldest queued action instead
+    - drop_newest : drop it
+    - shed        : drop it, and keep dropping every new action until the total has drained to half of max_total
+    """
+    def __init__(self, config: dict | None, index_of, customer_count: int):
+        self.config = load_queue_config(config)
+        self.max_per_customer = self.config["max_per_customer"]
+        self.max_total = self.config["max_total"]
+        self.policy = self.config["overflow"]
+        self.block_timeout = self.config["block_timeout"]
+
+        self.condition = threading.Condition()
+        self.depth = 0
+        self.shedding = False
+
+        # Per-customer depths are only tracked when they are bounded, index_of(user_id) -> slot
+        self.index_of = index_of
+        self.per_customer = array("I", bytes(4 * customer_count)) if self.max_per_customer else None
+
+        self.counters = dict.fromkeys(QUEUE_KEYS, 0)
+
+    def _is_full(self, slot: int | None) -> bool:
+        if self.max_total and self.depth >= self.max_total:
+            return True
+        return slot is not None and self.per_customer[slot] >= self.max_per_customer
+
+    def admit(self, user_id: int, block: bool = True) -> int:
+        """
+        Reserves room for one action of user_id, returns ACCEPT, EVICT or REJECT.
+        Blocks for up to block_timeout under the 'block' policy, unless block is False: callers on a thread
+        shared by many customers (the SequenceScheduler) have the action dropped as under 'drop_newest' instead.
+        """
+        slot = self.index_of(user_id) if self.per_customer is not None else None
+
+        with self.condition:
+            outcome = ACCEPT
+            if self.shedding:
+                if self.depth > self.max_total // 2:
+                    self.counters["shed"] += 1
+                    return REJECT
+                self.shedding = False
+
+            if self._is_full(slot):
+                outcome = self._overflow(slot, block)
+                if outcome == REJECT:
+                    return REJECT
+
+            self.depth += 1
+            if slot is not None:
+                self.per_customer[slot] += 1
+            self.counters["accepted"] += 1
+            if outcome == ACCEPT:
+                # an eviction frees its room straight away, so only count the depth of plain admissions
+                self.counters["max_depth"] = max(self.counters["max_depth"], self.depth)
+            return outcome
+
+    def _overflow(self, slot: int | None, block: bool) -> int:
+        # Called with the condition held and the queue full
+        if self.policy == "block" and block:
+            self.counters["blocked"] += 1
+            start = time.monotonic()
+            deadline = start + self.block_timeout
+            while self._is_full(slot):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            self.counters["blocked_time"] += time.monotonic() - start
+
+            if self._is_full(slot):
+                self.counters["dropped"] += 1
+                return REJECT
+            return ACCEPT
+
+        if self.policy == "drop_oldest":
+            self.counters["evicted"] += 1
+            return EVICT
+
+        if self.policy == "shed":
+            self.shedding = bool(self.max_total) and self.depth >= self.max_total
+            self.counters["shed"] += 1
+            return REJECT
+
+        self.counters["dropped"] += 1
+        return REJECT
+
+    def release(self, user_id: int):
+        """
+        Frees the room of one action of user_id, called when a worker takes it off the queue or it is evicted.
+        """
+        slot = self.index_of(user_id) if self.per_customer is not None else None
+        with self.condition:
+            self.depth -= 1
+            if slot is not None:
+                self.per_customer[slot] -= 1
+            # Blocked admits wait on different bounds (the total or their own customer's), so wake them all
+            self.condition.notify_all()
+
+    def cancel_eviction(self, user_id: int):
+        """
+        Undoes an EVICT admission when the customer had nothing queued to evict, the new action is dropped instead.
+        """
+        self.release(user_id)
+        with self.condition:
+            self.counters["accepted"] -= 1
+            self.counters["evicted"] -= 1
+            self.counters["dropped"] += 1
+
+    def load(self) -> float:
+        """
+        Returns how full the shared queue is, from 0 to 1. Always 0 when the total is unbounded.
+        """
+        if not self.max_total:
+            return 0.0
+        return min(1.0, self.depth / self.max_total)
+
+    def stats(self) -> dict:
+        with self.condition:
+            stats = dict(self.counters)
+            stats["depth"] = self.depth
+        return stats
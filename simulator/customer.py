@@ -1,12 +1,26 @@
+from collections import deque
+
+from util.log import get_logger
+
+logger = get_logger(__name__)
+
 class Customer:
-    def __init__(self, email: str, password: str, user_id: int):
+    # __slots__ keeps each customer small, simulations hold millions of them
+    __slots__ = ("email", "password", "user_id", "placed_orders", "closed_orders", "request_count")
+
+    def __init__(self, email: str, password: str, user_id: int, max_open_orders: int = None, max_closed_orders: int = None):
         self.email = email
         self.password = password
         self.user_id = user_id
-        self.placed_orders = []
-        self.closed_orders = []
 
-        print(f"[{self}] created")
+        # Order histories are unbounded lists by default, or ring buffers keeping only the most recent orders
+        self.placed_orders = deque(maxlen=max_open_orders) if max_open_orders else []
+        self.closed_orders = deque(maxlen=max_closed_orders) if max_closed_orders else []
+
+        # Requests built for this customer so far, seeded payloads are derived from it
+        self.request_count = 0
+
+        logger.debug("[%s] created", self)
 
     def __repr__(self):
-        return f"<Customer {self.user_id}>"
\ No newline at end of file
+        return f"<Customer {self.user_id}>"
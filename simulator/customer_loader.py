@@ -0,0 +1,153 @@
+import csv
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+from simulator.customer_store import CustomerStore
+from util import yaml_loader
+
+# Binary customer file layout, in native (little-endian on x86/ARM) byte order:
+#   header : magic, count, email blob size, password blob size
+#   int64  user_ids[count], uint64 email_offsets[count + 1], uint64 password_offsets[count + 1]
+#   bytes  email blob, password blob
+BINARY_MAGIC = b"ACSCUST1"
+BINARY_HEADER = struct.Struct("<8sQQQ")
+
+def shard_of(user_id: int, shard_count: int) -> int:
+    """
+    Returns the shard a customer belongs to. Uses crc32 rather than hash() so every process agrees.
+    """
+    return zlib.crc32(str(user_id).encode("utf-8")) % shard_count
+
+def _read_yaml(path: str):
+    customers = yaml_loader.load_yaml(path).get("customers")
+    if not customers:
+        raise ValueError("Missing 'customers' in customers_file.")
+    for customer in customers:
+        yield customer.get("user_id"), customer.get("email"), customer.get("password")
+
+def _read_csv(path: str):
+    # Expects a header row with user_id, email and password columns, in any order
+    with open(path, newline="") as f:
+        rows = csv.reader(f)
+        header = next(rows)
+        user_id_column, email_column, password_column = (header.index(c) for c in ("user_id", "email", "password"))
+        for row in rows:
+            if row:
+                yield int(row[user_id_column]), row[email_column], row[password_column]
+
+def _read_jsonl(path: str):
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield int(record["user_id"]), record["email"], record["password"]
+
+def _map_binary(path: str) -> CustomerStore:
+    """
+    Memory-maps a binary customer file, the store's columns are views into the file so nothing is copied.
+    """
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    view = memoryview(mapped)
+    magic, count, email_size, password_size = BINARY_HEADER.unpack_from(view)
+    if magic != BINARY_MAGIC:
+        raise ValueError(f"'{path}' is not a binary customers file")
+
+    position = BINARY_HEADER.size
+    def take(size: int) -> memoryview:
+        nonlocal position
+        section = view[position:position + size]
+        position += size
+        return section
+
+    return CustomerStore(
+        user_ids=take(count * 8).cast("q"),
+        email_offsets=take((count + 1) * 8).cast("Q"),
+        password_offsets=take((count + 1) * 8).cast("Q"),
+        email_blob=take(email_size),
+        password_blob=take(password_size)
+    )
+
+def _read_binary(path: str):
+    store = _map_binary(path)
+    for row, user_id in enumerate(store.user_ids):
+        yield user_id, store.email(row), store.password(row)
+
+READERS = {
+    ".yaml": _read_yaml,
+    ".yml": _read_yaml,
+    ".csv": _read_csv,
+    ".jsonl": _read_jsonl,
+    ".bin": _read_binary
+}
+
+def load_customers(customers_file: str, shard_index: int = 0, shard_count: int = 1) -> CustomerStore:
+    """
+    Loads the customers file into a CustomerStore, which maps user_id to Customer.
+    The format follows the file extension: .yaml/.yml, .csv, .jsonl or .bin (see write_binary).
+    Files are streamed, and an unsharded .bin file is memory-mapped without being read at all.
+    When sharded, only the customers belonging to shard_index are loaded.
+    """
+    if not customers_file:
+        raise ValueError("Missing 'customers_file' in config.")
+
+    extension = os.path.splitext(customers_file)[1].lower()
+    reader = READERS.get(extension)
+    if reader is None:
+        raise ValueError(f"Unsupported customers_file format '{extension}', expected one of {list(READERS)}")
+
+    if extension == ".bin" and shard_count <= 1:
+        return _map_binary(customers_file)
+
+    store = CustomerStore()
+    for user_id, email, password in reader(customers_file):
+        if shard_count > 1 and shard_of(user_id, shard_count) != shard_index:
+            continue
+        store.append(user_id, email, password)
+    store.finalize()
+
+    if not len(store) and shard_count <= 1:
+        raise ValueError("No customers found in customers_file.")
+
+    return store
+
+def write_binary(store: CustomerStore, path: str):
+    """
+    Writes a CustomerStore as a binary customers file, sorted by user_id so lookups can binary search.
+    """
+    rows = sorted(range(len(store)), key=store.user_ids.__getitem__)
+
+    user_ids = array("q")
+    email_offsets, password_offsets = array("Q", [0]), array("Q", [0])
+    emails, passwords = bytearray(), bytearray()
+    for row in rows:
+        user_ids.append(store.user_ids[row])
+        emails += store.email(row).encode("utf-8")
+        email_offsets.append(len(emails))
+        passwords += store.password(row).encode("utf-8")
+        password_offsets.append(len(passwords))
+
+    with open(path, "wb") as f:
+        f.write(BINARY_HEADER.pack(BINARY_MAGIC, len(user_ids), len(emails), len(passwords)))
+        f.write(user_ids.tobytes())
+        f.write(email_offsets.tobytes())
+        f.write(password_offsets.tobytes())
+        f.write(emails)
+        f.write(passwords)
+
+if __name__ == "__main__":
+    # Converts any supported customers file to the binary format:
+    #   python -m simulator.customer_loader config/customers.yaml config/customers.bin
+    if len(sys.argv) != 3:
+        print("usage: python -m simulator.customer_loader <customers file> <output .bin>")
+        sys.exit(1)
+
+    customers = load_customers(sys.argv[1])
+    write_binary(customers, sys.argv[2])
+    print(f"[CustomerLoader] wrote {len(customers)} customers to '{sys.argv[2]}'")
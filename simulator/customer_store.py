@@ -0,0 +1,109 @@
+import operator
+from array import array
+from bisect import bisect_left
+from itertools import islice
+
+from simulator.customer import Customer
+
+class CustomerStore:
+    """
+    Compact, columnar customer dataset that reads like a dict of user_id -> Customer.
+    user_ids live in an int64 array and emails/passwords in packed byte blobs with offsets, so a customer
+    costs ~40 bytes until it is first used. Customer objects are only created on first access.
+    Columns may be arrays or zero-copy memoryviews over a memory-mapped file.
+    """
+    def __init__(self, user_ids=None, email_blob=None, email_offsets=None, password_blob=None, password_offsets=None):
+        self.user_ids = user_ids if user_ids is not None else array("q")
+        self.email_blob = email_blob if email_blob is not None else bytearray()
+        self.email_offsets = email_offsets if email_offsets is not None else array("Q", [0])
+        self.password_blob = password_blob if password_blob is not None else bytearray()
+        self.password_offsets = password_offsets if password_offsets is not None else array("Q", [0])
+
+        self.index = None      # user_id -> row, only built when user_ids aren't sorted
+        self.customers = {}    # user_id -> Customer, for customers that have been used
+
+        # Order history limits given to every Customer, None keeps the full history
+        self.max_open_orders = None
+        self.max_closed_orders = None
+
+        self.finalize()
+
+    def append(self, user_id: int, email: str, password: str):
+        self.user_ids.append(user_id)
+        self.email_blob += email.encode("utf-8")
+        self.email_offsets.append(len(self.email_blob))
+        self.password_blob += password.encode("utf-8")
+        self.password_offsets.append(len(self.password_blob))
+
+    def set_order_limits(self, max_open_orders: int = None, max_closed_orders: int = None):
+        self.max_open_orders = max_open_orders
+        self.max_closed_orders = max_closed_orders
+
+    def finalize(self):
+        """
+        Prepares row lookups once every customer has been appended.
+        Sorted user_ids are binary searched, otherwise a user_id -> row index is built.
+        """
+        ids = self.user_ids
+        if all(map(operator.lt, ids, islice(ids, 1, None))):
+            self.index = None
+        else:
+            self.index = {user_id: row for row, user_id in enumerate(ids)}
+
+    def row(self, user_id: int) -> int | None:
+        if self.index is not None:
+            return self.index.get(user_id)
+
+        row = bisect_left(self.user_ids, user_id)
+        if row < len(self.user_ids) and self.user_ids[row] == user_id:
+            return row
+        return None
+
+    @staticmethod
+    def _text(blob, offsets, row: int) -> str:
+        return str(blob[offsets[row]:offsets[row + 1]], "utf-8")
+
+    def email(self, row: int) -> str:
+        return self._text(self.email_blob, self.email_offsets, row)
+
+    def password(self, row: int) -> str:
+        return self._text(self.password_blob, self.password_offsets, row)
+
+    def __getitem__(self, user_id: int) -> Customer:
+        customer = self.customers.get(user_id)
+        if customer is not None:
+            return customer
+
+        row = self.row(user_id)
+        if row is None:
+            raise KeyError(user_id)
+
+        # setdefault keeps a single Customer if two threads materialise it at once
+        customer = Customer(self.email(row), self.password(row), user_id, self.max_open_orders, self.max_closed_orders)
+        return self.customers.setdefault(user_id, customer)
+
+    def get(self, user_id: int, default=None):
+        try:
+            return self[user_id]
+        except KeyError:
+            return default
+
+    def __contains__(self, user_id) -> bool:
+        return self.row(user_id) is not None
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def __iter__(self):
+        return iter(self.user_ids)
+
+    def keys(self):
+        return self.user_ids
+
+    def items(self):
+        for user_id in self.user_ids:
+            yield user_id, self[user_id]
+
+    def values(self):
+        for user_id in self.user_ids:
+            yield self[user_id]
@@ -1,20 +1,38 @@
-import requests
+import logging
+import time
 from queue import Empty, Queue
 
 from simulator.action_registry import ActionRegistry
+from simulator.backpressure import QueueLimiter
 from simulator.customer import Customer
+from simulator.http_pool import HttpSessionPool
 from simulator.metrics import MetricsTracker
+from simulator.request_context import RequestContext
+from simulator.request_template import build_request
+from simulator.resilience import ResiliencePolicy, classify_exception, status_category
+from simulator.session_cache import SessionCache
+from simulator.trace import TraceRecorder
+from util.log import get_logger, should_log
+
+logger = get_logger(__name__)
 
 
 class CustomerWorker:
-    def __init__(self, customer: Customer, queue: Queue, action_registry: ActionRegistry, metrics: MetricsTracker, shutdown_event=None):
+    def __init__(self, customer: Customer, queue: Queue, action_registry: ActionRegistry, metrics: MetricsTracker,
+                 http: HttpSessionPool, request_timeout: float = 10, shutdown_event=None, limiter: QueueLimiter = None,
+                 recorder: TraceRecorder = None, sessions: SessionCache = None):
         self.customer = customer
         self.queue = queue
         self.registry = action_registry
         self.metrics = metrics
+        self.http = http
+        self.request_timeout = request_timeout
         self.shutdown_event = shutdown_event
+        self.limiter = limiter
+        self.recorder = recorder
+        self.sessions = sessions
 
-        print(f"[{self}] started")
+        logger.debug(f"[{self}] started")
 
     def run(self):
         try:
@@ -22,45 +40,104 @@ class CustomerWorker:
             while not (self.shutdown_event and self.shutdown_event.is_set()):
                 try:
                     message = self.queue.get(timeout=1)
-                    self._execute_action(message.get("action_name"))
+                    if self.limiter:
+                        self.limiter.release(self.customer.user_id)
+                    self.execute_action(message.get("action_name"), message.get("intended_time"))
                 except Empty:
                     continue
         except Exception as e:
-            print(f"[{self}] crashed: {e}")
+            logger.error(f"[{self}] crashed: {e}")
 
-    def _execute_action(self, action_name: str):
+    def execute_action(self, action_name: str, intended_time: float = None):
+        """
+        Sends one action for the customer and processes its response. Called by run(), or by the keyed engine's
+        executor threads, never for the same customer from two threads at once.
+        """
+        latency = corrected_latency = None
+        status = 0
         try:
             action = self.registry.get(action_name)
             action_config = action.get("config")
             action_behaviour = action.get("behaviour")
 
-            endpoint = action_behaviour.get_endpoint(self.customer, action_config)
-            method = action_behaviour.get_method(self.customer, action_config)
-            headers = action_behaviour.get_header(self.customer, action_config)
-            body = action_behaviour.get_body(self.customer, action_config)
+            # Logs the customer in on first use, the cached session is reused after that
+            session = None
+            if self.sessions and action.get("accepts_session"):
+                session = self.sessions.get(self.customer)
+
+            endpoint, method, headers, body, body_data = build_request(action, self.customer, session)
+            context = RequestContext(action_name, self.customer.user_id, body_data, intended_time)
 
-            print(f"[{self}] Sending request: {method} {endpoint} | Body: {body}")
+            if should_log(logger, logging.DEBUG, action_name):
+                logger.debug("[%s] Sending request: %s %s | Body: %s", self, method, endpoint, body,
+                             extra={"fields": {"user_id": self.customer.user_id, "action": action_name}})
 
-            response = requests.request(
-                method=method,
-                url=endpoint,
-                headers=headers,
-                json=body,
-                timeout=10
-            )
+            response = self._send(action, context, method, endpoint, headers, body)
+            status = response.status_code
+            latency = context.latency
+            corrected_latency = context.corrected_latency
 
             # Let action behaviour process response and update customer object
-            action_behaviour.process_response(self.customer, response, action_config)
+            if "process_response" in action.get("accepts_context"):
+                action_behaviour.process_response(self.customer, response, action_config, context=context)
+            else:
+                action_behaviour.process_response(self.customer, response, action_config)
 
             # Update metrics
-            if response.status_code == 200:
-                self.metrics.log_success(action_name, self.customer.user_id)
+            category = status_category(response.status_code)
+            if category is None:
+                self.metrics.log_success(action_name, self.customer.user_id, latency, corrected_latency)
             else:
-                self.metrics.log_failure(action_name, self.customer.user_id)
+                self.metrics.log_failure(action_name, self.customer.user_id, latency, corrected_latency, category)
 
         except Exception as e:
-            print(f"[{self}] Error in action '{action_name}': {e}")
-            self.metrics.log_failure(action_name, self.customer.user_id)
+            if logger.isEnabledFor(logging.WARNING):
+                logger.warning("[%s] Error in action '%s': %s", self, action_name, e,
+                               extra={"fields": {"user_id": self.customer.user_id, "action": action_name}})
+            self.metrics.log_failure(action_name, self.customer.user_id, latency, corrected_latency,
+                                     classify_exception(e))
+
+        if self.recorder:
+            self.recorder.record(intended_time or time.monotonic(), self.customer.user_id, action_name, status, latency)
+
+    def _send(self, action: dict, context: RequestContext, method: str, endpoint: str, headers: dict, body):
+        """
+        Sends the request under the action's ResiliencePolicy. Fails fast while its circuit is open,
+        and retries the failures in its retry_on after a jittered backoff. Returns the final response,
+        or raises the final attempt's exception.
+        """
+        policy: ResiliencePolicy = action.get("policy")
+        connect_timeout, read_timeout = policy.timeouts(self.request_timeout)
+        attempt = 0
+        while True:
+            policy.before_request()
+
+            # Requests share a keep-alive connection pool per base_url
+            context.start_time = time.monotonic()
+            try:
+                response = self.http.request(
+                    base_url=action.get("config").get("base_url"),
+                    method=method,
+                    url=endpoint,
+                    headers=headers,
+                    body=body,
+                    timeout=read_timeout,
+                    response_body=action.get("response_body"),
+                    connect_timeout=connect_timeout
+                )
+            except Exception as e:
+                delay = policy.retry_delay(classify_exception(e), attempt)
+                if delay is None:
+                    raise
+            else:
+                context.end_time = time.monotonic()
+                delay = policy.retry_delay(status_category(response.status_code), attempt)
+                if delay is None:
+                    return response
+
+            self.metrics.log_retry(context.action_name)
+            time.sleep(delay)
+            attempt += 1
 
     def __repr__(self):
         return f"<CustomerWorker {self.customer.user_id}>"
\ No newline at end of file
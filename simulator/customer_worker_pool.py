@@ -1,50 +1,68 @@
 import threading
-from queue import Queue
-from simulator.customer import Customer
+from queue import Empty, Queue
+from simulator.backpressure import EVICT, REJECT, QueueLimiter
+from simulator.customer_loader import load_customers
 from simulator.customer_worker import CustomerWorker
+from simulator.http_pool import HttpSessionPool
 from simulator.action_registry import ActionRegistry
 from simulator.metrics import MetricsTracker
-from util import yaml_loader
+from simulator.session_cache import SessionCache
+from simulator.trace import TraceRecorder
+from util.log import get_logger
+
+logger = get_logger(__name__)
 
 class CustomerWorkerPool:
-    def __init__(self, config: dict, metrics: MetricsTracker, action_registry: ActionRegistry):
+    def __init__(self, config: dict, metrics: MetricsTracker, action_registry: ActionRegistry,
+                 recorder: TraceRecorder = None):
         self.config    = config
         self.metrics   = metrics
         self.registry  = action_registry
+        self.recorder  = recorder
 
         self.shutdown_event = threading.Event()
+        self.http = HttpSessionPool(self.config.get("http_pool"), metrics)
+
+        # Login sessions for actions whose get_header takes one
+        self.sessions = None
+        session_config = self.config.get("sessions") or {}
+        if session_config.get("enabled"):
+            self.sessions = SessionCache(session_config, action_registry, self.http)
+            metrics.set_session_source(self.sessions.stats)
 
                             # key     -> value
-        self.customers = {} # user_id -> Customer
+        self.customers = {} # user_id -> Customer (CustomerStore)
         self.queues    = {} # user_id -> Queue
         self.threads   = {} # user_id -> Thread
 
-        print(f"[CustomerWorkerPool] created ")
+        logger.info(f"[CustomerWorkerPool] created ")
 
         self._load_customers()
 
 
     def _load_customers(self):
-        print(f"[CustomerWorkerPool] loading customers...")
+        logger.info(f"[CustomerWorkerPool] loading customers...")
 
-        customers_file = self.config.get("customers_file")
-        if not customers_file:
-            raise ValueError("Missing 'customers_file' in config.")
+        self.customers = load_customers(
+            self.config.get("customers_file"),
+            shard_index=self.config.get("shard_index", 0),
+            shard_count=self.config.get("shard_count", 1)
+        )
+        order_history = self.config.get("order_history") or {}
+        self.customers.set_order_limits(order_history.get("max_open_orders"), order_history.get("max_closed_orders"))
+        self.metrics.register_customers(self.customers.keys(), self.customers.row)
 
-        customers = yaml_loader.load_yaml(customers_file).get("customers")
-        if not customers:
-            raise ValueError("Missing 'customers' in customers_file.")
+        # Queues are bounded by the limiter, per customer and in total
+        self.limiter = QueueLimiter(self.config.get("queues"), self.customers.row, len(self.customers))
+        self.metrics.set_queue_source(self.limiter.stats)
+        self._create_queues()
 
-        for customer in customers:
-            user_id = customer.get("user_id")
-            email = customer.get("email")
-            password = customer.get("password")
-
-            self.customers[user_id] = Customer(email, password, user_id)
+    def _create_queues(self):
+        for user_id in self.customers:
             self.queues[user_id] = Queue()
 
     def run(self):
-        print(f"[CustomerWorkerPool] creating customer workers...")
+        logger.info(f"[CustomerWorkerPool] creating customer workers...")
         for i, (user_id, customer) in enumerate(self.customers.items()):
             queue = self.queues[user_id]
             worker = CustomerWorker(
@@ -52,29 +70,61 @@ class CustomerWorkerPool:
                 queue=queue,
                 action_registry=self.registry,
                 metrics=self.metrics,
-                shutdown_event=self.shutdown_event
+                http=self.http,
+                request_timeout=self.config.get("request_timeout", 10),
+                shutdown_event=self.shutdown_event,
+                limiter=self.limiter,
+                recorder=self.recorder,
+                sessions=self.sessions
             )
             thread = threading.Thread(target=worker.run, daemon=True)
             self.threads[user_id] = thread
             thread.start()
 
-    def dispatch_action(self, user_id: int, action_name: str):
+    def dispatch_action(self, user_id: int, action_name: str, intended_time: float = None, block: bool = True) -> bool:
         """
         Enqueue a single action to the appropriate CustomerWorker.
+        intended_time (time.monotonic()) is when the action was meant to be sent, used for corrected latency.
+        Returns False if the action was not queued because of the queue overflow policy.
+        With block False the 'block' policy drops the action instead of waiting for room.
         """
         if user_id not in self.queues:
             raise ValueError(f"No worker for customer with user ID {user_id}")
 
-        self.queues[user_id].put({
-            "action_name": action_name
+        outcome = self.limiter.admit(user_id, block)
+        if outcome == REJECT:
+            return False
+
+        queue = self.queues[user_id]
+        if outcome == EVICT:
+            try:
+                queue.get_nowait()
+                self.limiter.release(user_id)
+            except Empty:
+                self.limiter.cancel_eviction(user_id)
+                return False
+
+        queue.put({
+            "action_name": action_name,
+            "intended_time": intended_time
         })
+        return True
+
+    def load(self) -> float:
+        """
+        Returns how full the shared action queue is, from 0 to 1, for the generator to throttle on.
+        """
+        return self.limiter.load()
 
     def shutdown(self):
         """
         Stops all worker threads, and waits for them to shut down.
         """
-        print("[CustomerWorkerPool] Stopping all workers...")
+        logger.info("[CustomerWorkerPool] Stopping all workers...")
         self.shutdown_event.set()
         for thread in self.threads.values():
             thread.join(timeout=3)
-        print("[CustomerWorkerPool] All workers have been stopped.")
\ No newline at end of file
+        if self.sessions:
+            self.sessions.shutdown()
+        self.http.close()
+        logger.info("[CustomerWorkerPool] All workers have been stopped.")
\ No newline at end of file
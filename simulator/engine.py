@@ -0,0 +1,31 @@
+from simulator.action_registry import ActionRegistry
+from simulator.customer_worker_pool import CustomerWorkerPool
+from simulator.metrics import MetricsTracker
+from simulator.trace import TraceRecorder
+
+ENGINES = ["threaded", "keyed", "asyncio"]
+
+def create_worker_pool(config: dict, metrics: MetricsTracker, action_registry: ActionRegistry,
+                       recorder: TraceRecorder = None):
+    """
+    Creates the customer worker pool for the 'engine' selected in the worker pool config.
+    - threaded : one thread and queue per customer (default)
+    - keyed    : a fixed pool of executor threads serving every customer, in order per customer
+    - asyncio  : every customer on one event loop with a non-blocking HTTP client
+    Every executed action is appended to the recorder's trace when one is given.
+    """
+    engine = config.get("engine", "threaded")
+
+    if engine == "threaded":
+        return CustomerWorkerPool(config, metrics, action_registry, recorder)
+
+    if engine == "keyed":
+        from simulator.keyed_customer_worker_pool import KeyedCustomerWorkerPool
+        return KeyedCustomerWorkerPool(config, metrics, action_registry, recorder)
+
+    if engine == "asyncio":
+        # Imported lazily so the threaded engine does not require aiohttp
+        from simulator.async_customer_worker_pool import AsyncCustomerWorkerPool
+        return AsyncCustomerWorkerPool(config, metrics, action_registry, recorder)
+
+    raise ValueError(f"Unknown worker pool engine '{engine}', expected one of {ENGINES}")
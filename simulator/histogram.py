@@ -0,0 +1,102 @@
+SUB_BUCKET_BITS = 7
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS      # values below this are exact, above it the relative error is < 1/64
+HALF_SUB_BUCKETS = SUB_BUCKETS >> 1
+MAX_VALUE_US = (1 << 36) - 1            # ~19 hours, larger values are clamped
+
+class LatencyHistogram:
+    """
+    Fixed-memory, log-bucketed latency histogram in the style of HdrHistogram.
+    Values are recorded in microseconds. Every power-of-two range is split into 64 linear buckets,
+    which bounds the histogram to ~2k buckets and the percentile error to ~1.6%, however many samples it holds.
+    Counts are kept sparsely so idle histograms stay small, and histograms merge by adding counts.
+    """
+    __slots__ = ("counts", "total", "max_us")
+
+    def __init__(self):
+        self.counts = {}  # bucket index -> count
+        self.total = 0
+        self.max_us = 0
+
+    @staticmethod
+    def _bucket_index(value_us: int) -> int:
+        if value_us < SUB_BUCKETS:
+            return value_us
+        exponent = value_us.bit_length() - SUB_BUCKET_BITS
+        return exponent * HALF_SUB_BUCKETS + (value_us >> exponent)
+
+    @staticmethod
+    def _bucket_value(index: int) -> int:
+        # Returns the midpoint of the values a bucket covers
+        if index < SUB_BUCKETS:
+            return index
+        exponent = index // HALF_SUB_BUCKETS - 1
+        sub_bucket = index - exponent * HALF_SUB_BUCKETS
+        return (sub_bucket << exponent) + ((1 << exponent) >> 1)
+
+    def record(self, seconds: float, count: int = 1):
+        value_us = min(max(int(seconds * 1_000_000), 0), MAX_VALUE_US)
+        index = self._bucket_index(value_us)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.total += count
+        if value_us > self.max_us:
+            self.max_us = value_us
+
+    def copy(self) -> "LatencyHistogram":
+        # Copying the counts dict is atomic, so a histogram that another thread is recording into can be copied
+        histogram = LatencyHistogram()
+        histogram.counts = dict(self.counts)
+        histogram.total = self.total
+        histogram.max_us = self.max_us
+        return histogram
+
+    def merge(self, other: "LatencyHistogram"):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+        self.max_us = max(self.max_us, other.max_us)
+
+    def difference(self, earlier: "LatencyHistogram") -> "LatencyHistogram":
+        """
+        Returns the samples recorded since 'earlier', an older copy of this histogram.
+        The max is approximated by the highest bucket that gained samples.
+        """
+        histogram = LatencyHistogram()
+        for index, count in self.counts.items():
+            delta = count - earlier.counts.get(index, 0)
+            if delta > 0:
+                histogram.counts[index] = delta
+                histogram.total += delta
+        if histogram.counts:
+            histogram.max_us = min(self._bucket_value(max(histogram.counts)), self.max_us)
+        return histogram
+
+    def percentile(self, percentile: float) -> float:
+        """
+        Returns the value at a percentile (0-100) in seconds.
+        """
+        if not self.total:
+            return 0.0
+
+        target = max(1, round(self.total * percentile / 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._bucket_value(index), self.max_us) / 1_000_000
+        return self.max_us / 1_000_000
+
+    @property
+    def max(self) -> float:
+        return self.max_us / 1_000_000
+
+    def to_dict(self) -> dict:
+        return {"counts": dict(self.counts), "total": self.total, "max_us": self.max_us}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LatencyHistogram":
+        histogram = cls()
+        # Keys become strings when a histogram goes through JSON
+        histogram.counts = {int(index): count for index, count in data.get("counts", {}).items()}
+        histogram.total = data.get("total", 0)
+        histogram.max_us = data.get("max_us", 0)
+        return histogram
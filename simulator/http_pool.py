@@ -0,0 +1,211 @@
+import importlib.util
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from simulator.http_response import HttpRequest, HttpResponse
+from simulator.metrics import MetricsTracker
+from util import json_codec
+from util.log import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_POOL_CONFIG = {
+    "pool_size": 100,                # keep-alive connections held open per base_url
+    "max_connections_per_host": 0,   # concurrent requests allowed per base_url, 0 = unlimited
+    "keep_alive": True,              # reuse connections between requests
+    "keep_alive_timeout": 15,        # seconds an idle connection is kept (HTTP/2 and asyncio engine)
+    "http2": False                   # use HTTP/2 via httpx, requires 'httpx[http2]'
+}
+
+def load_pool_config(config: dict | None) -> dict:
+    """
+    Merges the 'http_pool' section of the worker pool config over the defaults.
+    """
+    pool_config = dict(DEFAULT_POOL_CONFIG)
+    pool_config.update(config or {})
+    # httpx is only imported once the first pool opens, so check for it up front
+    if pool_config["http2"] and not (importlib.util.find_spec("httpx") and importlib.util.find_spec("h2")):
+        raise ValueError("http_pool http2 requires httpx with HTTP/2 support, install it with: pip install 'httpx[http2]'")
+    return pool_config
+
+
+def encode_body(body, headers: dict) -> tuple[bytes | None, dict]:
+    """
+    Returns the request body as bytes and the headers to send it with.
+    dict bodies are encoded with the configured json_codec, bytes bodies (e.g. from a BodyTemplate) are sent as they are.
+    headers may be shared between requests, so a copy is made when Content-Type has to be added.
+    """
+    if body is None:
+        return None, headers
+    if not isinstance(body, (bytes, bytearray)):
+        body = json_codec.dumps(body)
+    if "Content-Type" not in headers:
+        headers = {**headers, "Content-Type": "application/json"}
+    return body, headers
+
+
+def _counting_pool_class(pool_class, on_checkout):
+    """
+    Wraps a urllib3 connection pool class so every connection checkout reports whether an
+    already-open socket was reused (pool hit) or a new connection has to be opened (pool miss).
+    """
+    class CountingConnectionPool(pool_class):
+        def _get_conn(self, timeout=None):
+            conn = super()._get_conn(timeout)
+            on_checkout(getattr(conn, "sock", None) is not None)
+            return conn
+
+    return CountingConnectionPool
+
+
+class _RequestsSession:
+    """
+    A requests.Session with a sized, counted connection pool for a single base_url.
+    """
+    def __init__(self, base_url: str, config: dict, metrics: MetricsTracker):
+        self.base_url = base_url
+        self.metrics = metrics
+
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config["pool_size"])
+        adapter.poolmanager.pool_classes_by_scheme = {
+            "http": _counting_pool_class(HTTPConnectionPool, self._on_checkout),
+            "https": _counting_pool_class(HTTPSConnectionPool, self._on_checkout)
+        }
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if not config["keep_alive"]:
+            self.session.headers["Connection"] = "close"
+
+    def _on_checkout(self, reused: bool):
+        self.metrics.log_connection(self.base_url, reused)
+
+    def request(self, method: str, url: str, headers: dict, body, timeout: float, response_body: str = "full",
+                connect_timeout: float = None):
+        data, headers = encode_body(body, headers)
+        if connect_timeout is not None:
+            timeout = (connect_timeout, timeout)
+        if response_body == "full":
+            return self.session.request(method=method, url=url, headers=headers, data=data, timeout=timeout)
+
+        raw = self.session.request(method=method, url=url, headers=headers, data=data, timeout=timeout, stream=True)
+        if response_body == "discard":
+            # Read the body off the socket without keeping it, so the connection can go back to the pool
+            raw.raw.drain_conn()
+            raw.close()
+            content = b""
+        else:
+            content = raw.content
+
+        return HttpResponse(raw.status_code, content, raw.headers, HttpRequest(method, url, headers, data))
+
+    def close(self):
+        self.session.close()
+
+
+class _Http2Session:
+    """
+    An httpx.Client speaking HTTP/2 for a single base_url, responses are adapted to HttpResponse.
+    """
+    def __init__(self, base_url: str, config: dict, metrics: MetricsTracker):
+        import httpx
+
+        self.base_url = base_url
+        self.metrics = metrics
+        self.timeout_class = httpx.Timeout
+
+        keep_alive = config["pool_size"] if config["keep_alive"] else 0
+        self.client = httpx.Client(
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=config["max_connections_per_host"] or None,
+                max_keepalive_connections=keep_alive,
+                keepalive_expiry=config["keep_alive_timeout"]
+            )
+        )
+
+    def request(self, method: str, url: str, headers: dict, body, timeout: float, response_body: str = "full",
+                connect_timeout: float = None):
+        connected = []
+
+        # httpcore reports a 'connection.connect_tcp' event only when a new connection is opened
+        def trace(event_name, info):
+            if event_name == "connection.connect_tcp.complete":
+                connected.append(True)
+
+        data, headers = encode_body(body, headers)
+        if connect_timeout is not None:
+            timeout = self.timeout_class(timeout, connect=connect_timeout)
+        with self.client.stream(method, url, headers=headers, content=data, timeout=timeout,
+                                extensions={"trace": trace}) as raw:
+            if response_body == "discard":
+                for _ in raw.iter_raw():
+                    pass
+                content = b""
+            else:
+                content = raw.read()
+        self.metrics.log_connection(self.base_url, not connected)
+
+        request = HttpRequest(method, url, headers, data)
+        return HttpResponse(raw.status_code, content, raw.headers, request)
+
+    def close(self):
+        self.client.close()
+
+
+class HttpSessionPool:
+    """
+    Shares keep-alive HTTP sessions across all CustomerWorkers, one connection pool per base_url.
+    """
+    def __init__(self, config: dict | None, metrics: MetricsTracker):
+        self.config = load_pool_config(config)
+        self.metrics = metrics
+
+        self.sessions = {}  # base_url -> session
+        self.limits   = {}  # base_url -> BoundedSemaphore, only when max_connections_per_host is set
+        self.lock = threading.Lock()
+
+    def _get_session(self, base_url: str):
+        session = self.sessions.get(base_url)
+        if session is not None:
+            return session
+
+        with self.lock:
+            if base_url not in self.sessions:
+                session_class = _Http2Session if self.config["http2"] else _RequestsSession
+                self.sessions[base_url] = session_class(base_url, self.config, self.metrics)
+
+                max_connections = self.config["max_connections_per_host"]
+                if max_connections and not self.config["http2"]:
+                    self.limits[base_url] = threading.BoundedSemaphore(max_connections)
+
+                logger.info(f"[HttpSessionPool] opened {'HTTP/2' if self.config['http2'] else 'HTTP/1.1'} pool for '{base_url}'")
+            return self.sessions[base_url]
+
+    def request(self, base_url: str, method: str, url: str, headers: dict, body, timeout: float,
+                response_body: str = "full", connect_timeout: float = None):
+        """
+        Sends a request through the pooled session for base_url and returns the response.
+        body may be a dict (JSON encoded here) or pre-encoded bytes.
+        response_body is one of RESPONSE_BODY_MODES, 'full' returns the client's own response object,
+        'lazy' an HttpResponse that decodes on first use and 'discard' an HttpResponse without content.
+        With a connect_timeout, timeout only applies to reading the response.
+        """
+        session = self._get_session(base_url)
+
+        limit = self.limits.get(base_url)
+        if limit is None:
+            return session.request(method, url, headers, body, timeout, response_body, connect_timeout)
+
+        with limit:
+            return session.request(method, url, headers, body, timeout, response_body, connect_timeout)
+
+    def close(self):
+        with self.lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions.clear()
@@ -0,0 +1,49 @@
+from util import json_codec
+
+RESPONSE_BODY_MODES = ["full", "lazy", "discard"]
+
+_UNSET = object()
+
+
+class HttpRequest:
+    """
+    The request half of an HttpResponse, mirrors the fields of requests.PreparedRequest behaviours rely on.
+    """
+    __slots__ = ("method", "url", "headers", "body")
+
+    def __init__(self, method: str, url: str, headers: dict, body: bytes | None):
+        self.method = method
+        self.url = url
+        self.headers = headers
+        self.body = body
+
+
+class HttpResponse:
+    """
+    Minimal requests.Response look-alike, lets behaviours process responses from non-requests HTTP clients.
+    text and json() are only decoded on first use and then cached.
+    """
+    __slots__ = ("status_code", "content", "headers", "request", "_text", "_json")
+
+    def __init__(self, status_code: int, content: bytes, headers: dict, request: HttpRequest):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.request = request
+        self._text = None
+        self._json = _UNSET
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = self.content.decode("utf-8", errors="replace")
+        return self._text
+
+    def json(self):
+        if self._json is _UNSET:
+            self._json = json_codec.loads(self.content)
+        return self._json
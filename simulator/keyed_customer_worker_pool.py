@@ -0,0 +1,149 @@
+import os
+import threading
+from collections import deque
+from queue import Empty, SimpleQueue
+
+from simulator.action_registry import ActionRegistry
+from simulator.backpressure import EVICT, REJECT
+from simulator.customer import Customer
+from simulator.customer_worker import CustomerWorker
+from simulator.customer_worker_pool import CustomerWorkerPool
+from simulator.metrics import MetricsTracker
+from simulator.trace import TraceRecorder
+from util.log import get_logger
+
+logger = get_logger(__name__)
+
+# Executor threads per CPU core when executor_threads isn't set, requests block a thread while in flight
+THREADS_PER_CORE = 4
+
+
+class KeyedCustomerWorker(CustomerWorker):
+    """
+    A CustomerWorker without a thread or queue of its own. Its pending actions are run by the pool's
+    executor threads, one at a time and in order. Only exists while the customer has pending work.
+    """
+    def __init__(self, customer: Customer, action_registry: ActionRegistry, metrics: MetricsTracker, http,
+                 request_timeout: float, limiter=None, recorder: TraceRecorder = None, sessions=None):
+        super().__init__(customer, None, action_registry, metrics, http, request_timeout, limiter=limiter,
+                         recorder=recorder, sessions=sessions)
+        self.pending = deque()
+
+    def __repr__(self):
+        return f"<KeyedCustomerWorker {self.customer.user_id}>"
+
+
+class KeyedCustomerWorkerPool(CustomerWorkerPool):
+    """
+    Drop-in alternative to CustomerWorkerPool that serves every customer from a fixed pool of executor threads.
+    A customer with pending actions is on the run queue, or being run by an executor, but never both,
+    so its actions still run one at a time in FIFO order (PlaceOrder's append is never raced by CancelOrder's pop).
+    An executor runs one action, then puts the customer at the back of the run queue if it has more,
+    so busy customers can't starve the others. Idle customers cost nothing but their Customer object.
+    """
+    def __init__(self, config: dict, metrics: MetricsTracker, action_registry: ActionRegistry,
+                 recorder: TraceRecorder = None):
+        self.lock = threading.Lock()
+        self.run_queue = SimpleQueue()   # KeyedCustomerWorkers with pending work, waiting for an executor
+        self.active = {}                 # user_id -> KeyedCustomerWorker, only while the customer has pending work
+        self.executors = []
+
+        self.executor_threads = config.get("executor_threads") or (os.cpu_count() or 1) * THREADS_PER_CORE
+
+        super().__init__(config, metrics, action_registry, recorder)
+
+    def _create_queues(self):
+        # Pending actions live on the active workers instead of a queue per customer
+        pass
+
+    def run(self):
+        logger.info(f"[KeyedCustomerWorkerPool] starting {self.executor_threads} executor threads...")
+        for _ in range(self.executor_threads):
+            thread = threading.Thread(target=self._run_executor, daemon=True)
+            self.executors.append(thread)
+            thread.start()
+
+    def _run_executor(self):
+        while not self.shutdown_event.is_set():
+            try:
+                worker = self.run_queue.get(timeout=1)
+            except Empty:
+                continue
+
+            with self.lock:
+                message = worker.pending.popleft()
+            self.limiter.release(worker.customer.user_id)
+
+            try:
+                worker.execute_action(message.get("action_name"), message.get("intended_time"))
+            except Exception as e:
+                logger.error(f"[{worker}] crashed: {e}")
+
+            # Back of the run queue with its next action, or retired until the customer gets more work
+            with self.lock:
+                if worker.pending:
+                    self.run_queue.put(worker)
+                else:
+                    del self.active[worker.customer.user_id]
+
+    def dispatch_action(self, user_id: int, action_name: str, intended_time: float = None, block: bool = True) -> bool:
+        """
+        Enqueue a single action for the customer, scheduling the customer if it had no pending work.
+        intended_time (time.monotonic()) is when the action was meant to be sent, used for corrected latency.
+        Returns False if the action was not queued because of the queue overflow policy.
+        With block False the 'block' policy drops the action instead of waiting for room.
+        """
+        if user_id not in self.customers:
+            raise ValueError(f"No worker for customer with user ID {user_id}")
+
+        outcome = self.limiter.admit(user_id, block)
+        if outcome == REJECT:
+            return False
+
+        message = {
+            "action_name": action_name,
+            "intended_time": intended_time
+        }
+
+        with self.lock:
+            worker = self.active.get(user_id)
+
+            if outcome == EVICT:
+                if worker is None or not worker.pending:
+                    self.limiter.cancel_eviction(user_id)
+                    return False
+                worker.pending.popleft()
+                self.limiter.release(user_id)
+
+            if worker is not None:
+                worker.pending.append(message)
+                return True
+
+            worker = KeyedCustomerWorker(
+                customer=self.customers[user_id],
+                action_registry=self.registry,
+                metrics=self.metrics,
+                http=self.http,
+                request_timeout=self.config.get("request_timeout", 10),
+                limiter=self.limiter,
+                recorder=self.recorder,
+                sessions=self.sessions
+            )
+            worker.pending.append(message)
+            self.active[user_id] = worker
+
+        self.run_queue.put(worker)
+        return True
+
+    def shutdown(self):
+        """
+        Stops the executor threads, and waits for them to shut down.
+        """
+        logger.info("[KeyedCustomerWorkerPool] Stopping executors...")
+        self.shutdown_event.set()
+        for thread in self.executors:
+            thread.join(timeout=3)
+        if self.sessions:
+            self.sessions.shutdown()
+        self.http.close()
+        logger.info("[KeyedCustomerWorkerPool] All executors have been stopped.")
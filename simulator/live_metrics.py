@@ -0,0 +1,262 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from simulator.histogram import LatencyHistogram
+from simulator.metrics import MetricsTracker
+from util.log import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_LIVE_CONFIG = {
+    "enabled": False,
+    "interval_seconds": 1,      # how often a window is reported
+    "window_seconds": 10,       # rolling window the rates and percentiles are computed over
+    "console": True,            # print every report
+    "jsonl_file": None,         # append every report as one JSON line
+    "prometheus_port": 0        # serve /metrics in Prometheus text format, 0 disables
+}
+
+class LiveMetricsReporter:
+    """
+    Periodically reports per-action throughput, error rate and latency over a rolling time window.
+    Works on its own thread, so recording on the hot path is unaffected. Every interval it takes a counters-only
+    snapshot of the MetricsTracker, and reads the latencies recorded since the last one from its latency feed,
+    rather than copying every recording thread's histograms.
+    """
+    def __init__(self, metrics: MetricsTracker, config: dict | None, snapshot_source=None):
+        self.config = dict(DEFAULT_LIVE_CONFIG)
+        self.config.update(config or {})
+
+        self.interval = self.config["interval_seconds"]
+        self.window_size = max(1, round(self.config["window_seconds"] / self.interval))
+
+        # Defaults to this process' metrics, a coordinator can provide merged snapshots (with histograms) instead
+        self.metrics = metrics
+        self.snapshot_source = snapshot_source or (lambda: metrics.snapshot(include_customers=False,
+                                                                            include_latency=False))
+        self.uses_latency_feed = snapshot_source is None
+        self.latency_feed = None
+
+        self.shutdown_event = threading.Event()
+        self.thread = None
+        self.server = None
+
+        self.previous = None
+        self.windows = deque(maxlen=self.window_size)  # per-interval deltas, oldest first
+        self.latest_totals = None
+        self.latest_report = None
+
+    def start(self):
+        logger.info(f"[LiveMetricsReporter] reporting every {self.interval}s over a {self.interval * self.window_size}s window")
+        if self.uses_latency_feed:
+            self.latency_feed = self.metrics.latency_feed()
+        self.previous = (time.monotonic(), self.snapshot_source())
+
+        if self.config["prometheus_port"]:
+            self._start_prometheus(self.config["prometheus_port"])
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while not self.shutdown_event.wait(self.interval):
+            try:
+                self.report()
+            except Exception as e:
+                logger.warning(f"[LiveMetricsReporter] failed to report: {e}")
+
+    def report(self) -> dict:
+        now, snapshot = time.monotonic(), self.snapshot_source()
+        previous_time, previous = self.previous
+        self.previous = (now, snapshot)
+
+        latency = self._drain_latency_feed() if self.latency_feed is not None else None
+        self.windows.append((now - previous_time, _delta(snapshot, previous, latency)))
+        self.latest_totals = snapshot
+        self.latest_report = self._window_report()
+
+        if self.config["console"]:
+            self._print(self.latest_report)
+        if self.config["jsonl_file"]:
+            self._append_jsonl(self.config["jsonl_file"], self.latest_report)
+
+        return self.latest_report
+
+    def _drain_latency_feed(self) -> dict:
+        """
+        Returns the latencies recorded since the last report, action -> LatencyHistogram.
+        """
+        latency = {}
+        feed = self.latency_feed
+        for _ in range(len(feed)):
+            action, seconds = feed.popleft()
+            histogram = latency.get(action)
+            if histogram is None:
+                histogram = latency[action] = LatencyHistogram()
+            histogram.record(seconds)
+        return latency
+
+    def _window_report(self) -> dict:
+        duration = sum(elapsed for elapsed, _ in self.windows)
+        actions = {}
+
+        for _, delta in self.windows:
+            for action, stats in delta.items():
+                window = actions.setdefault(action, {"success": 0, "failure": 0, "latency": LatencyHistogram()})
+                window["success"] += stats["success"]
+                window["failure"] += stats["failure"]
+                window["latency"].merge(stats["latency"])
+
+        report = {"time": time.time(), "window_seconds": round(duration, 3), "actions": {}}
+
+        queue = (self.latest_totals or {}).get("queue")
+        if queue and queue["accepted"]:
+            report["queue"] = {key: queue[key] for key in ("depth", "max_depth", "dropped", "evicted", "shed")}
+
+        session = (self.latest_totals or {}).get("session")
+        if session and session["hits"] + session["misses"]:
+            report["session"] = {
+                "hit_rate": session["hits"] / (session["hits"] + session["misses"]),
+                "sessions": session["sessions"],
+                "logins": session["logins"],
+                "login_failures": session["login_failures"]
+            }
+
+        for action, window in actions.items():
+            total = window["success"] + window["failure"]
+            latency = window["latency"]
+            report["actions"][action] = {
+                "rps": total / duration if duration else 0.0,
+                "error_rate": window["failure"] / total if total else 0.0,
+                "p50_ms": latency.percentile(50) * 1000,
+                "p95_ms": latency.percentile(95) * 1000,
+                "p99_ms": latency.percentile(99) * 1000
+            }
+        return report
+
+    @staticmethod
+    def _print(report: dict):
+        for action, stats in report["actions"].items():
+            print(f"[Live {report['window_seconds']:.0f}s] {action}: {stats['rps']:.1f} rps | "
+                  f"errors {stats['error_rate'] * 100:.2f}% | p50 {stats['p50_ms']:.2f} ms | "
+                  f"p95 {stats['p95_ms']:.2f} ms | p99 {stats['p99_ms']:.2f} ms")
+        queue = report.get("queue")
+        if queue:
+            print(f"[Live] queue depth {queue['depth']} | max {queue['max_depth']} | dropped {queue['dropped']} | "
+                  f"evicted {queue['evicted']} | shed {queue['shed']}")
+        session = report.get("session")
+        if session:
+            print(f"[Live] session hit rate {session['hit_rate'] * 100:.1f}% | cached {session['sessions']} | "
+                  f"logins {session['logins']} | failed {session['login_failures']}")
+
+    @staticmethod
+    def _append_jsonl(path: str, report: dict):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "a") as f:
+            f.write(json.dumps(report) + "\n")
+
+    def prometheus_text(self) -> str:
+        """
+        Renders the latest totals and window as Prometheus text exposition format.
+        """
+        lines = [
+            "# TYPE simulator_requests_total counter",
+            "# TYPE simulator_failures_total counter",
+            "# TYPE simulator_retries_total counter",
+            "# TYPE simulator_window_rps gauge",
+            "# TYPE simulator_window_error_rate gauge",
+            "# TYPE simulator_window_latency_seconds gauge",
+            "# TYPE simulator_queue_depth gauge",
+            "# TYPE simulator_queue_overflow_total counter",
+            "# TYPE simulator_sessions gauge",
+            "# TYPE simulator_session_lookups_total counter",
+            "# TYPE simulator_session_logins_total counter"
+        ]
+
+        totals = self.latest_totals or {}
+        for outcome, key in (("success", "success"), ("failure", "failure")):
+            for action, count in totals.get(key, {}).items():
+                lines.append(f'simulator_requests_total{{action="{action}",outcome="{outcome}"}} {count}')
+        for action, counts in totals.get("categories", {}).items():
+            for category, count in counts.items():
+                lines.append(f'simulator_failures_total{{action="{action}",category="{category}"}} {count}')
+        for action, count in totals.get("retries", {}).items():
+            lines.append(f'simulator_retries_total{{action="{action}"}} {count}')
+
+        queue = totals.get("queue")
+        if queue:
+            lines.append(f"simulator_queue_depth {queue['depth']}")
+            for outcome in ("dropped", "evicted", "shed"):
+                lines.append(f'simulator_queue_overflow_total{{outcome="{outcome}"}} {queue[outcome]}')
+
+        session = totals.get("session")
+        if session:
+            lines.append(f"simulator_sessions {session['sessions']}")
+            for result, key in (("hit", "hits"), ("miss", "misses")):
+                lines.append(f'simulator_session_lookups_total{{result="{result}"}} {session[key]}')
+            for outcome, key in (("success", "logins"), ("failure", "login_failures")):
+                lines.append(f'simulator_session_logins_total{{outcome="{outcome}"}} {session[key]}')
+
+        report = self.latest_report or {"actions": {}}
+        for action, stats in report["actions"].items():
+            lines.append(f'simulator_window_rps{{action="{action}"}} {stats["rps"]}')
+            lines.append(f'simulator_window_error_rate{{action="{action}"}} {stats["error_rate"]}')
+            for quantile in ("50", "95", "99"):
+                seconds = stats[f"p{quantile}_ms"] / 1000
+                lines.append(f'simulator_window_latency_seconds{{action="{action}",quantile="0.{quantile}"}} {seconds}')
+
+        return "\n".join(lines) + "\n"
+
+    def _start_prometheus(self, port: int):
+        reporter = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = reporter.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        logger.info(f"[LiveMetricsReporter] serving Prometheus metrics on :{port}/metrics")
+
+    def shutdown(self):
+        self.shutdown_event.set()
+        if self.server:
+            self.server.shutdown()
+
+
+def _delta(snapshot: dict, previous: dict, latency: dict = None) -> dict:
+    """
+    Returns per-action success, failure and latency recorded between two snapshots.
+    latency (action -> LatencyHistogram) is given when the snapshots were taken without histograms.
+    """
+    if latency is None:
+        latency = {}
+        for action, data in snapshot.get("latency", {}).items():
+            earlier = LatencyHistogram.from_dict(previous["latency"].get(action, {}))
+            latency[action] = LatencyHistogram.from_dict(data).difference(earlier)
+
+    delta = {}
+    for action in set(snapshot["success"]) | set(snapshot["failure"]) | set(latency):
+        delta[action] = {
+            "success": snapshot["success"].get(action, 0) - previous["success"].get(action, 0),
+            "failure": snapshot["failure"].get(action, 0) - previous["failure"].get(action, 0),
+            "latency": latency.get(action) or LatencyHistogram()
+        }
+    return delta
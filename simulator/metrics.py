@@ -1,32 +1,552 @@
-from collections import defaultdict
+from array import array
+from collections import deque
+import json
+import os
 import threading
+import time
+
+from simulator.histogram import LatencyHistogram
+from util.log import get_logger
+
+logger = get_logger(__name__)
+
+PERCENTILES = [50, 95, 99, 99.9]
+ARRIVAL_KEYS = ["scheduled", "dispatched", "dropped", "late", "total_lag", "max_lag", "throttled"]
+QUEUE_KEYS = ["depth", "max_depth", "accepted", "dropped", "evicted", "shed", "blocked", "blocked_time"]
+# Latencies the live reporter hasn't read yet are dropped beyond this, so a stalled reader can't grow memory
+LATENCY_FEED_SIZE = 1_000_000
+SESSION_KEYS = ["sessions", "hits", "misses", "logins", "login_failures", "backed_off", "refreshes", "idle", "expired",
+                "evicted"]
+
+class _MetricsShard:
+    """
+    Counters owned by a single recording thread. Only the owning thread writes to a shard,
+    so recording needs no lock, readers copy the shard's dicts which is atomic under the GIL.
+    """
+    __slots__ = ("thread", "success", "failure", "categories", "retries", "latency", "corrected", "per_customer",
+                 "connections", "arrivals")
+
+    def __init__(self, thread: threading.Thread):
+        self.thread = thread
+        self.success = {}       # action -> count
+        self.failure = {}       # action -> count
+        self.categories = {}    # action -> {failure category -> count}, see simulator.resilience
+        self.retries = {}       # action -> count
+        self.latency = {}       # action -> LatencyHistogram
+        self.corrected = {}     # action -> LatencyHistogram
+        self.per_customer = {}  # user_id -> [success, fail], only for customers without a registered slot
+        self.connections = {}   # pool -> [hit, miss]
+        self.arrivals = [0, 0, 0, 0, 0.0, 0.0, 0]  # scheduled, dispatched, dropped, late, total_lag, max_lag, throttled
+
+    def snapshot(self, include_customers: bool = True, include_latency: bool = True) -> dict:
+        """
+        Returns a copy of the shard's counters for _merge_snapshot, histograms are LatencyHistogram copies.
+        """
+        if not include_latency:
+            return {
+                "success": dict(self.success),
+                "failure": dict(self.failure),
+                "categories": {action: dict(counts) for action, counts in list(self.categories.items())},
+                "retries": dict(self.retries),
+                "connections": {pool: {"hit": h, "miss": m} for pool, (h, m) in list(self.connections.items())},
+                "arrivals": dict(zip(ARRIVAL_KEYS, self.arrivals))
+            }
+        return {
+            "success": dict(self.success),
+            "failure": dict(self.failure),
+            "categories": {action: dict(counts) for action, counts in list(self.categories.items())},
+            "retries": dict(self.retries),
+            "per_customer": ({user_id: {"success": s, "fail": f} for user_id, (s, f) in list(self.per_customer.items())}
+                             if include_customers else {}),
+            "connections": {pool: {"hit": h, "miss": m} for pool, (h, m) in list(self.connections.items())},
+            "arrivals": dict(zip(ARRIVAL_KEYS, self.arrivals)),
+            "latency": {action: h.copy() for action, h in list(self.latency.items())},
+            "corrected": {action: h.copy() for action, h in list(self.corrected.items())}
+        }
+
 
 class MetricsTracker:
-    def __init__(self):
-        self.success_counts = defaultdict(int)
-        self.failure_counts = defaultdict(int)
-        self.per_customer = defaultdict(lambda: {"success": 0, "fail": 0})
-        self.lock = threading.Lock()
+    """
+    Records success/failure counts, latency histograms and pool/arrival statistics.
+    Every recording thread writes into its own shard, and per-customer counts go into fixed array slots,
+    so recording takes no lock and costs the same however many threads record at once.
+    Shards are combined when metrics are read, and shards of finished threads are folded away in the background.
+    """
+    def __init__(self, aggregate_interval: float = 5):
+        self.lock = threading.Lock()  # guards the shard list and folded totals, never taken while recording
+        self.local = threading.local()
+        self.shards = []
+
+        # Per-customer slots, each customer's actions are recorded by one thread at a time so slots need no lock
+        self.customer_index = {}  # user_id -> slot
+        self.customer_slot = self.customer_index.get
+        self.customer_ids = []    # slot -> user_id
+        self.customer_success = array("Q")
+        self.customer_fail = array("Q")
+
+        # Totals of shards whose thread has finished, and of snapshots merged from other processes,
+        # with LatencyHistograms rather than dicts (see _merge_snapshot)
+        self.folded = _empty_snapshot()
+
+        # Queue depth gauges and session cache counters are read from the worker pool when a snapshot is taken
+        self.queue_source = None
+        self.session_source = None
+
+        # (phase name, start time, snapshot at the start), the last entry's name is None once the phases are over
+        self.phase_marks = []
+        # Phase breakdowns merged from other processes, name -> phase
+        self.merged_phases = {}
+
+        # Deques (action, latency) of every request is appended to, one per latency_feed() reader
+        self.latency_feeds = ()
+
+        self.aggregate_interval = aggregate_interval
+        self.aggregator = threading.Thread(target=self._aggregate_loop, daemon=True)
+        self.aggregator.start()
+
+    def register_customers(self, user_ids, index_of=None):
+        """
+        Gives every customer a fixed counter slot. Unregistered customers are still counted, just less compactly.
+        index_of(user_id) -> slot can be given to reuse an existing lookup (e.g. CustomerStore.row)
+        instead of building a user_id -> slot dict.
+        """
+        if index_of is not None:
+            with self.lock:
+                self.customer_ids = user_ids
+                self.customer_slot = index_of
+                self.customer_success = array("Q", bytes(8 * len(user_ids)))
+                self.customer_fail = array("Q", bytes(8 * len(user_ids)))
+            return
+
+        with self.lock:
+            for user_id in user_ids:
+                if user_id not in self.customer_index:
+                    self.customer_index[user_id] = len(self.customer_ids)
+                    self.customer_ids.append(user_id)
+            missing = len(self.customer_ids) - len(self.customer_success)
+            self.customer_success.extend([0] * missing)
+            self.customer_fail.extend([0] * missing)
+
+    def _shard(self) -> _MetricsShard:
+        try:
+            return self.local.shard
+        except AttributeError:
+            shard = _MetricsShard(threading.current_thread())
+            with self.lock:
+                self.shards.append(shard)
+            self.local.shard = shard
+            return shard
+
+    def log_success(self, action_name: str, user_id: int, latency: float = None, corrected_latency: float = None):
+        shard = self._shard()
+        shard.success[action_name] = shard.success.get(action_name, 0) + 1
+
+        slot = self.customer_slot(user_id)
+        if slot is not None:
+            self.customer_success[slot] += 1
+        else:
+            shard.per_customer.setdefault(user_id, [0, 0])[0] += 1
+
+        self._record_latency(shard, action_name, latency, corrected_latency)
+
+    def log_failure(self, action_name: str, user_id: int, latency: float = None, corrected_latency: float = None,
+                    category: str = "error"):
+        """
+        Records a failed action, category is what went wrong: 'timeout', 'connect_error', 'connection_lost',
+        'circuit_open', the status class of the response ('4xx', '5xx', ...) or 'error' for anything else.
+        """
+        shard = self._shard()
+        shard.failure[action_name] = shard.failure.get(action_name, 0) + 1
+        counts = shard.categories.get(action_name)
+        if counts is None:
+            counts = shard.categories[action_name] = {}
+        counts[category] = counts.get(category, 0) + 1
+
+        slot = self.customer_slot(user_id)
+        if slot is not None:
+            self.customer_fail[slot] += 1
+        else:
+            shard.per_customer.setdefault(user_id, [0, 0])[1] += 1
+
+        self._record_latency(shard, action_name, latency, corrected_latency)
+
+    def log_retry(self, action_name: str):
+        """
+        Records an attempt of the action that failed and is being retried, the final attempt is logged as usual.
+        """
+        shard = self._shard()
+        shard.retries[action_name] = shard.retries.get(action_name, 0) + 1
+
+    def latency_feed(self) -> deque:
+        """
+        Returns a new deque that (action, latency in seconds) of every request is appended to from now on,
+        for a reader that only needs the latencies recorded since it last looked (see LiveMetricsReporter).
+        Cheaper for it than copying every thread's histograms, and appending to a deque takes no lock.
+        """
+        feed = deque(maxlen=LATENCY_FEED_SIZE)
+        with self.lock:
+            self.latency_feeds = (*self.latency_feeds, feed)
+        return feed
+
+    def _record_latency(self, shard: _MetricsShard, action_name: str, latency: float | None,
+                        corrected_latency: float | None):
+        # corrected_latency includes any time the action spent waiting to be sent, which avoids coordinated omission
+        if latency is not None:
+            for feed in self.latency_feeds:
+                feed.append((action_name, latency))
+            histogram = shard.latency.get(action_name)
+            if histogram is None:
+                histogram = shard.latency[action_name] = LatencyHistogram()
+            histogram.record(latency)
+        if corrected_latency is not None:
+            histogram = shard.corrected.get(action_name)
+            if histogram is None:
+                histogram = shard.corrected[action_name] = LatencyHistogram()
+            histogram.record(corrected_latency)
+
+    def log_connection(self, pool: str, reused: bool):
+        """
+        Records a connection checkout from the HTTP pool for base_url 'pool'.
+        A hit reuses an open keep-alive connection, a miss opens a new one.
+        """
+        counts = self._shard().connections.setdefault(pool, [0, 0])
+        counts[0 if reused else 1] += 1
+
+    def log_arrivals(self, scheduled: int, dispatched: int, dropped: int, late: int, total_lag: float, max_lag: float,
+                     throttled: int = 0):
+        """
+        Records a batch of generator arrivals, lag is the delay between intended and actual send time in seconds.
+        Throttled arrivals were held back by the generator because the worker pool's queues were filling up.
+        """
+        arrivals = self._shard().arrivals
+        arrivals[0] += scheduled
+        arrivals[1] += dispatched
+        arrivals[2] += dropped
+        arrivals[3] += late
+        arrivals[4] += total_lag
+        arrivals[5] = max(arrivals[5], max_lag)
+        arrivals[6] += throttled
+
+    def set_queue_source(self, queue_source):
+        """
+        Registers a callable returning the worker pool's queue statistics (QUEUE_KEYS), included in every snapshot.
+        """
+        self.queue_source = queue_source
+
+    def set_session_source(self, session_source):
+        """
+        Registers a callable returning the session cache's statistics (SESSION_KEYS), included in every snapshot.
+        """
+        self.session_source = session_source
+
+    def mark_phase(self, name: str | None):
+        """
+        Tags a load profile phase boundary, everything recorded from now until the next mark belongs to phase 'name'.
+        None marks the end of the last phase.
+        """
+        snapshot = self.snapshot(include_customers=False)
+        with self.lock:
+            self.phase_marks.append((name, time.monotonic(), snapshot))
+
+    def phase_breakdown(self) -> list[dict]:
+        """
+        Returns the throughput, error rate and latency of every phase, from the snapshots taken at its boundaries.
+        Requests are counted in the phase they completed in.
+        """
+        with self.lock:
+            marks = list(self.phase_marks)
+        if not marks:
+            return list(self.merged_phases.values())
+        if marks[-1][0] is not None:
+            marks.append((None, time.monotonic(), self.snapshot(include_customers=False)))
+
+        breakdown = []
+        for (name, start, first), (_, end, last) in zip(marks, marks[1:]):
+            if name is None:
+                continue
+            success = sum(last["success"].values()) - sum(first["success"].values())
+            failure = sum(last["failure"].values()) - sum(first["failure"].values())
+            total = success + failure
+            duration = end - start
 
-    def log_success(self, action_name: str, user_id: int):
+            phase = {"name": name, "duration": duration, "success": success, "failure": failure,
+                     "rps": total / duration if duration else 0.0, "error_rate": failure / total if total else 0.0}
+            for key in ("latency", "corrected"):
+                histogram = LatencyHistogram()
+                for action, data in last[key].items():
+                    earlier = LatencyHistogram.from_dict(first[key].get(action, {}))
+                    histogram.merge(LatencyHistogram.from_dict(data).difference(earlier))
+                phase[key] = histogram.to_dict()
+            breakdown.append(phase)
+        return breakdown
+
+    def merge_phases(self, breakdown: list[dict]):
+        """
+        Adds another process' phase_breakdown() into this tracker's, phases are matched by name.
+        Processes run their phases side by side, so durations are taken as the longest rather than added up.
+        """
+        with self.lock:
+            for phase in breakdown:
+                merged = self.merged_phases.get(phase["name"])
+                if merged is None:
+                    self.merged_phases[phase["name"]] = dict(phase)
+                    continue
+
+                merged["duration"] = max(merged["duration"], phase["duration"])
+                merged["success"] += phase["success"]
+                merged["failure"] += phase["failure"]
+                total = merged["success"] + merged["failure"]
+                merged["rps"] = total / merged["duration"] if merged["duration"] else 0.0
+                merged["error_rate"] = merged["failure"] / total if total else 0.0
+                for key in ("latency", "corrected"):
+                    histogram = LatencyHistogram.from_dict(merged[key])
+                    histogram.merge(LatencyHistogram.from_dict(phase[key]))
+                    merged[key] = histogram.to_dict()
+
+    def _aggregate_loop(self):
+        while True:
+            time.sleep(self.aggregate_interval)
+            self._fold_finished_shards()
+
+    def _fold_finished_shards(self):
+        # A finished thread can't write to its shard anymore, so it is safe to fold into the totals and drop
         with self.lock:
-            self.success_counts[action_name] += 1
-            self.per_customer[user_id]["success"] += 1
+            finished = [shard for shard in self.shards if not shard.thread.is_alive()]
+            for shard in finished:
+                _merge_snapshot(self.folded, shard.snapshot())
+                self.shards.remove(shard)
+
+    def snapshot(self, include_customers: bool = True, include_latency: bool = True) -> dict:
+        """
+        Returns a plain, picklable copy of all counters, e.g. to send metrics between processes.
+        Per-customer counts can be left out, they are costly to copy with millions of customers,
+        as can the latency histograms, which cost the most to merge with thousands of recording threads.
+        The lock is only held to read the folded totals and the shard list, shards are copied and merged after,
+        so threads registering a new shard don't wait for the snapshot.
+        """
+        combined = _empty_snapshot()
+        # Per-customer counts and histograms also get folded, leave those out too when they aren't wanted
+        skipped = ((() if include_customers else ("per_customer",))
+                   + (() if include_latency else ("latency", "corrected")))
+        with self.lock:
+            if not skipped:
+                _merge_snapshot(combined, self.folded)
+            else:
+                _merge_snapshot(combined, {key: value for key, value in self.folded.items() if key not in skipped})
+            shards = list(self.shards)
+
+        for shard in shards:
+            _merge_snapshot(combined, shard.snapshot(include_customers, include_latency))
+        if self.queue_source is not None:
+            _merge_snapshot(combined, {"queue": self.queue_source()})
+        if self.session_source is not None:
+            _merge_snapshot(combined, {"session": self.session_source()})
+
+        if include_customers:
+            with self.lock:
+                customer_ids = self.customer_ids
+                success = self.customer_success.tolist()
+                fail = self.customer_fail.tolist()
+            customers = {}
+            for slot, user_id in enumerate(customer_ids):
+                if success[slot] or fail[slot]:
+                    customers[user_id] = {"success": success[slot], "fail": fail[slot]}
+            _merge_snapshot(combined, {"per_customer": customers})
 
-    def log_failure(self, action_name: str, user_id: int):
+        return _plain(combined)
+
+    def merge(self, snapshot: dict):
+        """
+        Adds the counters of a snapshot (see snapshot()) into this tracker.
+        """
         with self.lock:
-            self.failure_counts[action_name] += 1
-            self.per_customer[user_id]["fail"] += 1
+            _merge_snapshot(self.folded, snapshot)
+
+    def export_histograms(self, path: str):
+        """
+        Writes every latency histogram, with its percentiles, to a JSON file.
+        """
+        snapshot = self.snapshot()
+        export = {
+            "percentiles": PERCENTILES,
+            "latency": {action: self._describe(data) for action, data in snapshot["latency"].items()},
+            "corrected": {action: self._describe(data) for action, data in snapshot["corrected"].items()}
+        }
+        phases = self.phase_breakdown()
+        if phases:
+            export["phases"] = [{**phase, "latency": self._describe(phase["latency"]),
+                                 "corrected": self._describe(phase["corrected"])} for phase in phases]
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(export, f, indent=2)
+
+        logger.info(f"[MetricsTracker] exported latency histograms to '{path}'")
+
+    @staticmethod
+    def _describe(data: dict) -> dict:
+        histogram = LatencyHistogram.from_dict(data)
+        description = histogram.to_dict()
+        description["percentiles_ms"] = {str(p): histogram.percentile(p) * 1000 for p in PERCENTILES}
+        return description
 
     def display_summary(self):
+        snapshot = self.snapshot()
+
         print("===== Metrics Summary =====")
         print("HTTP Successes:")
-        for action, count in self.success_counts.items():
+        for action, count in snapshot["success"].items():
             print(f"  -  {action}: {count}")
         print("\nHTTP Failures:")
-        for action, count in self.failure_counts.items():
-            print(f"  -  {action}: {count}")
+        for action, count in snapshot["failure"].items():
+            categories = " | ".join(f"{category} {n}" for category, n in
+                                    sorted(snapshot["categories"].get(action, {}).items(), key=lambda item: -item[1]))
+            print(f"  -  {action}: {count} ({categories})" if categories else f"  -  {action}: {count}")
+
+        if snapshot["retries"]:
+            print("\nRetries:")
+            for action, count in snapshot["retries"].items():
+                print(f"  -  {action}: {count}")
+
+        self._display_latency("Latency (ms)", snapshot["latency"])
+        self._display_latency("Latency from intended send time (ms)", snapshot["corrected"])
+
+        arrivals = snapshot["arrivals"]
+        if arrivals["scheduled"]:
+            mean_lag = arrivals["total_lag"] / arrivals["dispatched"] if arrivals["dispatched"] else 0.0
+            print("\nArrivals:")
+            print(f"  -  scheduled {arrivals['scheduled']} | dispatched {arrivals['dispatched']} | "
+                  f"dropped {arrivals['dropped']} | late {arrivals['late']}")
+            print(f"  -  send lag mean {mean_lag * 1000:.2f} ms | max {arrivals['max_lag'] * 1000:.2f} ms")
+            if arrivals["throttled"]:
+                print(f"  -  throttled {arrivals['throttled']} (worker pool queues filling up)")
+
+        queue = snapshot["queue"]
+        if queue["accepted"]:
+            print("\nQueues:")
+            print(f"  -  depth {queue['depth']} | max depth {queue['max_depth']} | accepted {queue['accepted']}")
+            print(f"  -  dropped {queue['dropped']} | evicted {queue['evicted']} | shed {queue['shed']} | "
+                  f"blocked {queue['blocked']} ({queue['blocked_time']:.2f} s)")
+
+        session = snapshot["session"]
+        lookups = session["hits"] + session["misses"]
+        if lookups:
+            print("\nSessions:")
+            print(f"  -  hit rate {session['hits'] / lookups * 100:.1f}% | hits {session['hits']} | "
+                  f"misses {session['misses']} | cached {session['sessions']}")
+            print(f"  -  logins {session['logins']} | failed {session['login_failures']} | "
+                  f"backed off {session['backed_off']} | refreshed {session['refreshes']} | "
+                  f"left idle {session['idle']} | expired {session['expired']} | evicted {session['evicted']}")
+
+        phases = self.phase_breakdown()
+        if phases:
+            print("\nPhases:")
+            for phase in phases:
+                latency = LatencyHistogram.from_dict(phase["latency"])
+                corrected = LatencyHistogram.from_dict(phase["corrected"])
+                print(f"  -  {phase['name']} ({phase['duration']:.1f} s): {phase['rps']:.1f} rps | "
+                      f"errors {phase['error_rate'] * 100:.2f}% | p50 {latency.percentile(50) * 1000:.2f} ms | "
+                      f"p99 {latency.percentile(99) * 1000:.2f} ms | corrected p99 {corrected.percentile(99) * 1000:.2f} ms")
+
+        print("\nHTTP Connection Pools:")
+        for pool, stats in snapshot["connections"].items():
+            total = stats["hit"] + stats["miss"]
+            reuse_rate = stats["hit"] / total * 100 if total else 0.0
+            print(f"  -  {pool}: hits {stats['hit']} | misses {stats['miss']} | reused {reuse_rate:.1f}%")
 
         print("\nPer Customer:")
-        for user_id, stats in self.per_customer.items():
+        for user_id, stats in snapshot["per_customer"].items():
             print(f"  ID {user_id}: ✅ {stats['success']} | ❌ {stats['fail']}")
+
+    @staticmethod
+    def _display_latency(title: str, histograms: dict):
+        if not histograms:
+            return
+
+        print(f"\n{title}:")
+        for action, data in histograms.items():
+            histogram = LatencyHistogram.from_dict(data)
+            percentiles = " | ".join(f"p{p} {histogram.percentile(p) * 1000:.2f}" for p in PERCENTILES)
+            print(f"  -  {action}: {percentiles} | max {histogram.max * 1000:.2f} | n={histogram.total}")
+
+
+def merge_snapshots(snapshots) -> dict:
+    """
+    Returns a single snapshot with the counters of every snapshot added up, e.g. snapshots from several processes.
+    """
+    combined = _empty_snapshot()
+    for snapshot in snapshots:
+        _merge_snapshot(combined, snapshot)
+    return _plain(combined)
+
+def _empty_snapshot() -> dict:
+    return {
+        "success": {},
+        "failure": {},
+        "categories": {},
+        "retries": {},
+        "per_customer": {},
+        "connections": {},
+        "arrivals": dict.fromkeys(ARRIVAL_KEYS, 0),
+        "queue": dict.fromkeys(QUEUE_KEYS, 0),
+        "session": dict.fromkeys(SESSION_KEYS, 0),
+        "latency": {},
+        "corrected": {}
+    }
+
+def _plain(combined: dict) -> dict:
+    """
+    Turns the LatencyHistograms a snapshot was merged into back into dicts, once all merging is done.
+    """
+    for key in ("latency", "corrected"):
+        combined[key] = {action: histogram.to_dict() for action, histogram in combined[key].items()}
+    return combined
+
+def _merge_snapshot(into: dict, snapshot: dict):
+    """
+    Adds every counter of 'snapshot' into 'into', both in the snapshot() format except that the histograms
+    of 'into' are LatencyHistograms, so nothing is converted back and forth per merge (see _plain).
+    The histograms of 'snapshot' may be dicts or LatencyHistograms.
+    """
+    for key in ("success", "failure", "retries"):
+        for action, count in snapshot.get(key, {}).items():
+            into[key][action] = into[key].get(action, 0) + count
+
+    for action, counts in snapshot.get("categories", {}).items():
+        totals = into["categories"].setdefault(action, {})
+        for category, count in counts.items():
+            totals[category] = totals.get(category, 0) + count
+
+    for key, fields in (("per_customer", ("success", "fail")), ("connections", ("hit", "miss"))):
+        for name, stats in snapshot.get(key, {}).items():
+            totals = into[key].setdefault(name, dict.fromkeys(fields, 0))
+            for field in fields:
+                totals[field] += stats[field]
+
+    for field, value in snapshot.get("arrivals", {}).items():
+        if field == "max_lag":
+            into["arrivals"][field] = max(into["arrivals"][field], value)
+        else:
+            into["arrivals"][field] += value
+
+    for field, value in snapshot.get("queue", {}).items():
+        if field == "max_depth":
+            into["queue"][field] = max(into["queue"][field], value)
+        else:
+            into["queue"][field] += value
+
+    for field, value in snapshot.get("session", {}).items():
+        into["session"][field] += value
+
+    for key in ("latency", "corrected"):
+        histograms = into[key]
+        for action, data in snapshot.get(key, {}).items():
+            if not isinstance(data, LatencyHistogram):
+                data = LatencyHistogram.from_dict(data)
+            histogram = histograms.get(action)
+            if histogram is None:
+                histograms[action] = data.copy()
+            else:
+                histogram.merge(data)
@@ -0,0 +1,29 @@
+class RequestContext:
+    """
+    What a worker knows about a request it sent, handed to process_response(..., context) for behaviours that
+    accept it. Saves behaviours from decoding the request body again to find out what they sent.
+    """
+    __slots__ = ("action_name", "user_id", "body", "intended_time", "start_time", "end_time")
+
+    def __init__(self, action_name: str, user_id: int, body: dict | None, intended_time: float | None = None):
+        self.action_name = action_name
+        self.user_id = user_id
+        self.body = body  # the dict the request body was built from (body template fields when templated)
+        self.intended_time = intended_time
+        self.start_time = None
+        self.end_time = None
+
+    @property
+    def latency(self) -> float | None:
+        if self.start_time is None or self.end_time is None:
+            return None
+        return self.end_time - self.start_time
+
+    @property
+    def corrected_latency(self) -> float | None:
+        if self.intended_time is None or self.end_time is None:
+            return None
+        return self.end_time - self.intended_time
+
+    def __repr__(self):
+        return f"<RequestContext {self.action_name} {self.user_id}>"
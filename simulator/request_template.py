@@ -0,0 +1,104 @@
+import re
+
+from util import json_codec
+
+class TemplateField:
+    """
+    Placeholder for a per-request value inside a BodyTemplate.
+    """
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __repr__(self):
+        return f"<TemplateField {self.name}>"
+
+
+class BodyTemplate:
+    """
+    A JSON body encoded once, with only its TemplateField values encoded per request.
+    render() joins the pre-encoded segments with the encoded field values, so the static
+    parts of the body are never serialised again.
+
+        template = BodyTemplate({"user_id": TemplateField("user_id"), "quantity": 1})
+        template.render({"user_id": 7})  # b'{"user_id":7,"quantity":1}'
+    """
+    def __init__(self, template: dict):
+        markers = {}  # encoded marker -> field name
+
+        def replace(value):
+            if isinstance(value, TemplateField):
+                marker = f"__template_field_{value.name}__"
+                markers[json_codec.dumps(marker).decode("utf-8")] = value.name
+                return marker
+            if isinstance(value, dict):
+                return {key: replace(item) for key, item in value.items()}
+            if isinstance(value, list):
+                return [replace(item) for item in value]
+            return value
+
+        encoded = json_codec.dumps(replace(template)).decode("utf-8")
+
+        self.segments = []  # static bytes around the fields, always one more than fields
+        self.fields = []    # field names in the order they appear
+        position = 0
+        if markers:
+            for match in re.finditer("|".join(re.escape(marker) for marker in markers), encoded):
+                self.segments.append(encoded[position:match.start()].encode("utf-8"))
+                self.fields.append(markers[match.group()])
+                position = match.end()
+        self.segments.append(encoded[position:].encode("utf-8"))
+
+    @staticmethod
+    def _encode_value(value) -> bytes:
+        # ints are by far the most common field, skip the JSON encoder for them
+        if type(value) is int:
+            return str(value).encode("ascii")
+        return json_codec.dumps(value)
+
+    def render(self, values: dict) -> bytes:
+        """
+        Returns the encoded body with every field filled in from 'values'.
+        """
+        segments = self.segments
+        parts = [segments[0]]
+        for index, field in enumerate(self.fields):
+            parts.append(self._encode_value(values[field]))
+            parts.append(segments[index + 1])
+        return b"".join(parts)
+
+
+def build_request(action: dict, customer, session=None) -> tuple:
+    """
+    Returns (endpoint, method, headers, body, body_data) for a registered action.
+    Parts cached at registration are reused as they are, the behaviour is only asked for the rest.
+    With a session the headers are always built per request, get_header(customer, config, session=session).
+    With a body template the body is rendered to bytes from the behaviour's get_body_fields,
+    body_data is the dict the body was built from either way.
+    """
+    config = action["config"]
+    behaviour = action["behaviour"]
+    static = action["static"]
+
+    endpoint = static.get("endpoint")
+    if endpoint is None:
+        endpoint = behaviour.get_endpoint(customer, config)
+    method = static.get("method")
+    if method is None:
+        method = behaviour.get_method(customer, config)
+    if session is not None:
+        headers = behaviour.get_header(customer, config, session=session)
+    else:
+        headers = static.get("headers")
+        if headers is None:
+            headers = behaviour.get_header(customer, config)
+
+    body_template = action["body_template"]
+    if body_template is None:
+        body = body_data = behaviour.get_body(customer, config)
+    else:
+        body_data = behaviour.get_body_fields(customer, config)
+        body = None if body_data is None else body_template.render(body_data)
+
+    return endpoint, method, headers, body, body_data
@@ -0,0 +1,249 @@
+import random
+import threading
+import time
+
+from util.log import get_logger
+
+logger = get_logger(__name__)
+
+# Failure categories recorded in metrics, besides the status class of non-200 responses ('4xx', '5xx', ...)
+TIMEOUT = "timeout"                     # no response in time, the request may have been processed
+CONNECT_ERROR = "connect_error"         # no connection could be established, so nothing was sent
+CONNECTION_LOST = "connection_lost"     # the connection broke once established (reset, closed, TLS error), same caveat
+CIRCUIT_OPEN = "circuit_open"   # failed fast without a request, the action's circuit breaker is open
+ERROR = "error"                 # anything else raised while building, sending or processing a request
+
+# Failures that say the target is unhealthy, counted by the circuit breaker. A 4xx is the request's fault, not the target's
+BREAKER_FAILURES = frozenset({TIMEOUT, CONNECT_ERROR, CONNECTION_LOST, "5xx"})
+
+DEFAULT_RESILIENCE_CONFIG = {
+    "connect_timeout": None,        # seconds to wait for a connection, defaults to the worker pool's request_timeout
+    "read_timeout": None,           # seconds to wait for the response, defaults to request_timeout
+    "retries": 0,                   # extra attempts after a failure listed in retry_on
+    "retry_on": [CONNECT_ERROR, TIMEOUT, "5xx"],
+    "backoff_seconds": 0.05,        # the first retry waits up to this long, doubling with every attempt (full jitter)
+    "max_backoff_seconds": 1.0,
+    "circuit_breaker": {
+        "enabled": False,
+        "failure_threshold": 5,     # consecutive timeouts, connection failures or 5xx responses that open the circuit
+        "open_seconds": 5           # requests fail fast this long, then a single probe request is let through
+    }
+}
+
+
+def load_resilience_config(config: dict | None, action_name: str = None) -> dict:
+    """
+    Merges an action's 'resilience' section over the defaults.
+    """
+    resilience_config = dict(DEFAULT_RESILIENCE_CONFIG)
+    resilience_config.update(config or {})
+    resilience_config["circuit_breaker"] = {**DEFAULT_RESILIENCE_CONFIG["circuit_breaker"],
+                                            **(resilience_config.get("circuit_breaker") or {})}
+
+    if resilience_config["retries"] < 0:
+        raise ValueError(f"Action '{action_name}' resilience retries must be 0 or more, got {resilience_config['retries']}")
+    for category in resilience_config["retry_on"]:
+        if category not in (TIMEOUT, CONNECT_ERROR, CONNECTION_LOST) and not _is_status_class(category):
+            raise ValueError(f"Action '{action_name}' has unknown retry_on '{category}', "
+                             f"expected '{TIMEOUT}', '{CONNECT_ERROR}', '{CONNECTION_LOST}' "
+                             f"or a status class like '5xx'")
+    if resilience_config["circuit_breaker"]["failure_threshold"] < 1:
+        raise ValueError(f"Action '{action_name}' circuit_breaker failure_threshold must be at least 1")
+    return resilience_config
+
+def _is_status_class(category: str) -> bool:
+    return len(category) == 3 and category[0].isdigit() and category[1:] == "xx"
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of sending a request while the action's circuit breaker is open.
+    """
+
+
+# Exceptions are classified by class name so no HTTP client has to be imported here.
+# Raised when a connection couldn't be established: requests/urllib3, aiohttp, httpx and the socket below them
+_CONNECT_ERRORS = frozenset({"ConnectTimeout", "ConnectTimeoutError", "NewConnectionError", "ClientConnectorError",
+                             "ConnectionTimeoutError", "ConnectError", "ConnectionRefusedError"})
+# Raised when an established connection broke. requests raises its ConnectionError for refused connections too,
+# so what it wraps is classified as well (see classify_exception)
+_CONNECTION_LOST_ERRORS = frozenset({"ConnectionError", "ConnectionResetError", "ConnectionAbortedError",
+                                     "BrokenPipeError", "SSLError", "ProtocolError", "ChunkedEncodingError",
+                                     "ClientConnectionError", "ClientOSError", "ServerDisconnectedError",
+                                     "ClientPayloadError", "RemoteProtocolError", "ReadError", "WriteError",
+                                     "NetworkError"})
+
+# exception type -> category
+_exception_categories = {}
+
+def classify_exception(e: Exception) -> str:
+    """
+    Returns the failure category of an exception raised by requests, aiohttp or httpx (or the socket below them).
+    The most specific class decides, e.g. requests' ConnectTimeout is a connect error while ReadTimeout is a timeout.
+    Only a failure to establish the connection is a connect error, a connection that broke mid-request
+    (reset, closed, TLS error) is 'connection_lost' and a response (or body) that took too long is a timeout,
+    as the request may have reached the target in both cases.
+    """
+    category = _classify_type(type(e))
+    if category == CONNECTION_LOST:
+        # requests wraps urllib3's error (in a MaxRetryError) in a ConnectionError,
+        # whether the connection was refused, reset or timed out reading the body
+        cause = _wrapped_exception(e)
+        for _ in range(4):
+            if cause is None:
+                break
+            wrapped_category = _classify_type(type(cause))
+            if wrapped_category in (CONNECT_ERROR, TIMEOUT):
+                return wrapped_category
+            cause = _wrapped_exception(cause)
+    return category
+
+def _classify_type(exception_type: type) -> str:
+    category = _exception_categories.get(exception_type)
+    if category is not None:
+        return category
+
+    category = ERROR
+    if issubclass(exception_type, CircuitOpenError):
+        category = CIRCUIT_OPEN
+    else:
+        for cls in exception_type.__mro__:
+            if cls.__name__ in _CONNECT_ERRORS:
+                category = CONNECT_ERROR
+                break
+            if cls.__name__ in _CONNECTION_LOST_ERRORS:
+                category = CONNECTION_LOST
+                break
+            if "Timeout" in cls.__name__:
+                category = TIMEOUT
+                break
+    _exception_categories[exception_type] = category
+    return category
+
+def _wrapped_exception(e: BaseException) -> BaseException | None:
+    """
+    Returns the exception e was raised for: urllib3's MaxRetryError.reason, an exception passed as e's first
+    argument (how requests and urllib3 wrap errors), or the explicit cause.
+    """
+    reason = getattr(e, "reason", None)
+    if isinstance(reason, BaseException):
+        return reason
+    if e.args and isinstance(e.args[0], BaseException):
+        return e.args[0]
+    for arg in e.args[1:]:
+        if isinstance(arg, BaseException):
+            return arg
+    return e.__cause__
+
+def status_category(status_code: int) -> str | None:
+    """
+    Returns the failure category of a response, None for 200 which is the only status counted as a success.
+    """
+    if status_code == 200:
+        return None
+    return f"{status_code // 100}xx"
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures, then fails every request fast for open_seconds
+    so a dead target doesn't hold every worker for a full timeout. After that a single probe request is let through,
+    its success closes the circuit and its failure opens it again.
+    While closed, allow() and a successful record() take no lock.
+    """
+    def __init__(self, name: str, failure_threshold: int, open_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+
+        self.lock = threading.Lock()
+        self.failures = 0       # consecutive failures
+        self.opened_at = None   # time.monotonic() the circuit opened, None while closed
+        self.probing = False    # a probe request is in flight
+        self.opened = 0         # times the circuit has opened
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.probing or time.monotonic() - self.opened_at < self.open_seconds:
+                return False
+            self.probing = True
+            return True
+
+    def record(self, failed: bool):
+        if not failed and not self.failures and self.opened_at is None:
+            return
+
+        with self.lock:
+            if not failed:
+                if self.opened_at is not None:
+                    logger.info(f"[{self}] closed, target is responding again")
+                self.failures = 0
+                self.opened_at = None
+                self.probing = False
+                return
+
+            self.failures += 1
+            if self.probing or (self.opened_at is None and self.failures >= self.failure_threshold):
+                if self.opened_at is None:
+                    self.opened += 1
+                    logger.warning(f"[{self}] opened after {self.failures} consecutive failures, "
+                                   f"failing fast for {self.open_seconds}s")
+                self.opened_at = time.monotonic()
+                self.probing = False
+
+    def __repr__(self):
+        return f"<CircuitBreaker {self.name}>"
+
+
+class ResiliencePolicy:
+    """
+    An action's timeouts, retries and circuit breaker, built once at registration from its 'resilience' config.
+    Workers call before_request() ahead of every attempt and retry_delay() with its outcome.
+    """
+    def __init__(self, action_name: str, config: dict | None):
+        self.config = load_resilience_config(config, action_name)
+
+        self.connect_timeout = self.config["connect_timeout"]
+        self.read_timeout = self.config["read_timeout"]
+        self.retries = self.config["retries"]
+        self.retry_on = frozenset(self.config["retry_on"])
+        self.backoff_seconds = self.config["backoff_seconds"]
+        self.max_backoff_seconds = self.config["max_backoff_seconds"]
+
+        breaker_config = self.config["circuit_breaker"]
+        self.breaker = None
+        if breaker_config["enabled"]:
+            self.breaker = CircuitBreaker(action_name, breaker_config["failure_threshold"], breaker_config["open_seconds"])
+
+    def timeouts(self, default: float) -> tuple[float | None, float]:
+        """
+        Returns (connect timeout, read timeout), the connect timeout is None when not set
+        so the HTTP client keeps a single overall timeout.
+        """
+        return self.connect_timeout, self.read_timeout or default
+
+    def before_request(self):
+        """
+        Raises CircuitOpenError if the request must not be sent.
+        """
+        if self.breaker and not self.breaker.allow():
+            raise CircuitOpenError(f"circuit open for '{self.breaker.name}'")
+
+    def retry_delay(self, category: str | None, attempt: int) -> float | None:
+        """
+        Records the outcome of attempt (0 for the first) with the circuit breaker, category None is a success.
+        Returns the seconds to wait before retrying, or None if the outcome is final.
+        Nothing is retried once the circuit has opened, so the failure is counted as what it was.
+        """
+        if self.breaker:
+            self.breaker.record(category in BREAKER_FAILURES)
+            if self.breaker.opened_at is not None:
+                return None
+        if category is None or attempt >= self.retries or category not in self.retry_on:
+            return None
+        return random.uniform(0, min(self.max_backoff_seconds, self.backoff_seconds * 2 ** attempt))
@@ -0,0 +1,260 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from simulator.action_registry import ActionRegistry
+from simulator.customer import Customer
+from simulator.metrics import SESSION_KEYS
+from simulator.request_template import build_request
+from util.log import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_SESSION_CONFIG = {
+    "enabled": False,
+    "login_action": "Login",        # registered action whose behaviour implements get_session
+    "ttl_seconds": 900,             # token lifetime when the login response doesn't give one
+    "refresh_before_seconds": 60,   # log in again this long before a token expires, 0 = only on expiry
+    "idle_seconds": 300,            # sessions unused this long aren't refreshed, they are left to expire
+    "login_retry_seconds": 1,       # a customer whose login failed goes without a session this long before retrying,
+    "max_login_retry_seconds": 60,  # doubling with every consecutive failure up to this
+    "max_sessions": 1000000,        # least recently used sessions are evicted beyond this
+    "refresh_threads": 2,           # background logins at once (threaded and keyed engines)
+    "login_timeout": 10
+}
+
+
+def load_session_config(config: dict | None) -> dict:
+    session_config = dict(DEFAULT_SESSION_CONFIG)
+    session_config.update(config or {})
+    if session_config["max_sessions"] < 1:
+        raise ValueError(f"sessions max_sessions must be at least 1, got {session_config['max_sessions']}")
+    return session_config
+
+
+class Session:
+    __slots__ = ("token", "expires_at", "customer", "last_used")
+
+    def __init__(self, token, expires_at: float, customer: Customer):
+        self.token = token
+        self.expires_at = expires_at   # time.monotonic()
+        self.customer = customer
+        self.last_used = time.monotonic()
+
+    def __repr__(self):
+        return f"<Session {self.customer.user_id}>"
+
+
+class SessionCache:
+    """
+    Per-customer login sessions, so authenticated actions don't log in before every request.
+    A customer is logged in with the login action the first time an action needs its session, and the token is
+    cached until it expires. Tokens of sessions used in the last 'idle_seconds' are refreshed in the background
+    'refresh_before_seconds' before expiry, so busy customers never wait for a login again, idle ones expire.
+    Only 'max_sessions' are kept, least recently used first out.
+    After a failed login the customer's actions go without a session for 'login_retry_seconds', doubling with every
+    consecutive failure, so an auth outage doesn't turn every action into a login.
+    The login behaviour only reads the customer, so background refreshes don't break per-customer ordering.
+
+    With the asyncio engine pass the pool's event loop, logins then run on the loop through get_async().
+    """
+    def __init__(self, config: dict | None, action_registry: ActionRegistry, http, loop: asyncio.AbstractEventLoop = None):
+        self.config = load_session_config(config)
+        self.ttl = self.config["ttl_seconds"]
+        self.refresh_before = self.config["refresh_before_seconds"]
+        self.max_sessions = self.config["max_sessions"]
+        self.login_timeout = self.config["login_timeout"]
+        self.idle_seconds = self.config["idle_seconds"]
+        self.login_retry = self.config["login_retry_seconds"]
+        self.max_login_retry = self.config["max_login_retry_seconds"]
+
+        login_action = self.config["login_action"]
+        try:
+            self.login_action = action_registry.get(login_action)
+        except KeyError:
+            raise ValueError(f"Session login action '{login_action}' is not a registered action")
+        if not hasattr(self.login_action["behaviour"], "get_session"):
+            raise ValueError(f"Session login action '{login_action}' has no get_session")
+
+        self.http = http
+        self.loop = loop
+
+        self.lock = threading.Lock()
+        self.sessions = OrderedDict()  # user_id -> Session, least recently used first
+        self.failed_logins = {}        # user_id -> [time.monotonic() to retry at, current backoff] after a failed login
+        self.counters = dict.fromkeys(SESSION_KEYS, 0)
+
+        # (refresh time, order, session), sessions that were replaced or evicted in the meantime are skipped
+        self.refresh_heap = []
+        self.order = itertools.count()
+        self.refresh_condition = threading.Condition(self.lock)
+        self.shutdown_event = threading.Event()
+
+        self.refresher = None
+        self.executor = None
+        if self.refresh_before:
+            if self.loop is None:
+                self.executor = ThreadPoolExecutor(self.config["refresh_threads"], thread_name_prefix="session-refresh")
+            self.refresher = threading.Thread(target=self._refresh_loop, daemon=True)
+            self.refresher.start()
+
+        logger.info(f"[SessionCache] logging customers in with '{login_action}', "
+                    f"up to {self.max_sessions} sessions cached")
+
+    def _lookup(self, customer: Customer) -> Session | None:
+        now = time.monotonic()
+        with self.lock:
+            session = self.sessions.get(customer.user_id)
+            if session is not None and session.expires_at <= now:
+                del self.sessions[customer.user_id]
+                self.counters["expired"] += 1
+                session = None
+
+            if session is None:
+                self.counters["misses"] += 1
+                return None
+
+            self.sessions.move_to_end(customer.user_id)
+            session.last_used = now
+            self.counters["hits"] += 1
+            return session
+
+    def _may_login(self, customer: Customer) -> bool:
+        # False while the customer's last failed login is backing off
+        with self.lock:
+            failed = self.failed_logins.get(customer.user_id)
+            if failed is not None and time.monotonic() < failed[0]:
+                self.counters["backed_off"] += 1
+                return False
+            return True
+
+    def get(self, customer: Customer) -> Session | None:
+        """
+        Returns the customer's session, logging in first when there is no valid one.
+        None if the login failed, or failed recently and is backing off.
+        """
+        session = self._lookup(customer)
+        if session is None and self._may_login(customer):
+            session = self._login(customer)
+        return session
+
+    async def get_async(self, customer: Customer) -> Session | None:
+        """
+        get() for the asyncio engine, the login runs on the event loop.
+        """
+        session = self._lookup(customer)
+        if session is None and self._may_login(customer):
+            session = await self._login_async(customer)
+        return session
+
+    def _login_request(self, customer: Customer) -> dict:
+        endpoint, method, headers, body, _ = build_request(self.login_action, customer)
+        return {
+            "base_url": self.login_action["config"].get("base_url"),
+            "method": method,
+            "url": endpoint,
+            "headers": headers,
+            "body": body,
+            "timeout": self.login_timeout
+        }
+
+    def _login(self, customer: Customer) -> Session | None:
+        try:
+            response = self.http.request(**self._login_request(customer))
+        except Exception as e:
+            return self._login_failed(customer, e)
+        return self._store(customer, response)
+
+    async def _login_async(self, customer: Customer) -> Session | None:
+        try:
+            response = await self.http.request(**self._login_request(customer))
+        except Exception as e:
+            return self._login_failed(customer, e)
+        return self._store(customer, response)
+
+    def _login_failed(self, customer: Customer, reason) -> None:
+        with self.lock:
+            self.counters["login_failures"] += 1
+            failed = self.failed_logins.get(customer.user_id)
+            backoff = min(failed[1] * 2, self.max_login_retry) if failed else self.login_retry
+            self.failed_logins[customer.user_id] = [time.monotonic() + backoff, backoff]
+        logger.debug("[SessionCache] login failed for %s: %s", customer, reason)
+        return None
+
+    def _store(self, customer: Customer, response) -> Session | None:
+        action = self.login_action
+        try:
+            result = action["behaviour"].get_session(customer, response, action["config"])
+        except Exception as e:
+            return self._login_failed(customer, e)
+        if not result:
+            return self._login_failed(customer, f"status {response.status_code}, no token")
+
+        token, ttl = result
+        ttl = ttl or self.ttl
+        session = Session(token, time.monotonic() + ttl, customer)
+
+        with self.lock:
+            # A background refresh keeps the replaced session's last use, so idle sessions still expire
+            previous = self.sessions.get(customer.user_id)
+            if previous is not None:
+                session.last_used = previous.last_used
+            self.failed_logins.pop(customer.user_id, None)
+
+            self.sessions[customer.user_id] = session
+            self.sessions.move_to_end(customer.user_id)
+            self.counters["logins"] += 1
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+                self.counters["evicted"] += 1
+
+            if self.refresher and ttl > self.refresh_before:
+                heapq.heappush(self.refresh_heap, (session.expires_at - self.refresh_before, next(self.order), session))
+                self.refresh_condition.notify()
+
+        return session
+
+    def _refresh_loop(self):
+        while not self.shutdown_event.is_set():
+            with self.refresh_condition:
+                if not self.refresh_heap:
+                    self.refresh_condition.wait(1)
+                    continue
+                refresh_at, _, session = self.refresh_heap[0]
+                wait = refresh_at - time.monotonic()
+                if wait > 0:
+                    self.refresh_condition.wait(min(wait, 1))
+                    continue
+                heapq.heappop(self.refresh_heap)
+
+                # Only refresh sessions that are still cached and were used lately, idle ones are left to expire
+                if self.sessions.get(session.customer.user_id) is not session:
+                    continue
+                if time.monotonic() - session.last_used > self.idle_seconds:
+                    self.counters["idle"] += 1
+                    continue
+                self.counters["refreshes"] += 1
+
+            if self.loop is not None:
+                asyncio.run_coroutine_threadsafe(self._login_async(session.customer), self.loop)
+            else:
+                self.executor.submit(self._login, session.customer)
+
+    def stats(self) -> dict:
+        with self.lock:
+            stats = dict(self.counters)
+            stats["sessions"] = len(self.sessions)
+        return stats
+
+    def shutdown(self):
+        self.shutdown_event.set()
+        with self.refresh_condition:
+            self.refresh_condition.notify()
+        if self.refresher:
+            self.refresher.join(timeout=2)
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
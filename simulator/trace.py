@@ -0,0 +1,151 @@
+import heapq
+import json
+import struct
+import sys
+import threading
+import time
+from collections import deque
+
+from util.log import get_logger
+
+logger = get_logger(__name__)
+
+# Header : magic, wall clock start (time.time()), length of the JSON action name table that follows
+TRACE_MAGIC = b"ACSTRC01"
+TRACE_HEADER = struct.Struct("<8sdI")
+# Record : seconds since start, user_id, action (index into the name table), HTTP status (0 = no response),
+#          latency in seconds (-1 = no response)
+TRACE_RECORD = struct.Struct("<dqHHf")
+
+READ_CHUNK_RECORDS = 4096
+
+
+class TraceRecorder:
+    """
+    Appends every executed action to a compact binary trace, 24 bytes per action.
+    Workers only append a tuple to a deque, a writer thread packs and writes them in batches.
+    """
+    def __init__(self, path: str, action_names: list[str], flush_interval: float = 0.2):
+        self.path = path
+        self.action_ids = {name: index for index, name in enumerate(action_names)}
+        self.flush_interval = flush_interval
+
+        self.start = time.monotonic()
+        self.pending = deque()
+        self.recorded = 0
+
+        names = json.dumps(list(action_names)).encode("utf-8")
+        self.file = open(path, "wb")
+        self.file.write(TRACE_HEADER.pack(TRACE_MAGIC, time.time(), len(names)))
+        self.file.write(names)
+
+        self.shutdown_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+        logger.info(f"[TraceRecorder] recording actions to '{path}'")
+
+    def record(self, intended_time: float, user_id: int, action_name: str, status: int = 0, latency: float = None):
+        """
+        Records one action. intended_time is when it was meant to be sent (time.monotonic()),
+        so replaying the trace reproduces the original schedule rather than its delays.
+        """
+        self.pending.append((intended_time, user_id, action_name, status, latency))
+
+    def _run(self):
+        while not self.shutdown_event.wait(self.flush_interval):
+            self._flush()
+        self._flush()
+
+    def _flush(self):
+        pending = self.pending
+        if not pending:
+            return
+
+        pack = TRACE_RECORD.pack
+        action_ids = self.action_ids
+        start = self.start
+        chunks = []
+        for _ in range(len(pending)):
+            intended_time, user_id, action_name, status, latency = pending.popleft()
+            action_id = action_ids.get(action_name)
+            if action_id is None:
+                continue
+            chunks.append(pack(intended_time - start, user_id, action_id, status or 0,
+                               -1.0 if latency is None else latency))
+
+        self.file.write(b"".join(chunks))
+        self.recorded += len(chunks)
+
+    def close(self):
+        self.shutdown_event.set()
+        self.thread.join()
+        self.file.close()
+        logger.info(f"[TraceRecorder] recorded {self.recorded} actions to '{self.path}'")
+
+
+def read_trace_header(file) -> tuple[float, list[str]]:
+    """
+    Reads the header of an open trace file, returns (wall clock start time, action names).
+    """
+    magic, started, names_length = TRACE_HEADER.unpack(file.read(TRACE_HEADER.size))
+    if magic != TRACE_MAGIC:
+        raise ValueError(f"'{file.name}' is not an action trace")
+    return started, json.loads(file.read(names_length))
+
+
+def _read_records(path: str, start: float = None):
+    # Offsets are relative to the file's own start, start (wall clock) rebases them onto another one
+    with open(path, "rb") as file:
+        started, action_names = read_trace_header(file)
+        shift = started - start if start is not None else 0.0
+        chunk_size = TRACE_RECORD.size * READ_CHUNK_RECORDS
+        while chunk := file.read(chunk_size):
+            # A trace cut off mid-record (e.g. a killed run) ends at its last whole record
+            chunk = chunk[:len(chunk) - len(chunk) % TRACE_RECORD.size]
+            for offset, user_id, action_id, status, latency in TRACE_RECORD.iter_unpack(chunk):
+                yield offset + shift, user_id, action_names[action_id], status, (None if latency < 0 else latency)
+
+
+def read_trace(paths: str | list[str]):
+    """
+    Streams (offset, user_id, action_name, status, latency) records from one or more trace files.
+    Files are read in chunks, so traces of any length use constant memory.
+    Records are in the order actions finished, which is only roughly offset order, several files are merged by offset.
+    Each file's offsets count from its own start, so with several files they are rebased onto the earliest one's.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    if len(paths) == 1:
+        return _read_records(paths[0])
+
+    # Sharded runs record one file per shard, every shard started its trace at a slightly different time
+    starts = []
+    for path in paths:
+        with open(path, "rb") as file:
+            starts.append(read_trace_header(file)[0])
+    start = min(starts)
+    return heapq.merge(*(_read_records(path, start) for path in paths))
+
+
+def summarize(paths: list[str]):
+    count = 0
+    first = last = None
+    per_action = {}
+    for offset, _, action_name, status, _ in read_trace(paths):
+        count += 1
+        first = offset if first is None else min(first, offset)
+        last = offset if last is None else max(last, offset)
+        success, failure = per_action.get(action_name, (0, 0))
+        per_action[action_name] = (success + 1, failure) if status == 200 else (success, failure + 1)
+
+    print(f"{count} actions over {(last or 0) - (first or 0):.1f}s")
+    for action_name, (success, failure) in per_action.items():
+        print(f"  {action_name}: {success} success, {failure} failure")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python -m simulator.trace <trace file> [<trace file> ...]")
+        sys.exit(1)
+    summarize(sys.argv[1:])
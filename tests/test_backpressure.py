@@ -0,0 +1,149 @@
+import threading
+import time
+
+import pytest
+
+from simulator.backpressure import ACCEPT, EVICT, REJECT, QueueLimiter, load_queue_config
+
+
+def limiter(customers: int = 2, **config) -> QueueLimiter:
+    # Customers are user ids 0..customers-1, each is its own slot
+    return QueueLimiter(config, lambda user_id: user_id, customers)
+
+
+def test_unknown_overflow_policy_is_rejected():
+    with pytest.raises(ValueError):
+        load_queue_config({"overflow": "spill"})
+
+
+def test_unbounded_accepts_everything():
+    queue = limiter()
+
+    assert all(queue.admit(0) == ACCEPT for _ in range(1_000))
+    assert queue.load() == 0.0
+    assert queue.stats()["depth"] == 1_000
+
+
+def test_drop_newest_rejects_once_the_customer_is_full():
+    queue = limiter(max_per_customer=2, overflow="drop_newest")
+
+    assert [queue.admit(0) for _ in range(3)] == [ACCEPT, ACCEPT, REJECT]
+    # Other customers have their own bound
+    assert queue.admit(1) == ACCEPT
+
+    queue.release(0)
+    assert queue.admit(0) == ACCEPT
+
+    stats = queue.stats()
+    assert stats["dropped"] == 1
+    assert stats["accepted"] == 4
+    assert stats["max_depth"] == 3
+
+
+def test_drop_oldest_evicts_and_keeps_the_depth():
+    queue = limiter(max_per_customer=1, overflow="drop_oldest")
+
+    assert queue.admit(0) == ACCEPT
+    assert queue.admit(0) == EVICT
+    # The pool evicts the customer's oldest action and releases its room
+    queue.release(0)
+
+    stats = queue.stats()
+    assert stats["depth"] == 1
+    assert stats["evicted"] == 1
+
+
+def test_cancel_eviction_counts_a_drop():
+    queue = limiter(max_per_customer=1, overflow="drop_oldest")
+    queue.admit(0)
+    assert queue.admit(0) == EVICT
+
+    queue.cancel_eviction(0)
+
+    stats = queue.stats()
+    assert stats["depth"] == 1
+    assert (stats["accepted"], stats["evicted"], stats["dropped"]) == (1, 0, 1)
+
+
+def test_shed_drops_until_drained_to_half():
+    queue = limiter(max_total=4, overflow="shed")
+    for _ in range(4):
+        assert queue.admit(0) == ACCEPT
+
+    assert queue.admit(1) == REJECT
+    queue.release(0)
+    # Below max_total, but still shedding until the depth is down to 2
+    assert queue.admit(1) == REJECT
+    queue.release(0)
+    assert queue.admit(1) == ACCEPT
+    assert queue.load() == 0.75
+
+    assert queue.stats()["shed"] == 2
+
+
+def test_block_waits_for_room():
+    queue = limiter(max_total=1, overflow="block", block_timeout=5)
+    queue.admit(0)
+    threading.Timer(0.1, queue.release, args=(0,)).start()
+
+    start = time.monotonic()
+    assert queue.admit(1) == ACCEPT
+    assert time.monotonic() - start < 2
+
+    stats = queue.stats()
+    assert stats["blocked"] == 1
+    assert stats["dropped"] == 0
+
+
+def test_block_drops_after_the_timeout():
+    queue = limiter(max_total=1, overflow="block", block_timeout=0.05)
+    queue.admit(0)
+
+    assert queue.admit(1) == REJECT
+
+    stats = queue.stats()
+    assert (stats["blocked"], stats["dropped"]) == (1, 1)
+    assert stats["blocked_time"] >= 0.05
+
+
+def test_block_false_drops_without_waiting():
+    queue = limiter(max_total=1, overflow="block", block_timeout=5)
+    queue.admit(0)
+
+    start = time.monotonic()
+    assert queue.admit(1, block=False) == REJECT
+    assert time.monotonic() - start < 1
+
+    stats = queue.stats()
+    assert (stats["blocked"], stats["dropped"]) == (0, 1)
+
+
+def test_release_wakes_the_waiter_whose_bound_freed():
+    # Customer 0 waits on its own full slot, customer 1 on its own. Freeing customer 1's slot must admit
+    # customer 1 straight away, even though customer 0 started waiting first
+    queue = limiter(max_per_customer=1, overflow="block", block_timeout=5)
+    queue.admit(0)
+    queue.admit(1)
+
+    results = {}
+
+    def admit(user_id):
+        start = time.monotonic()
+        results[user_id] = (queue.admit(user_id), time.monotonic() - start)
+
+    first = threading.Thread(target=admit, args=(0,))
+    first.start()
+    time.sleep(0.1)
+    second = threading.Thread(target=admit, args=(1,))
+    second.start()
+    time.sleep(0.1)
+
+    queue.release(1)
+    second.join(timeout=10)
+    outcome, waited = results[1]
+    assert outcome == ACCEPT
+    assert waited < 2
+
+    queue.release(0)
+    first.join(timeout=10)
+    assert results[0][0] == ACCEPT
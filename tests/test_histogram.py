@@ -0,0 +1,94 @@
+import json
+import random
+
+from simulator.histogram import MAX_VALUE_US, LatencyHistogram
+
+
+def histogram_of(values_us) -> LatencyHistogram:
+    histogram = LatencyHistogram()
+    for value_us in values_us:
+        histogram.record(value_us / 1_000_000)
+    return histogram
+
+
+def test_small_values_are_exact():
+    histogram = histogram_of(range(1, 101))
+
+    assert histogram.total == 100
+    assert histogram.percentile(50) == 50 / 1_000_000
+    assert histogram.percentile(99) == 99 / 1_000_000
+    assert histogram.percentile(100) == histogram.max == 100 / 1_000_000
+
+
+def test_percentiles_stay_within_the_relative_error():
+    rng = random.Random(7)
+    values = sorted(int(rng.lognormvariate(9, 1.5)) + 200 for _ in range(50_000))
+    histogram = histogram_of(values)
+
+    for percentile in (50, 90, 99, 99.9):
+        exact = values[round(len(values) * percentile / 100) - 1]
+        assert abs(histogram.percentile(percentile) * 1_000_000 - exact) <= exact / 64
+
+
+def test_empty_histogram():
+    histogram = LatencyHistogram()
+
+    assert histogram.percentile(99) == 0.0
+    assert histogram.max == 0.0
+
+
+def test_values_are_clamped():
+    histogram = LatencyHistogram()
+    histogram.record(-1)
+    histogram.record(10 ** 9)
+
+    assert histogram.total == 2
+    assert histogram.percentile(1) == 0.0
+    assert histogram.max_us == MAX_VALUE_US
+
+
+def test_merge_equals_recording_everything_into_one():
+    rng = random.Random(3)
+    first = [rng.randrange(1, 2_000_000) for _ in range(5_000)]
+    second = [rng.randrange(1, 50_000) for _ in range(5_000)]
+
+    merged = histogram_of(first)
+    merged.merge(histogram_of(second))
+    combined = histogram_of(first + second)
+
+    assert merged.counts == combined.counts
+    assert merged.total == combined.total
+    assert merged.max_us == combined.max_us
+
+
+def test_difference_returns_samples_recorded_since():
+    histogram = histogram_of([100, 200, 300])
+    earlier = histogram.copy()
+    for value_us in (300, 5_000, 5_000):
+        histogram.record(value_us / 1_000_000)
+
+    delta = histogram.difference(earlier)
+
+    assert delta.total == 3
+    assert delta.counts == histogram_of([300, 5_000, 5_000]).counts
+    assert delta.percentile(100) == histogram.percentile(100)
+
+
+def test_copy_is_independent():
+    histogram = histogram_of([100])
+    copy = histogram.copy()
+    histogram.record(0.5)
+
+    assert copy.total == 1
+    assert copy.counts == {100: 1}
+
+
+def test_round_trips_through_json():
+    histogram = histogram_of([1, 150, 70_000, 3_000_000])
+
+    restored = LatencyHistogram.from_dict(json.loads(json.dumps(histogram.to_dict())))
+
+    assert restored.counts == histogram.counts
+    assert restored.total == histogram.total
+    assert restored.max_us == histogram.max_us
+    assert restored.percentile(50) == histogram.percentile(50)
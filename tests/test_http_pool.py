@@ -0,0 +1,108 @@
+import asyncio
+import socket
+import threading
+import time
+
+import pytest
+
+from benchmarks.mock_server import DEFAULT_MOCK_CONFIG, MockStats, serve
+from simulator.http_pool import HttpSessionPool
+from simulator.metrics import MetricsTracker
+
+
+@pytest.fixture
+def mock_server():
+    """
+    Starts the mock order service on a free port, yields a function that serves it with a config override
+    and returns its base_url.
+    """
+    servers = []
+
+    def start(**overrides) -> str:
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        config = {**DEFAULT_MOCK_CONFIG, **overrides, "port": port}
+
+        loop = asyncio.new_event_loop()
+        task = loop.create_task(serve(config, MockStats()))
+
+        def run():
+            try:
+                loop.run_until_complete(task)
+            except asyncio.CancelledError:
+                pass
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        servers.append((loop, task, thread))
+
+        # Wait until the server accepts connections
+        for _ in range(100):
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+                break
+            except OSError:
+                time.sleep(0.02)
+        return f"http://127.0.0.1:{port}/"
+
+    yield start
+
+    for loop, task, thread in servers:
+        loop.call_soon_threadsafe(task.cancel)
+        thread.join(timeout=5)
+        loop.close()
+
+
+@pytest.fixture
+def pool():
+    metrics = MetricsTracker(aggregate_interval=3600)
+    pool = HttpSessionPool({"pool_size": 4}, metrics)
+    yield pool
+    pool.close()
+
+
+def test_round_trip_reuses_the_connection(mock_server, pool):
+    base_url = mock_server()
+    for order in range(3):
+        response = pool.request(base_url, "POST", base_url + "orders", {}, {"order": order}, timeout=5)
+        assert response.status_code == 200
+        assert response.json()["json"] == {"order": order}
+
+    assert pool.metrics.snapshot()["connections"] == {base_url: {"hit": 2, "miss": 1}}
+
+
+def test_lazy_and_discarded_bodies(mock_server, pool):
+    base_url = mock_server()
+
+    lazy = pool.request(base_url, "POST", base_url, {}, {"a": 1}, timeout=5, response_body="lazy")
+    assert lazy.status_code == 200
+    assert lazy.json()["json"] == {"a": 1}
+
+    discarded = pool.request(base_url, "POST", base_url, {}, {"a": 1}, timeout=5, response_body="discard")
+    assert discarded.status_code == 200
+    assert discarded.content == b""
+    # The discarded body was drained, so the connection went back to the pool
+    assert pool.metrics.snapshot()["connections"][base_url]["hit"] == 1
+
+
+def test_error_responses(mock_server, pool):
+    base_url = mock_server(error_rate=1.0, error_status=503)
+    response = pool.request(base_url, "POST", base_url, {}, {}, timeout=5)
+    assert response.status_code == 503
+
+
+def test_max_connections_per_host_limits_concurrency(mock_server):
+    base_url = mock_server(latency_ms=50)
+    metrics = MetricsTracker(aggregate_interval=3600)
+    pool = HttpSessionPool({"pool_size": 4, "max_connections_per_host": 1}, metrics)
+
+    threads = [threading.Thread(target=pool.request, args=(base_url, "POST", base_url, {}, {}, 5)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    pool.close()
+
+    # Requests waited for each other, so a single connection served them all
+    assert metrics.snapshot()["connections"] == {base_url: {"hit": 3, "miss": 1}}
@@ -0,0 +1,99 @@
+import threading
+
+from simulator.metrics import MetricsTracker, merge_snapshots
+
+
+def tracker() -> MetricsTracker:
+    # Shards are folded by hand in these tests rather than by the aggregator thread
+    return MetricsTracker(aggregate_interval=3600)
+
+
+def record(metrics: MetricsTracker, user_id: int):
+    metrics.log_success("browse", user_id, latency=0.010, corrected_latency=0.015)
+    metrics.log_success("browse", user_id, latency=0.020, corrected_latency=0.020)
+    metrics.log_failure("place_order", user_id, latency=0.500, category="5xx")
+    metrics.log_failure("place_order", user_id, category="timeout")
+    metrics.log_retry("place_order")
+
+
+def in_thread(target):
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+
+
+def test_counts_and_categories():
+    metrics = tracker()
+    metrics.register_customers([1])
+    record(metrics, 1)
+    record(metrics, 2)
+
+    snapshot = metrics.snapshot()
+    assert snapshot["success"] == {"browse": 4}
+    assert snapshot["failure"] == {"place_order": 4}
+    assert snapshot["categories"] == {"place_order": {"5xx": 2, "timeout": 2}}
+    assert snapshot["retries"] == {"place_order": 2}
+    # Registered and unregistered customers are both counted
+    assert snapshot["per_customer"] == {1: {"success": 2, "fail": 2}, 2: {"success": 2, "fail": 2}}
+    assert snapshot["latency"]["browse"]["total"] == 2 * 2
+    assert snapshot["corrected"]["browse"]["total"] == 2 * 2
+    assert snapshot["latency"]["place_order"]["total"] == 2
+    assert "place_order" not in snapshot["corrected"]
+
+
+def test_folding_a_finished_shard_keeps_the_snapshot():
+    metrics = tracker()
+    in_thread(lambda: record(metrics, 1))
+    in_thread(lambda: record(metrics, 2))
+    record(metrics, 3)
+
+    before = metrics.snapshot()
+    metrics._fold_finished_shards()
+    assert len(metrics.shards) == 1
+    assert metrics.snapshot() == before
+    assert before["success"] == {"browse": 6}
+    assert before["latency"]["browse"]["total"] == 6
+
+
+def test_snapshot_without_latency_keeps_the_counts():
+    metrics = tracker()
+    in_thread(lambda: record(metrics, 1))
+    metrics._fold_finished_shards()
+    record(metrics, 2)
+
+    snapshot = metrics.snapshot(include_customers=False, include_latency=False)
+    assert snapshot["success"] == {"browse": 4}
+    assert snapshot["failure"] == {"place_order": 4}
+    assert snapshot["per_customer"] == {}
+    assert snapshot["latency"] == {}
+    assert snapshot["corrected"] == {}
+
+
+def test_merge_snapshots_adds_up_every_counter():
+    first, second = tracker(), tracker()
+    record(first, 1)
+    record(second, 1)
+    record(second, 2)
+    first.log_arrivals(10, 9, 1, 2, 0.5, 0.3)
+    second.log_arrivals(5, 5, 0, 1, 0.2, 0.4)
+
+    merged = merge_snapshots([first.snapshot(), second.snapshot()])
+    assert merged["success"] == {"browse": 6}
+    assert merged["categories"] == {"place_order": {"5xx": 3, "timeout": 3}}
+    assert merged["per_customer"][1] == {"success": 4, "fail": 4}
+    assert merged["latency"]["browse"]["total"] == 6
+    assert merged["arrivals"]["scheduled"] == 15
+    assert merged["arrivals"]["max_lag"] == 0.4
+
+    # Merging into a tracker gives the same totals as merging the snapshots
+    first.merge(second.snapshot())
+    assert first.snapshot() == merged
+
+
+def test_latency_feed_receives_new_latencies():
+    metrics = tracker()
+    metrics.log_success("browse", 1, latency=0.001)
+    feed = metrics.latency_feed()
+    record(metrics, 1)
+
+    assert list(feed) == [("browse", 0.010), ("browse", 0.020), ("place_order", 0.500)]
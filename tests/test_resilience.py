@@ -0,0 +1,127 @@
+import time
+
+import pytest
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError, ReadTimeoutError
+
+from simulator.resilience import (CIRCUIT_OPEN, CONNECT_ERROR, CONNECTION_LOST, ERROR, TIMEOUT, CircuitBreaker,
+                                  CircuitOpenError, ResiliencePolicy, classify_exception, load_resilience_config,
+                                  status_category)
+
+
+@pytest.mark.parametrize("exception, category", [
+    (ConnectionRefusedError(), CONNECT_ERROR),
+    (ConnectionResetError(), CONNECTION_LOST),
+    (BrokenPipeError(), CONNECTION_LOST),
+    (TimeoutError(), TIMEOUT),
+    (CircuitOpenError("open"), CIRCUIT_OPEN),
+    (ValueError("bad body"), ERROR),
+    (requests.exceptions.ConnectTimeout(), CONNECT_ERROR),
+    (requests.exceptions.ReadTimeout(), TIMEOUT),
+    (requests.exceptions.SSLError(), CONNECTION_LOST),
+    (requests.exceptions.ChunkedEncodingError(), CONNECTION_LOST),
+])
+def test_classify_exception(exception, category):
+    assert classify_exception(exception) == category
+
+
+def test_requests_connection_error_is_classified_by_what_it_wraps():
+    refused = MaxRetryError(None, "/", NewConnectionError(None, "refused"))
+    reset = MaxRetryError(None, "/", ProtocolError("Connection aborted.", ConnectionResetError()))
+
+    assert classify_exception(requests.exceptions.ConnectionError(refused)) == CONNECT_ERROR
+    assert classify_exception(requests.exceptions.ConnectionError(reset)) == CONNECTION_LOST
+    # Raised by requests when the body times out while being read
+    body_timeout = ReadTimeoutError(None, "/", "Read timed out.")
+    assert classify_exception(requests.exceptions.ConnectionError(body_timeout)) == TIMEOUT
+
+
+def test_httpx_exceptions():
+    httpx = pytest.importorskip("httpx")
+
+    assert classify_exception(httpx.ConnectError("refused")) == CONNECT_ERROR
+    assert classify_exception(httpx.ConnectTimeout("slow")) == CONNECT_ERROR
+    assert classify_exception(httpx.ReadTimeout("slow")) == TIMEOUT
+    assert classify_exception(httpx.RemoteProtocolError("closed")) == CONNECTION_LOST
+
+
+def test_aiohttp_exceptions():
+    aiohttp = pytest.importorskip("aiohttp")
+
+    assert classify_exception(aiohttp.ServerDisconnectedError()) == CONNECTION_LOST
+    assert classify_exception(aiohttp.ServerTimeoutError()) == TIMEOUT
+
+
+def test_status_category():
+    assert status_category(200) is None
+    assert status_category(404) == "4xx"
+    assert status_category(503) == "5xx"
+
+
+@pytest.mark.parametrize("config", [
+    {"retries": -1},
+    {"retry_on": ["sometimes"]},
+    {"circuit_breaker": {"failure_threshold": 0}},
+])
+def test_invalid_config_is_rejected(config):
+    with pytest.raises(ValueError):
+        load_resilience_config(config, "PlaceOrder")
+
+
+def test_config_merges_over_the_defaults():
+    config = load_resilience_config({"retries": 2, "circuit_breaker": {"enabled": True}})
+
+    assert config["retries"] == 2
+    assert config["circuit_breaker"]["enabled"] is True
+    assert config["circuit_breaker"]["failure_threshold"] == 5
+
+
+def test_circuit_breaker_opens_probes_and_closes():
+    breaker = CircuitBreaker("PlaceOrder", failure_threshold=2, open_seconds=0.05)
+
+    breaker.record(True)
+    assert breaker.allow()
+    breaker.record(True)
+    assert not breaker.allow()
+    assert breaker.opened == 1
+
+    time.sleep(0.06)
+    # A single probe is let through
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record(False)
+    assert breaker.allow()
+    assert breaker.opened_at is None
+
+
+def test_failed_probe_opens_the_circuit_again():
+    breaker = CircuitBreaker("PlaceOrder", failure_threshold=1, open_seconds=0.05)
+    breaker.record(True)
+    time.sleep(0.06)
+    assert breaker.allow()
+
+    breaker.record(True)
+
+    assert not breaker.allow()
+    assert breaker.opened == 1
+
+
+def test_retry_delay_only_for_listed_categories_and_attempts():
+    policy = ResiliencePolicy("PlaceOrder", {"retries": 2, "retry_on": [CONNECT_ERROR, "5xx"],
+                                             "backoff_seconds": 0.1, "max_backoff_seconds": 0.15})
+
+    assert policy.retry_delay(None, 0) is None
+    assert policy.retry_delay(TIMEOUT, 0) is None
+    assert policy.retry_delay(CONNECTION_LOST, 0) is None
+    assert 0 <= policy.retry_delay(CONNECT_ERROR, 0) <= 0.1
+    assert 0 <= policy.retry_delay("5xx", 1) <= 0.15
+    assert policy.retry_delay("5xx", 2) is None
+
+
+def test_nothing_is_retried_once_the_circuit_opens():
+    policy = ResiliencePolicy("PlaceOrder", {"retries": 5, "circuit_breaker": {"enabled": True, "failure_threshold": 1}})
+
+    assert policy.retry_delay(CONNECT_ERROR, 0) is None
+    with pytest.raises(CircuitOpenError):
+        policy.before_request()
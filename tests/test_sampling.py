@@ -0,0 +1,74 @@
+import random
+from collections import Counter
+
+import pytest
+
+from generator import sampling
+from generator.sampling import AliasSampler, UniformSampler, make_sampler, zipf_weights
+
+
+def frequencies(picks: list[int], n: int) -> list[float]:
+    counts = Counter(picks)
+    return [counts[i] / len(picks) for i in range(n)]
+
+
+def test_zipf_weights():
+    assert zipf_weights(4) == [1.0, 0.5, 1 / 3, 0.25]
+    assert zipf_weights(3, exponent=2) == [1.0, 0.25, 1 / 9]
+
+
+@pytest.mark.parametrize("weights", [[1, 2, 3, 4], zipf_weights(50, 1.2), [0, 5, 0, 1]])
+def test_alias_sampler_follows_the_weights(weights):
+    sampler = AliasSampler(weights, random.Random(1))
+    total = sum(weights)
+
+    observed = frequencies([sampler.sample() for _ in range(100_000)], len(weights))
+
+    for index, weight in enumerate(weights):
+        assert observed[index] == pytest.approx(weight / total, abs=0.01)
+
+
+def test_alias_sampler_batches_follow_the_weights():
+    weights = [1, 2, 3, 4]
+    sampler = AliasSampler(weights, random.Random(2))
+
+    observed = frequencies(sampler.sample_batch(100_000), len(weights))
+
+    assert observed == pytest.approx([0.1, 0.2, 0.3, 0.4], abs=0.01)
+
+
+def test_python_batches_without_numpy(monkeypatch):
+    monkeypatch.setattr(sampling, "np", None)
+    sampler = AliasSampler([1, 3], random.Random(3))
+
+    observed = frequencies(sampler.sample_batch(50_000), 2)
+
+    assert observed == pytest.approx([0.25, 0.75], abs=0.01)
+
+
+def test_seeded_samplers_repeat():
+    first = AliasSampler(zipf_weights(10), random.Random(42))
+    second = AliasSampler(zipf_weights(10), random.Random(42))
+
+    assert [first.sample() for _ in range(100)] == [second.sample() for _ in range(100)]
+    assert first.sample_batch(500) == second.sample_batch(500)
+
+
+def test_uniform_sampler_stays_in_range():
+    sampler = UniformSampler(7, random.Random(4))
+
+    picks = [sampler.sample() for _ in range(10_000)] + sampler.sample_batch(10_000)
+
+    assert set(picks) == set(range(7))
+
+
+@pytest.mark.parametrize("weights", [[], [0, 0], [1, -1]])
+def test_invalid_weights_are_rejected(weights):
+    with pytest.raises(ValueError):
+        AliasSampler(weights)
+
+
+def test_make_sampler():
+    assert isinstance(make_sampler(None, 5), UniformSampler)
+    assert isinstance(make_sampler([2, 2, 2], 3), UniformSampler)
+    assert isinstance(make_sampler([1, 2], 2), AliasSampler)
@@ -0,0 +1,154 @@
+import time
+
+import pytest
+
+from simulator.action_registry import ActionRegistry
+from simulator.customer import Customer
+from simulator.session_cache import SessionCache
+
+
+class LoginBehaviour:
+    """
+    Logs in with a token named after the customer, or fails while 'failing' is set.
+    """
+    def __init__(self, ttl: float = None):
+        self.ttl = ttl
+        self.failing = False
+
+    def get_endpoint(self, customer, config):
+        return "/login"
+
+    def get_method(self, customer, config):
+        return "POST"
+
+    def get_header(self, customer, config):
+        return {}
+
+    def get_body(self, customer, config):
+        return {"email": customer.email}
+
+    def get_session(self, customer, response, config):
+        if self.failing:
+            return None
+        return f"token-{customer.user_id}", self.ttl
+
+
+class Response:
+    status_code = 200
+
+
+class Http:
+    def __init__(self):
+        self.logins = 0
+
+    def request(self, **request):
+        self.logins += 1
+        return Response()
+
+
+def session_cache(behaviour: LoginBehaviour, **config) -> tuple[SessionCache, Http]:
+    registry = ActionRegistry()
+    registry.register("Login", {"base_url": "http://localhost/"}, behaviour)
+    http = Http()
+    cache = SessionCache({"refresh_before_seconds": 0, **config}, registry, http)
+    return cache, http
+
+
+def customer(user_id: int) -> Customer:
+    return Customer(f"user{user_id}@example.com", "secret", user_id)
+
+
+def wait_for(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_login_action_must_implement_get_session():
+    registry = ActionRegistry()
+    registry.register("Login", {}, object())
+
+    with pytest.raises(ValueError):
+        SessionCache({}, registry, Http())
+
+
+def test_sessions_are_cached():
+    cache, http = session_cache(LoginBehaviour())
+    alice = customer(1)
+
+    session = cache.get(alice)
+
+    assert session.token == "token-1"
+    assert cache.get(alice) is session
+    assert http.logins == 1
+    assert {key: cache.stats()[key] for key in ("hits", "misses", "logins")} == {"hits": 1, "misses": 1, "logins": 1}
+
+
+def test_expired_sessions_log_in_again():
+    cache, http = session_cache(LoginBehaviour(ttl=0.05))
+    alice = customer(1)
+    first = cache.get(alice)
+
+    time.sleep(0.06)
+    second = cache.get(alice)
+
+    assert second is not first
+    assert http.logins == 2
+    assert cache.stats()["expired"] == 1
+
+
+def test_least_recently_used_sessions_are_evicted():
+    cache, http = session_cache(LoginBehaviour(), max_sessions=2)
+    alice, bob, carol = customer(1), customer(2), customer(3)
+    cache.get(alice)
+    cache.get(bob)
+    cache.get(alice)
+
+    cache.get(carol)
+
+    assert list(cache.sessions) == [1, 3]
+    assert cache.stats()["evicted"] == 1
+    cache.get(alice)
+    assert http.logins == 3
+
+
+def test_failed_logins_back_off():
+    behaviour = LoginBehaviour()
+    cache, http = session_cache(behaviour, login_retry_seconds=0.05, max_login_retry_seconds=0.08)
+    alice = customer(1)
+    behaviour.failing = True
+
+    assert cache.get(alice) is None
+    assert cache.get(alice) is None
+    assert http.logins == 1
+    assert cache.stats()["backed_off"] == 1
+
+    time.sleep(0.06)
+    assert cache.get(alice) is None
+    assert http.logins == 2
+    # The backoff doubles, up to max_login_retry_seconds
+    assert cache.failed_logins[1][1] == 0.08
+
+    behaviour.failing = False
+    time.sleep(0.09)
+    assert cache.get(alice).token == "token-1"
+    assert 1 not in cache.failed_logins
+
+
+def test_only_recently_used_sessions_are_refreshed():
+    cache, http = session_cache(LoginBehaviour(ttl=0.3), refresh_before_seconds=0.2, idle_seconds=0.05)
+    try:
+        busy, idle = customer(1), customer(2)
+        first = cache.get(busy)
+        cache.get(idle)
+
+        # The busy customer keeps using its session until it is refreshed, the idle one doesn't
+        wait_for(lambda: cache.get(busy) is not first)
+        wait_for(lambda: cache.stats()["idle"] == 1)
+
+        stats = cache.stats()
+        assert (stats["refreshes"], stats["idle"]) == (1, 1)
+        assert http.logins == 3
+    finally:
+        cache.shutdown()
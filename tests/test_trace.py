@@ -0,0 +1,86 @@
+import os
+import struct
+import time
+
+import pytest
+
+from simulator.trace import TRACE_HEADER, TRACE_MAGIC, TRACE_RECORD, TraceRecorder, read_trace
+
+
+def record_trace(path, records, action_names=("PlaceOrder", "CancelOrder")) -> TraceRecorder:
+    """
+    Records (offset, user_id, action_name, status, latency) tuples, offsets are seconds from the recorder's start.
+    """
+    recorder = TraceRecorder(str(path), list(action_names))
+    for offset, user_id, action_name, status, latency in records:
+        recorder.record(recorder.start + offset, user_id, action_name, status, latency)
+    recorder.close()
+    return recorder
+
+
+def set_start(path, started: float):
+    # Rewrites the header's wall clock start, as if the recorder had started then
+    with open(path, "r+b") as file:
+        _, _, names_length = TRACE_HEADER.unpack(file.read(TRACE_HEADER.size))
+        file.seek(0)
+        file.write(TRACE_HEADER.pack(TRACE_MAGIC, started, names_length))
+
+
+def test_records_round_trip(tmp_path):
+    path = tmp_path / "trace.bin"
+    records = [(0.0, 1, "PlaceOrder", 200, 0.012), (0.5, 2, "CancelOrder", 503, 0.25), (1.25, 1, "PlaceOrder", 0, None)]
+    recorder = record_trace(path, records)
+
+    read = list(read_trace(str(path)))
+
+    assert recorder.recorded == 3
+    assert [(offset, user_id, name, status) for offset, user_id, name, status, _ in read] == \
+           [(offset, user_id, name, status) for offset, user_id, name, status, _ in records]
+    assert read[0][4] == pytest.approx(0.012)
+    assert read[2][4] is None
+
+
+def test_records_are_24_bytes(tmp_path):
+    path = tmp_path / "trace.bin"
+    record_trace(path, [(0.0, 1, "PlaceOrder", 200, 0.01)] * 10)
+
+    names_length = len(b'["PlaceOrder", "CancelOrder"]')
+    assert TRACE_RECORD.size == 24
+    assert os.path.getsize(path) == TRACE_HEADER.size + names_length + 10 * 24
+
+
+def test_unknown_actions_are_not_recorded(tmp_path):
+    path = tmp_path / "trace.bin"
+    record_trace(path, [(0.0, 1, "Login", 200, 0.01), (0.1, 1, "PlaceOrder", 200, 0.01)])
+
+    assert [name for _, _, name, _, _ in read_trace(str(path))] == ["PlaceOrder"]
+
+
+def test_truncated_trace_ends_at_its_last_whole_record(tmp_path):
+    path = tmp_path / "trace.bin"
+    record_trace(path, [(0.0, 1, "PlaceOrder", 200, 0.01), (0.1, 2, "PlaceOrder", 200, 0.01)])
+    with open(path, "r+b") as file:
+        file.truncate(os.path.getsize(path) - 5)
+
+    assert [user_id for _, user_id, _, _, _ in read_trace(str(path))] == [1]
+
+
+def test_files_that_are_not_traces_are_rejected(tmp_path):
+    path = tmp_path / "trace.bin"
+    path.write_bytes(struct.pack("<8sdI", b"NOTATRCE", time.time(), 2) + b"[]")
+
+    with pytest.raises(ValueError):
+        list(read_trace(str(path)))
+
+
+def test_shard_offsets_are_rebased_onto_the_earliest_start(tmp_path):
+    first, second = tmp_path / "trace.bin.shard0", tmp_path / "trace.bin.shard1"
+    record_trace(first, [(0.0, 1, "PlaceOrder", 200, 0.01), (2.0, 1, "CancelOrder", 200, 0.01)])
+    record_trace(second, [(0.0, 2, "PlaceOrder", 200, 0.01), (0.5, 2, "CancelOrder", 200, 0.01)])
+    # The second shard started its trace 1.5s after the first
+    set_start(first, 1_000_000.0)
+    set_start(second, 1_000_001.5)
+
+    merged = [(offset, user_id) for offset, user_id, _, _, _ in read_trace([str(second), str(first)])]
+
+    assert merged == [(0.0, 1), (1.5, 2), (2.0, 1), (2.0, 2)]
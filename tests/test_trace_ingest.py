@@ -0,0 +1,89 @@
+import calendar
+import json
+
+import pytest
+
+from generator.trace_ingest import TraceIngest, parse_log_time, parse_timestamp
+
+ROUTES = [{"match": "^POST /orders$", "action": "PlaceOrder"},
+          {"match": "^DELETE /orders/(?P<user_id>\\d+)/", "action": "CancelOrder"}]
+
+
+def ingest(path, **config) -> TraceIngest:
+    return TraceIngest({"path": str(path), "user_mapping": "direct", **config}, [1, 2, 3], ["PlaceOrder", "CancelOrder"])
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("10/Oct/2000:13:55:36 +0000", calendar.timegm((2000, 10, 10, 13, 55, 36))),
+    ("10/Oct/2000:13:55:36 -0700", calendar.timegm((2000, 10, 10, 20, 55, 36))),
+    ("01/Jan/2024:00:00:00 +0530", calendar.timegm((2023, 12, 31, 18, 30, 0))),
+])
+def test_parse_log_time(text, expected):
+    assert parse_log_time(text) == expected
+
+
+@pytest.mark.parametrize("text", ["2000-10-10T13:55:36Z", "10/Foo/2000:13:55:36 +0000", "10/Oct"])
+def test_parse_log_time_rejects_other_formats(text):
+    with pytest.raises((ValueError, KeyError, IndexError)):
+        parse_log_time(text)
+
+
+def test_parse_timestamp():
+    assert parse_timestamp(12.5) == 12.5
+    assert parse_timestamp("2000-10-10T13:55:36+00:00") == calendar.timegm((2000, 10, 10, 13, 55, 36))
+
+
+def test_access_log(tmp_path):
+    path = tmp_path / "access.log"
+    path.write_text(
+        '10.0.0.1 - 1 [10/Oct/2000:13:55:36 +0000] "POST /orders HTTP/1.1" 200 12\n'
+        '10.0.0.1 - - [10/Oct/2000:13:55:38 +0000] "DELETE /orders/2/7 HTTP/1.1" 200 12 "-" "curl/8.0"\n'
+        '10.0.0.1 - 3 [10/Oct/2000:13:55:39 +0000] "GET /health HTTP/1.1" 200 2\n'
+    )
+    trace = ingest(path, format="access_log", routes=ROUTES)
+
+    assert list(trace) == [(0, 1, "PlaceOrder"), (2, 2, "CancelOrder")]
+    assert (trace.lines, trace.records, trace.unmatched, trace.invalid) == (3, 2, 1, 0)
+
+
+def test_malformed_access_log_lines_are_counted_as_invalid(tmp_path):
+    path = tmp_path / "access.log"
+    path.write_text(
+        '10.0.0.1 - 1 [10/Oct/2000:13:55:36 +0000] "POST /orders HTTP/1.1" 200 12\n'
+        'not an access log line\n'
+        '10.0.0.1 - 1 [2000-10-10T13:55:37Z] "POST /orders HTTP/1.1" 200 12\n'
+        '10.0.0.1 - 1 [10/Foo/2000:13:55:37 +0000] "POST /orders HTTP/1.1" 200 12\n'
+        '10.0.0.1 - 2 [10/Oct/2000:13:55:40 +0000] "POST /orders HTTP/1.1" 200 12\n'
+    )
+    trace = ingest(path, format="access_log", routes=ROUTES)
+
+    assert list(trace) == [(0, 1, "PlaceOrder"), (4, 2, "PlaceOrder")]
+    assert trace.invalid == 3
+
+
+def test_jsonl(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    lines = [
+        {"timestamp": 100.0, "user_id": 1, "action": "PlaceOrder"},
+        {"timestamp": "1970-01-01T00:01:41+00:00", "user_id": 2, "method": "POST", "path": "/orders"},
+        {"user_id": 3, "action": "PlaceOrder"},
+        {"timestamp": 102.0, "user_id": 3, "action": "Login"},
+    ]
+    path.write_text("\n".join(json.dumps(line) for line in lines) + "\n{broken\n")
+    trace = ingest(path, routes=ROUTES)
+
+    assert list(trace) == [(0, 1, "PlaceOrder"), (1, 2, "PlaceOrder")]
+    assert (trace.unmatched, trace.invalid) == (1, 2)
+
+
+def test_hashed_users_are_split_between_shards(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    path.write_text("".join(json.dumps({"timestamp": i, "user_id": f"user-{i}", "action": "PlaceOrder"}) + "\n"
+                            for i in range(200)))
+
+    shards = [TraceIngest({"path": str(path)}, [1, 2, 3], ["PlaceOrder"], shard_index=i, shard_count=2)
+              for i in range(2)]
+    counts = [sum(1 for _ in shard) for shard in shards]
+
+    assert sum(counts) == 200
+    assert all(counts)
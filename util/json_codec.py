@@ -0,0 +1,94 @@
+import json
+
+from util.log import get_logger
+
+logger = get_logger(__name__)
+
+CODECS = ["auto", "orjson", "msgspec", "json"]
+
+
+class _StdlibCodec:
+    name = "json"
+
+    @staticmethod
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+    @staticmethod
+    def loads(data):
+        return json.loads(data)
+
+
+class _OrjsonCodec:
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self.dumps = orjson.dumps
+        self.loads = orjson.loads
+
+
+class _MsgspecCodec:
+    name = "msgspec"
+
+    def __init__(self):
+        import msgspec
+        self.dumps = msgspec.json.encode
+        self.loads = msgspec.json.decode
+
+
+_CODEC_CLASSES = {
+    "orjson": _OrjsonCodec,
+    "msgspec": _MsgspecCodec,
+    "json": _StdlibCodec
+}
+
+_codec = _StdlibCodec()
+
+
+def configure(name: str | None = "auto"):
+    """
+    Selects the JSON backend used for request and response bodies, one of CODECS.
+    'auto' picks the fastest installed backend: orjson, then msgspec, then the stdlib json module.
+    Call before actions are registered, body templates are encoded with the backend active at the time.
+    """
+    global _codec
+
+    name = name or "auto"
+    if name not in CODECS:
+        raise ValueError(f"Unknown json_codec '{name}', expected one of {CODECS}")
+
+    if name == "auto":
+        for candidate in ("orjson", "msgspec"):
+            try:
+                _codec = _CODEC_CLASSES[candidate]()
+                break
+            except ImportError:
+                continue
+        else:
+            _codec = _StdlibCodec()
+    else:
+        try:
+            _codec = _CODEC_CLASSES[name]()
+        except ImportError as e:
+            raise ImportError(f"json_codec '{name}' is not installed, run 'pip install {name}'") from e
+
+    logger.info(f"[json_codec] using '{_codec.name}'")
+
+
+def backend() -> str:
+    return _codec.name
+
+
+def dumps(obj) -> bytes:
+    """
+    Encodes obj to compact JSON bytes with the configured backend.
+    """
+    return _codec.dumps(obj)
+
+
+def loads(data: bytes | str):
+    """
+    Decodes JSON bytes or str with the configured backend.
+    """
+    return _codec.loads(data)
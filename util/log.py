@@ -0,0 +1,116 @@
+from collections.abc import MutableMapping, MutableSequence, MutableSet
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+
+ROOT_LOGGER = "simulator"
+
+DEFAULT_LOGGING_CONFIG = {
+    "level": "INFO",
+    "format": "text",   # text | json
+    "file": None,       # write logs to this file instead of stdout
+    "sampling": {}      # action name -> fraction of hot-path messages kept, 'default' applies to other actions
+}
+
+_listener = None
+_sampling = {}
+_default_sample_rate = 1.0
+_sampler = random.Random()  # kept apart from the global random module so sampling doesn't disturb seeded runs
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats a record as one JSON object per line. Structured fields can be passed with extra={"fields": {...}}.
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage()
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queues records without formatting them, so message formatting happens on the writer thread, not the caller's.
+    A record with a mutable container among its args (a customer's open orders, a request body) is rendered first,
+    since the caller may change the container before the writer thread gets to it.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if args and any(isinstance(arg, (MutableSequence, MutableMapping, MutableSet))
+                        for arg in (args.values() if isinstance(args, dict) else args)):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+def setup_logging(config: dict | None):
+    """
+    Routes every simulator logger through a queue to a background writer thread.
+    Call once per process before anything logs.
+    """
+    global _listener, _sampling, _default_sample_rate
+
+    settings = dict(DEFAULT_LOGGING_CONFIG)
+    settings.update(config or {})
+
+    if settings["file"]:
+        output = logging.FileHandler(settings["file"])
+    else:
+        output = logging.StreamHandler(sys.stdout)
+
+    if settings["format"] == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s %(message)s"))
+
+    records = queue.SimpleQueue()
+    root = logging.getLogger(ROOT_LOGGER)
+    root.handlers = [_DeferredQueueHandler(records)]
+    root.setLevel(settings["level"].upper())
+    root.propagate = False
+
+    shutdown_logging()
+    _listener = logging.handlers.QueueListener(records, output)
+    _listener.start()
+
+    sampling = dict(settings["sampling"] or {})
+    _default_sample_rate = sampling.pop("default", 1.0)
+    _sampling = sampling
+
+def shutdown_logging():
+    """
+    Flushes queued records and stops the writer thread.
+    """
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
+
+def get_logger(name: str) -> logging.Logger:
+    # Every logger sits under the simulator root so setup_logging applies to all of them
+    if name.startswith(f"{ROOT_LOGGER}."):
+        return logging.getLogger(name)
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+def should_log(logger: logging.Logger, level: int, action_name: str) -> bool:
+    """
+    Hot-path guard: True when 'level' is enabled and this message is sampled for 'action_name'.
+    Check it before building log arguments, so filtered messages cost next to nothing.
+    Only DEBUG and INFO messages are sampled, warnings and errors are always kept.
+    """
+    if not logger.isEnabledFor(level):
+        return False
+    if level >= logging.WARNING:
+        return True
+    rate = _sampling.get(action_name, _default_sample_rate)
+    return rate >= 1 or _sampler.random() < rate
@@ -0,0 +1,39 @@
+import hashlib
+import random
+
+# Run-wide seed, None means every run is different
+_seed = None
+
+
+def configure(seed):
+    """
+    Sets the run-wide seed. With a seed the arrival schedule, customer and sequence choices and
+    request payloads are the same on every run, without one they are random.
+    """
+    global _seed
+    _seed = seed
+
+
+def get_seed():
+    return _seed
+
+
+def derive(*keys) -> int:
+    """
+    Returns a 64-bit value that only depends on the seed and the keys, or a random one when no seed is set.
+    Used where one shared random stream would make the result depend on thread scheduling,
+    e.g. derive(user_id, request_number) gives a customer the same payloads whatever else is running.
+    """
+    if _seed is None:
+        return random.getrandbits(64)
+    digest = hashlib.blake2b(repr((_seed, *keys)).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def make_rng(*keys) -> random.Random:
+    """
+    Returns a random.Random seeded from the seed and the keys, or an unseeded one when no seed is set.
+    """
+    if _seed is None:
+        return random.Random()
+    return random.Random(derive(*keys))